@@ -0,0 +1,5 @@
+from dotenv import load_dotenv
+
+# Settings are read from the environment when each module is imported, so .env is
+# loaded here, once, before any of them: by the API, the CLI commands and the worker.
+load_dotenv()
@@ -0,0 +1,271 @@
+import logging
+import os
+import time
+from functools import partial
+from typing import Dict, Iterable, Optional, Tuple
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.v1.dependencies import API_KEY_NAME, limit_api_key_lookups
+from app.services.api_key_service import get_api_key_store
+from app.services.metrics_service import (
+    DB_N_PLUS_ONE, DB_QUERIES_PER_REQUEST, HTTP_REQUEST_SECONDS, REQUESTS_REJECTED, RequestQueryStats,
+    current_query_stats
+)
+from app.services.rate_limit_service import (
+    AdmissionController, OverloadedError, RateLimit, RateLimiter, get_rate_limiter, retry_after_header
+)
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pyinstrument is only needed for request profiling
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+# Allow authenticated requests with an X-Profile header to be profiled
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "false").lower() in ("1", "true", "yes")
+PROFILE_HEADER = "x-profile"
+
+
+def _route_path(scope: Scope) -> str:
+    """
+    The template of the route that served a request, e.g. /api/v1/leads/{lead_id}/state,
+    so label values stay bounded. Unmatched paths share one label.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path_format", None)
+    if template is None:
+        return "unmatched"
+    # Routes of an included router only know their path below the router's prefix;
+    # recover the prefix from the part of the request path in front of it
+    try:
+        suffix = template.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return template
+    path = scope["path"]
+    return path[:-len(suffix)] + template if suffix and path.endswith(suffix) else template
+
+
+class MetricsMiddleware:
+    """
+    Records each request's latency (up to its response headers, so streams are
+    not timed for as long as they stay open) and the database statements run
+    for it, and flags requests that repeat one SELECT many times.
+
+    When REQUEST_PROFILING is on, an authenticated request sending `X-Profile: text`
+    (or `html`) gets a pyinstrument profile of itself instead of its response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        profile_format = headers.get(PROFILE_HEADER)
+        if profile_format and await self._may_profile(scope, headers):
+            await self._profile(scope, receive, send, profile_format)
+            return
+
+        stats = RequestQueryStats()
+        token = current_query_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+        timed = False
+
+        def observe():
+            nonlocal timed
+            timed = True
+            HTTP_REQUEST_SECONDS.labels(scope["method"], _route_path(scope), str(status)).observe(
+                time.perf_counter() - start
+            )
+
+        async def send_timed(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                observe()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            current_query_stats.reset(token)
+            if not timed:
+                observe()
+            route = _route_path(scope)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.count)
+            repeated = stats.repeated_select()
+            if repeated is not None:
+                DB_N_PLUS_ONE.labels(route).inc()
+                statement, count = repeated
+                logger.warning("Possible N+1 on %s %s: ran %d times: %s", scope["method"], route, count, statement)
+
+    @staticmethod
+    async def _may_profile(scope: Scope, headers: Headers) -> bool:
+        if not REQUEST_PROFILING or Profiler is None:
+            return False
+        # The app's own key store and limiter, so tests overriding them are honoured here too
+        overrides = getattr(scope.get("app"), "dependency_overrides", {})
+        store = overrides.get(get_api_key_store, get_api_key_store)()
+        limiter = overrides.get(get_rate_limiter, get_rate_limiter)()
+        client = scope.get("client")
+        # Lookups are charged to the client like in get_api_key, so profiling can't be used to guess keys
+        lookup_limit = partial(limit_api_key_lookups, limiter, client[0] if client else "unknown")
+        try:
+            return await store.verify(headers.get(API_KEY_NAME), before_lookup=lookup_limit) is not None
+        except HTTPException:
+            # Not profiled; the request itself is then refused by get_api_key
+            return False
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, profile_format: str):
+        async def discard(message: Message):
+            pass
+
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+
+        if profile_format == "html":
+            body, media_type = profiler.output_html().encode(), "text/html; charset=utf-8"
+        else:
+            body, media_type = profiler.output_text(unicode=True).encode(), "text/plain; charset=utf-8"
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", media_type.encode()), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """
+    Limits how often each client IP may call the routes in `limits`, keyed by
+    (method, path). The check runs before the request body is read, so a burst
+    of uploads is turned away without any of them being spooled to disk.
+
+    Behind a proxy, run uvicorn with --proxy-headers and --forwarded-allow-ips
+    so the client IP is the one the proxy saw.
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[Tuple[str, str], RateLimit], limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limits = limits
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limit = self.limits.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if limit is not None:
+            client = scope.get("client")
+            key = f"ip:{client[0] if client else 'unknown'}:{scope['method']} {scope['path']}"
+            retry_after = await (self.limiter or get_rate_limiter()).acquire(key, limit)
+            if retry_after:
+                REQUESTS_REJECTED.labels("ip_rate_limit").inc()
+                response = JSONResponse(
+                    {"detail": "Too many requests; retry later."}, status_code=429,
+                    headers=retry_after_header(retry_after),
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class RequestTooLargeError(Exception):
+    """Raised from `receive` once a request body has grown past its limit."""
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Caps the request body of the routes in `limits`, keyed by (method, path), in
+    bytes. Form fields and uploads are only seen by endpoints after the whole body
+    has been parsed and spooled to disk, so the cap has to be enforced here: a
+    Content-Length over it is answered with a 413 before anything is read, and a
+    body sent without one is counted as it arrives.
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[Tuple[str, str], int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        max_bytes = self.limits.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        too_large = JSONResponse({"detail": f"Request body too large; the limit is {max_bytes} bytes."}, status_code=413)
+        received = 0
+        exceeded = started = rejected = False
+
+        async def reject():
+            nonlocal rejected
+            if not rejected:
+                rejected = True
+                REQUESTS_REJECTED.labels("body_too_large").inc()
+                await too_large(scope, receive, send)
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            await reject()
+            return
+
+        async def receive_capped() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    exceeded = True
+                    raise RequestTooLargeError()
+            return message
+
+        async def send_capped(message: Message):
+            nonlocal started
+            if exceeded and not started:
+                # FastAPI answers a body it couldn't finish reading with a 400; say why instead
+                await reject()
+                return
+            started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive_capped, send_capped)
+        except RequestTooLargeError:
+            if started:
+                raise
+            await reject()
+
+
+class AdmissionControlMiddleware:
+    """
+    Runs requests through an AdmissionController, answering the ones it turns
+    away with a 503 and Retry-After. Long-lived requests such as event streams
+    belong in `exempt_paths`, or they would hold their slots for as long as
+    they stay open.
+    """
+
+    def __init__(self, app: ASGIApp, controller: Optional[AdmissionController] = None, exempt_paths: Iterable[str] = ()):
+        self.app = app
+        self.controller = controller or AdmissionController()
+        self.exempt_paths = frozenset(exempt_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        try:
+            async with self.controller.admit():
+                await self.app(scope, receive, send)
+        except OverloadedError as e:
+            REQUESTS_REJECTED.labels("overloaded").inc()
+            response = JSONResponse({"detail": str(e)}, status_code=503, headers=retry_after_header(e.retry_after))
+            await response(scope, receive, send)
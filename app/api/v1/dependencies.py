@@ -1,17 +1,63 @@
-from fastapi import Security, HTTPException, status
-from fastapi.security.api_key import APIKeyHeader
 import os
+from functools import partial
+from typing import Optional
+from fastapi import Depends, Request, Security, HTTPException, status
+from fastapi.security import SecurityScopes
+from fastapi.security.api_key import APIKeyHeader
 
-API_KEY = os.getenv("API_KEY", "default-api-key")
+from app.services.api_key_service import ApiKeyIdentity, ApiKeyStore, get_api_key_store, LEGACY_API_KEY
+from app.services.metrics_service import REQUESTS_REJECTED
+from app.services.rate_limit_service import get_rate_limiter, retry_after_header, RateLimit, RateLimiter
+
+# The single shared key from before per-user keys
+API_KEY = LEGACY_API_KEY
 API_KEY_NAME = "X-API-Key"
 
+# Database lookups of keys that aren't cached, allowed per client IP. A client with a valid
+# key needs one per API_KEY_CACHE_TTL_SECONDS; one guessing keys needs one per guess.
+API_KEY_LOOKUP_LIMIT = RateLimit.per_minute(
+    float(os.getenv("API_KEY_LOOKUPS_PER_MINUTE", 30)), int(os.getenv("API_KEY_LOOKUP_BURST", 10))
+)
+
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
 
-def get_api_key(api_key_header: str = Security(api_key_header)):
-    if api_key_header == API_KEY:
-        return api_key_header
-    else:
+async def limit_api_key_lookups(limiter: RateLimiter, client_ip: str):
+    """
+    Charge a database lookup of an uncached key to `client_ip`, raising a 429 once
+    it has used up API_KEY_LOOKUP_LIMIT. Pass it to `ApiKeyStore.verify` as `before_lookup`.
+    """
+    retry_after = await limiter.acquire(f"api-key-lookup:ip:{client_ip}", API_KEY_LOOKUP_LIMIT)
+    if retry_after:
+        REQUESTS_REJECTED.labels("api_key_lookup_rate_limit").inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many API keys checked; retry later.",
+            headers=retry_after_header(retry_after),
+        )
+
+async def get_api_key(
+    request: Request,
+    security_scopes: SecurityScopes,
+    api_key_header: Optional[str] = Security(api_key_header),
+    store: ApiKeyStore = Depends(get_api_key_store),
+    limiter: RateLimiter = Depends(get_rate_limiter),
+) -> ApiKeyIdentity:
+    """
+    The identity of the request's API key. Use with `Security(get_api_key, scopes=[...])`
+    to also require the key to carry those scopes. Clients that send too many keys
+    the database has to check get a 429 instead.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    identity = await store.verify(api_key_header, before_lookup=partial(limit_api_key_lookups, limiter, client_ip))
+    if identity is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials, check the X-API-Key header in your request.",
-        )
\ No newline at end of file
+        )
+    missing = set(security_scopes.scopes) - identity.scopes
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"This API key is missing the scopes: {', '.join(sorted(missing))}.",
+        )
+    return identity
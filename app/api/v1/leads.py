@@ -1,79 +1,375 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
-import shutil
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, Header, Query, Request, Response, Security
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import RedirectResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from functools import partial
+from typing import List, Optional
+import asyncio
+import mimetypes
 import os
+import time
 
-from app.schemas.lead import Lead, LeadBase, LeadUpdateState
+from app.schemas.lead import (
+    Lead, LeadBase, LeadBulkUpdateResult, LeadBulkUpdateState, LeadImportReport, LeadSearchHit, LeadState,
+    LeadTransitionFailure, LeadUpdateState
+)
 from app.models.lead import Lead as DBLead
-from app.db.session import get_db
-from app.services.email_service import send_new_lead_emails
+from app.db.session import get_async_db, AsyncSessionLocal
+from app.db.group_commit import GroupCommitWriter
+from app.crud.lead import (
+    build_leads_query, dump_lead_rows, dump_lead_rows_ndjson, encode_cursor, decode_cursor, insert_lead_if_new,
+    InvalidCursorError
+)
+from app.services.cache_service import (
+    cached_json_response, get_response_cache, CachedResponse, ResponseCache, LEADS_CACHE_NAMESPACE
+)
+from app.services.lead_event_service import (
+    get_lead_event_broker, publish_lead_created, publish_leads_imported, publish_state_changes, LeadEventBroker
+)
+from app.services.metrics_service import record_resume_upload, REQUESTS_REJECTED
+from app.services.rate_limit_service import get_rate_limiter, RateLimit, RateLimiter
+from app.services.outbox_service import enqueue_new_lead_emails
+from app.services.lead_state_service import transition_leads
+from app.services.resume_text_service import index_resume_text
+from app.services.search_service import search_index_for
+from app.services.import_service import (
+    detect_format, import_leads, read_records, IMPORT_FORMATS, LEAD_IMPORT_CHUNK_SIZE, LEAD_IMPORT_MAX_BYTES,
+    UnsupportedImportFormatError
+)
+from app.services.storage_service import (
+    get_resume_store, ResumeNotFoundError, ResumeStore, UploadTooLargeError, RESUME_MAX_BYTES
+)
 from app.api.v1.dependencies import get_api_key
+from app.services.api_key_service import READ_LEADS, WRITE_LEADS
+from app.api.middleware import retry_after_header
 
 router = APIRouter()
 
-# Temp directory to save resumes locally
-# TODO switch to S3/GCS for production
-UPLOAD_DIRECTORY = "./uploads"
-os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+# Optional group commit: inserts arriving within a few milliseconds share one transaction
+LEAD_GROUP_COMMIT = os.getenv("LEAD_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+lead_writer = GroupCommitWriter(
+    AsyncSessionLocal,
+    max_delay=float(os.getenv("LEAD_GROUP_COMMIT_DELAY_MS", 5)) / 1000,
+    max_batch=int(os.getenv("LEAD_GROUP_COMMIT_MAX_BATCH", 200)),
+)
+
+# Public lead submissions allowed per client IP (enforced by RateLimitMiddleware), and per email domain
+LEAD_SUBMIT_IP_LIMIT = RateLimit.per_minute(
+    float(os.getenv("LEAD_SUBMIT_IP_PER_MINUTE", 10)), int(os.getenv("LEAD_SUBMIT_IP_BURST", 20))
+)
+LEAD_SUBMIT_DOMAIN_LIMIT = RateLimit.per_minute(
+    float(os.getenv("LEAD_SUBMIT_DOMAIN_PER_MINUTE", 120)), int(os.getenv("LEAD_SUBMIT_DOMAIN_BURST", 240))
+)
+# Request bodies accepted by the upload routes (enforced by RequestSizeLimitMiddleware):
+# the file's own cap, plus room for the other form fields and the multipart framing
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+MAX_BODY_BYTES = {
+    ("POST", "/api/v1/leads/"): RESUME_MAX_BYTES + UPLOAD_FORM_OVERHEAD_BYTES,
+    ("POST", "/api/v1/leads/import"): LEAD_IMPORT_MAX_BYTES + UPLOAD_FORM_OVERHEAD_BYTES,
+}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Rows fetched per round trip when streaming NDJSON
+STREAM_BATCH_SIZE = 1000
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+# Ranked results can't be keyset-paginated, so deep pages are capped instead
+MAX_SEARCH_OFFSET = 1000
 
 @router.post("/", response_model=Lead)
 async def create_lead(
-    background_tasks: BackgroundTasks,
     first_name: str = Form(...),
     last_name: str = Form(...),
     email: str = Form(...),
     resume: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+    db: AsyncSession = Depends(get_async_db),
+    store: ResumeStore = Depends(get_resume_store),
+    cache: ResponseCache = Depends(get_response_cache),
+    events: LeadEventBroker = Depends(get_lead_event_broker),
+    limiter: RateLimiter = Depends(get_rate_limiter)
 ):
     """
     Public endpoint to create a new lead.
     """
-    # Check if email already exists
-    db_lead = db.query(DBLead).filter(DBLead.email == email).first()
-    if db_lead:
+    # Validate (and normalize the email) before anything is stored
+    try:
+        lead_in = LeadBase(first_name=first_name, last_name=last_name, email=email)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    # Bursts spread over many IPs usually share a few email domains
+    domain = lead_in.email.rpartition("@")[2].lower()
+    retry_after = await limiter.acquire(f"email-domain:{domain}", LEAD_SUBMIT_DOMAIN_LIMIT)
+    if retry_after:
+        REQUESTS_REJECTED.labels("domain_rate_limit").inc()
+        raise HTTPException(status_code=429, detail="Too many requests; retry later.", headers=retry_after_header(retry_after))
+
+    # Stream the resume file into the resume store; the lead keeps its storage key
+    started = time.perf_counter()
+    try:
+        resume_path = await store.save(resume)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    record_resume_upload(type(store).__name__, resume.size, time.perf_counter() - started)
+
+    values = dict(lead_in.model_dump(), resume_path=resume_path)
+    # A client that disconnects mid-write must not leave a committed lead out of the
+    # cache and the event stream, so the write and its announcement finish regardless
+    commit = asyncio.ensure_future(_commit_lead(values, db, cache, events))
+    try:
+        lead = await asyncio.shield(commit)
+    except asyncio.CancelledError:
+        # Wait for it before the request's session is closed
+        await asyncio.wait([commit])
+        raise
+
+    if lead is None:
         raise HTTPException(status_code=400, detail="Email already registered.")
+    # The lead is searchable by name and email now; its resume text follows after the response
+    # (run `python -m app.cli.index_resumes` to catch up on any missed)
+    background_tasks.add_task(index_resume_text, AsyncSessionLocal, store, lead.id, resume_path)
+    return lead
+
+async def _commit_lead(values: dict, db: AsyncSession, cache: ResponseCache, events: LeadEventBroker) -> Optional[Lead]:
+    """
+    Commit a lead with its outbox emails, then drop cached lead pages and announce
+    it. Returns None if the email is taken.
+    """
+    # The lead and its outbox emails are committed together; the email worker sends them
+    if LEAD_GROUP_COMMIT:
+        row = await lead_writer.submit(partial(_insert_lead, values))
+    else:
+        row = await _insert_lead(values, db)
+        await db.commit()
+    if row is None:
+        return None
+    lead = Lead.model_validate(row)
+    await cache.bump(LEADS_CACHE_NAMESPACE)
+    publish_lead_created(events, lead)
+    return lead
+
+async def _insert_lead(values: dict, db: AsyncSession):
+    """
+    Insert a lead and queue its emails, or return None if the email is taken.
+    The caller (or the group-commit writer) commits.
+    """
+    row = await insert_lead_if_new(db, values)
+    if row is not None:
+        enqueue_new_lead_emails(db, row.id)
+        await search_index_for(db).index_leads(db, DBLead.id == row.id)
+    return row
+
+@router.post("/import", response_model=LeadImportReport, dependencies=[Security(get_api_key, scopes=[WRITE_LEADS])])
+async def import_lead_file(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, alias="format", pattern=f"^({'|'.join(IMPORT_FORMATS)})$"),
+    chunk_size: int = Query(LEAD_IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db),
+    cache: ResponseCache = Depends(get_response_cache),
+    events: LeadEventBroker = Depends(get_lead_event_broker)
+):
+    """
+    Authenticated endpoint to import many leads from a CSV (with a header row) or
+    NDJSON file. The format is taken from `format`, or else from the file name.
 
-    # Save the resume file to the upload directory
-    resume_path = os.path.join(UPLOAD_DIRECTORY, resume.filename)
-    with open(resume_path, "wb") as buffer:
-        shutil.copyfileobj(resume.file, buffer)
+    Leads are inserted in chunks of `chunk_size`; rows that are invalid or whose
+    email is already registered are skipped and listed in the report. Imported
+    leads have no resume and no emails are sent for them.
+    """
+    try:
+        fmt = file_format or detect_format(file.filename, file.content_type)
+    except UnsupportedImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Create Lead schema object
-    lead_in = LeadBase(first_name=first_name, last_name=last_name, email=email)
+    try:
+        report = await import_leads(db, read_records(file.file, fmt), chunk_size=chunk_size)
+    finally:
+        # Chunks are committed as they go, so even a failed import may have added leads
+        await cache.bump(LEADS_CACHE_NAMESPACE)
+    if report.imported:
+        publish_leads_imported(events, report.imported)
+    return report
 
-    # Create DB model instance
-    new_lead = DBLead(**lead_in.model_dump(), resume_path=resume_path)
-    db.add(new_lead)
-    db.commit()
-    db.refresh(new_lead)
-    
-    # Send emails in the background
-    background_tasks.add_task(send_new_lead_emails, new_lead)
-    
-    return new_lead
+@router.get("/search", response_model=List[LeadSearchHit], dependencies=[Security(get_api_key, scopes=[READ_LEADS])])
+async def search_leads(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Authenticated endpoint to search leads by name, email and resume text.
 
-@router.get("/", response_model=List[Lead], dependencies=[Depends(get_api_key)])
-def get_all_leads(db: Session = Depends(get_db)):
+    Every word of `q` must match the start of a word in the lead. Hits are
+    ranked best first; when there are more, `X-Next-Offset` holds the `offset`
+    of the next page.
     """
-    Authenticated endpoint to retrieve all leads.
+    rows = await search_index_for(db).search(db, q, limit=limit + 1, offset=offset)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return rows
+
+@router.get("/", response_model=List[Lead], dependencies=[Security(get_api_key, scopes=[READ_LEADS])])
+async def get_all_leads(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    state: Optional[LeadState] = None,
+    created_after: Optional[datetime] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    cache: ResponseCache = Depends(get_response_cache)
+):
     """
-    return db.query(DBLead).all()
+    Authenticated endpoint to retrieve leads ordered by creation time.
+
+    Results are keyset-paginated: when more rows are available the `X-Next-Cursor`
+    response header holds the cursor for the next page. With `stream=true` every
+    matching row after `cursor` is streamed as NDJSON instead.
+
+    Pages carry an ETag that changes whenever a lead is created or changes state;
+    a poll sending it back in If-None-Match gets a 304 without touching the database.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if stream:
+        query = build_leads_query(state=state, created_after=created_after, after=after, limit=limit)
+        return StreamingResponse(_stream_leads_ndjson(query), media_type="application/x-ndjson")
+
+    async def build_page() -> CachedResponse:
+        page_size = limit or DEFAULT_PAGE_SIZE
+        # Fetch one extra row to find out whether there is a next page
+        query = build_leads_query(state=state, created_after=created_after, after=after, limit=page_size + 1)
+        rows = (await db.execute(query)).all()
+
+        headers = {}
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
 
-@router.patch("/{lead_id}/state", response_model=Lead, dependencies=[Depends(get_api_key)])
-def update_lead_state(
+        return CachedResponse(body=dump_lead_rows(rows), headers=headers)
+
+    return await cached_json_response(cache, LEADS_CACHE_NAMESPACE, request, build_page)
+
+@router.get("/events", dependencies=[Security(get_api_key, scopes=[READ_LEADS])])
+async def lead_events(
+    last_event_id: Optional[str] = Header(None),
+    events: LeadEventBroker = Depends(get_lead_event_broker)
+):
+    """
+    Authenticated Server-Sent Events stream of lead changes: `lead.created`
+    with the new lead, `lead.state_changed` with its id, state and version, and
+    `leads.imported` with a count. A client reconnecting with `Last-Event-ID`
+    gets the events it missed, or a `reset` event if they are gone, after which
+    it should refetch the list.
+    """
+    return StreamingResponse(
+        events.stream(last_event_id),
+        media_type="text/event-stream",
+        # Stop reverse proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _stream_leads_ndjson(query):
+    """
+    Yield leads as NDJSON lines from a server-side cursor, so memory use does not
+    grow with the size of the result.
+
+    The generator owns its session because it outlives the request's dependencies.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield dump_lead_rows_ndjson(rows)
+
+@router.patch("/state", response_model=LeadBulkUpdateResult, dependencies=[Security(get_api_key, scopes=[WRITE_LEADS])])
+async def update_lead_states(
+    bulk_update: LeadBulkUpdateState,
+    db: AsyncSession = Depends(get_async_db),
+    cache: ResponseCache = Depends(get_response_cache),
+    events: LeadEventBroker = Depends(get_lead_event_broker)
+):
+    """
+    Authenticated endpoint to move many leads to one state at once.
+
+    Each lead moves only if the state machine allows it from its current state,
+    and, when a `version` is given, only if the lead is still at that version.
+    Leads that cannot move are listed in `failed`, and those already in the state
+    in `unchanged`; the others are committed. Each lead may be listed only once.
+    """
+    updated, unchanged, failed = await transition_leads(
+        db, [(ref.id, ref.version) for ref in bulk_update.leads], bulk_update.state
+    )
+    await db.commit()
+    if updated:
+        await cache.bump(LEADS_CACHE_NAMESPACE)
+        publish_state_changes(events, updated)
+    return LeadBulkUpdateResult(updated=updated, unchanged=unchanged, failed=failed)
+
+@router.patch("/{lead_id}/state", response_model=Lead, dependencies=[Security(get_api_key, scopes=[WRITE_LEADS])])
+async def update_lead_state(
     lead_id: int,
     lead_update: LeadUpdateState,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    cache: ResponseCache = Depends(get_response_cache),
+    events: LeadEventBroker = Depends(get_lead_event_broker)
 ):
     """
     Authenticated endpoint to update a lead's state.
     """
-    db_lead = db.query(DBLead).filter(DBLead.id == lead_id).first()
-    if not db_lead:
-        raise HTTPException(status_code=404, detail="Lead not found")
-        
-    db_lead.state = lead_update.state
-    db.commit()
-    db.refresh(db_lead)
-    return db_lead
\ No newline at end of file
+    updated, unchanged, failed = await transition_leads(db, [(lead_id, lead_update.version)], lead_update.state)
+    if failed:
+        status_code = 404 if failed[0].reason == LeadTransitionFailure.NOT_FOUND else 409
+        raise HTTPException(status_code=status_code, detail=failed[0].detail)
+    if unchanged:
+        return unchanged[0]
+
+    await db.commit()
+    await cache.bump(LEADS_CACHE_NAMESPACE)
+    publish_state_changes(events, updated)
+    return updated[0]
+
+@router.get("/{lead_id}/resume", dependencies=[Security(get_api_key, scopes=[READ_LEADS])])
+async def get_lead_resume(
+    lead_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    store: ResumeStore = Depends(get_resume_store)
+):
+    """
+    Authenticated endpoint to download a lead's resume. Redirects to a presigned
+    URL when the store supports one, otherwise streams the file.
+    """
+    resume_path = (await db.execute(select(DBLead.resume_path).where(DBLead.id == lead_id))).scalar()
+    if not resume_path:
+        raise HTTPException(status_code=404, detail="Resume not found")
+
+    url = await store.url(resume_path)
+    if url:
+        return RedirectResponse(url, status_code=307)
+
+    chunks = store.open(resume_path)
+    try:
+        first_chunk = await anext(chunks)
+    except ResumeNotFoundError:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    except StopAsyncIteration:
+        first_chunk = b""
+
+    async def body():
+        yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+
+    media_type = mimetypes.guess_type(resume_path)[0] or "application/octet-stream"
+    return StreamingResponse(body(), media_type=media_type)
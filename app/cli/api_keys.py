@@ -0,0 +1,65 @@
+"""
+Issue, list and revoke API keys:
+
+    python -m app.cli.api_keys create "Jane Attorney" [--scopes leads:read,leads:write] [--expires-days 90]
+    python -m app.cli.api_keys list
+    python -m app.cli.api_keys revoke KEY_ID
+
+Only a hash of each key is stored, so `create` prints the key once. With
+API_KEY_REVOCATION_BACKEND=redis, a revoked key stops working on every worker at
+once; otherwise within API_KEY_CACHE_TTL_SECONDS.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.db.migrations import run_migrations
+from app.services.api_key_service import ALL_SCOPES, get_api_key_store
+
+
+async def run(args) -> int:
+    store = get_api_key_store()
+    try:
+        if args.command == "create":
+            expires_at = None
+            if args.expires_days:
+                expires_at = datetime.now(timezone.utc) + timedelta(days=args.expires_days)
+            try:
+                key, identity = await store.create(args.name, args.scopes.split(","), expires_at)
+            except ValueError as e:
+                print(e)
+                return 2
+            print(f"Created key {identity.id} for {identity.name} ({' '.join(sorted(identity.scopes))}):")
+            print(key)
+        elif args.command == "list":
+            for row in await store.list_keys():
+                status = "revoked" if row.revoked_at else f"expires {row.expires_at:%Y-%m-%d}" if row.expires_at else "active"
+                print(f"{row.id:>5}  {row.key_prefix}...  {row.name}  [{row.scopes}]  {status}")
+        else:
+            if not await store.revoke(args.key_id):
+                print(f"No active key with id {args.key_id}.")
+                return 1
+            print(f"Revoked key {args.key_id}.")
+        return 0
+    finally:
+        await store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage API keys.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="issue a new key")
+    create.add_argument("name", help="who the key is for")
+    create.add_argument("--scopes", default=",".join(sorted(ALL_SCOPES)))
+    create.add_argument("--expires-days", type=float)
+    commands.add_parser("list", help="list every key")
+    revoke = commands.add_parser("revoke", help="revoke a key")
+    revoke.add_argument("key_id", type=int)
+    args = parser.parse_args(argv)
+
+    run_migrations()
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Bulk-import leads from a CSV (with a header row) or NDJSON file:
+
+    python -m app.cli.import_leads partner_leads.csv [--format csv] [--chunk-size 1000]
+
+Prints the import report as JSON and exits with status 1 if any row was rejected.
+"""
+import argparse
+import asyncio
+import sys
+
+from app.db.migrations import run_migrations
+from app.db.session import AsyncSessionLocal
+from app.services.cache_service import get_response_cache, LEADS_CACHE_NAMESPACE
+from app.services.import_service import (
+    detect_format, import_leads, read_records, IMPORT_FORMATS, LEAD_IMPORT_CHUNK_SIZE
+)
+from app.services.lead_event_service import get_lead_event_broker, publish_leads_imported
+
+
+async def run(path: str, fmt: str, chunk_size: int):
+    cache = get_response_cache()
+    try:
+        with open(path, "rb") as f:
+            async with AsyncSessionLocal() as db:
+                report = await import_leads(db, read_records(f, fmt), chunk_size=chunk_size)
+    finally:
+        # As the /import endpoint does: chunks are committed as they go, so even a failed import may have added leads
+        await cache.bump(LEADS_CACHE_NAMESPACE)
+    if report.imported:
+        publish_leads_imported(get_lead_event_broker(), report.imported)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-import leads from a CSV or NDJSON file.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=LEAD_IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    run_migrations()
+    report = asyncio.run(run(args.path, fmt, args.chunk_size))
+    print(report.model_dump_json(indent=2))
+    print(f"Imported {report.imported} of {report.processed} rows, {report.failed} rejected.", file=sys.stderr)
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
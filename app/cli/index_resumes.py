@@ -0,0 +1,43 @@
+"""
+Extract and index the text of every resume that is not in the search index yet,
+e.g. after a restart interrupted the extraction that follows `create_lead`:
+
+    python -m app.cli.index_resumes [--batch-size 100]
+"""
+import argparse
+import asyncio
+import logging
+
+from app.db.migrations import run_migrations
+from app.db.session import AsyncSessionLocal
+from app.services.resume_text_service import index_resume_text
+from app.services.search_service import search_index_for
+from app.services.storage_service import get_resume_store
+
+
+async def run(batch_size: int) -> int:
+    store = get_resume_store()
+    indexed, after_id = 0, 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            pending = await search_index_for(db).leads_missing_resume_text(db, after_id, batch_size)
+        if not pending:
+            return indexed
+        for lead_id, key in pending:
+            await index_resume_text(AsyncSessionLocal, store, lead_id, key)
+        indexed += len(pending)
+        after_id = pending[-1][0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index the text of resumes missing from the search index.")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    run_migrations()
+    print(f"Indexed {asyncio.run(run(args.batch_size))} resumes.")
+
+
+if __name__ == "__main__":
+    main()
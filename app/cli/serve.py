@@ -0,0 +1,85 @@
+"""
+Serve the API with several worker processes:
+
+    python -m app.cli.serve [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+The schema is migrated once, here, before any worker starts. Each worker then
+builds its own app with `app.main.create_app` and leaves migrations alone, so
+workers don't race on schema changes or wait on each other's locks.
+
+Some state is kept in each worker unless a shared backend is configured; with
+more than one worker, serve says which settings that affects before starting.
+"""
+import argparse
+import logging
+import os
+from typing import List
+
+import uvicorn
+
+from app.db.migrations import run_migrations
+from app.services import api_key_service, rate_limit_service
+
+# One worker unless set: lead events are only seen by subscribers of the worker that published them
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+# Seconds workers get to finish requests on shutdown; open event streams never finish by themselves
+GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", 10))
+
+
+def per_worker_state_warnings(workers: int) -> List[str]:
+    """
+    What behaves differently with `workers` processes because it is kept in
+    each one's memory. Empty for a single worker.
+    """
+    if workers <= 1:
+        return []
+    warnings = [
+        "Lead events are published in-process, so an event stream only carries changes made "
+        "through its own worker, and a client resuming with Last-Event-ID on another worker is reset."
+    ]
+    if rate_limit_service.RATE_LIMIT_BACKEND != "redis":
+        warnings.append(
+            f"RATE_LIMIT_BACKEND={rate_limit_service.RATE_LIMIT_BACKEND} counts requests in each worker, "
+            f"so clients get up to {workers} times their limit. Set RATE_LIMIT_BACKEND=redis to share it."
+        )
+    if api_key_service.API_KEY_REVOCATION_BACKEND != "redis":
+        warnings.append(
+            f"API_KEY_REVOCATION_BACKEND={api_key_service.API_KEY_REVOCATION_BACKEND}: a revoked key keeps "
+            f"working on other workers for up to API_KEY_CACHE_TTL_SECONDS "
+            f"({api_key_service.API_KEY_CACHE_TTL_SECONDS:g}s). Set it to redis to revoke keys everywhere at once."
+        )
+    return warnings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate the database once, then serve the API with N workers.")
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logger = logging.getLogger(__name__)
+    for warning in per_worker_state_warnings(args.workers):
+        logger.warning(warning)
+    applied = run_migrations()
+    logger.info("Applied %d migrations before starting %d workers.", len(applied), args.workers)
+
+    # Workers are started fresh, and read this from the environment they inherit
+    os.environ["MIGRATE_ON_STARTUP"] = "false"
+    uvicorn.run(
+        "app.main:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        access_log=args.access_log,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
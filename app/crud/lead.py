@@ -0,0 +1,124 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import Row, Select, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.timestamps import to_naive_utc
+from app.models.lead import Lead as DBLead
+from app.schemas.lead import LeadState
+
+# Columns returned by the list endpoints. Selecting these explicitly (instead of
+# the whole ORM entity) skips identity-map bookkeeping for every row.
+LEAD_LIST_COLUMNS = (
+    DBLead.id,
+    DBLead.first_name,
+    DBLead.last_name,
+    DBLead.email,
+    DBLead.resume_path,
+    DBLead.state,
+    DBLead.version,
+    DBLead.created_at,
+)
+
+
+def dump_lead_rows(rows: Iterable[Row]) -> bytes:
+    """
+    Rows of LEAD_LIST_COLUMNS as a JSON array in the shape of `List[Lead]`.
+    The values come typed from the database, so they are encoded with orjson
+    as they are instead of being validated into models first.
+    """
+    return orjson.dumps([row._asdict() for row in rows])
+
+
+def dump_lead_rows_ndjson(rows: Iterable[Row]) -> bytes:
+    """
+    Like `dump_lead_rows`, with one lead per line.
+    """
+    return b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(created_at: datetime, lead_id: int) -> str:
+    """
+    Encode the (created_at, id) keyset position of a row into an opaque cursor.
+    """
+    payload = json.dumps([created_at.isoformat(), lead_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by `encode_cursor`.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, lead_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(lead_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor.") from e
+
+
+def build_leads_query(
+    state: Optional[LeadState] = None,
+    created_after: Optional[datetime] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+) -> Select:
+    """
+    Build the keyset-paginated list query, ordered by (created_at, id).
+
+    `after` is the decoded cursor of the last row of the previous page.
+    """
+    query = select(*LEAD_LIST_COLUMNS)
+
+    if state is not None:
+        query = query.where(DBLead.state == state)
+    if created_after is not None:
+        query = query.where(DBLead.created_at > to_naive_utc(created_after))
+    if after is not None:
+        created_at, lead_id = after
+        query = query.where(
+            tuple_(DBLead.created_at, DBLead.id) > tuple_(to_naive_utc(created_at), lead_id)
+        )
+
+    query = query.order_by(DBLead.created_at, DBLead.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+async def insert_lead_if_new(db: AsyncSession, values: Dict[str, Any]) -> Optional[Row]:
+    """
+    Insert a lead in one round trip with INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+    Returns the new row (as LEAD_LIST_COLUMNS), or None if the email is already
+    registered. Unlike check-then-insert this cannot race with a concurrent
+    submission of the same email.
+    """
+    statement = _insert(db)(DBLead).values(**values).on_conflict_do_nothing().returning(*LEAD_LIST_COLUMNS)
+    return (await db.execute(statement)).first()
+
+
+async def insert_leads_if_new(db: AsyncSession, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Bulk version of `insert_lead_if_new`: one executemany INSERT ... ON CONFLICT
+    DO NOTHING RETURNING (sent as a few multi-row statements). Returns the ids of
+    the inserted leads by email; the other emails were already registered.
+    """
+    if not rows:
+        return {}
+    statement = _insert(db)(DBLead).on_conflict_do_nothing().returning(DBLead.email, DBLead.id)
+    return {email: lead_id for email, lead_id in await db.execute(statement, rows)}
+
+
+def _insert(db: AsyncSession):
+    # The dialect-specific insert that supports ON CONFLICT
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+# A unit of work receives the shared session and returns the value handed back to its submitter
+WriteUnit = Callable[[AsyncSession], Awaitable[Any]]
+
+logger = logging.getLogger(__name__)
+
+# Queued by `stop` to tell the background task to exit after flushing
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Coalesces writes that arrive within `max_delay` seconds of each other into one
+    transaction, so a burst of submissions pays for one commit (and one fsync)
+    instead of one each.
+
+    Every unit runs inside its own SAVEPOINT: a unit that raises (e.g. on a unique
+    constraint) is rolled back and its submitter gets the exception, while the
+    rest of the batch still commits. A unit whose submitter was cancelled before
+    the batch started is skipped; once the batch has started it may still be
+    committed, so callers with follow-up work should shield it.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, max_delay: float = 0.005, max_batch: int = 200):
+        self.session_factory = session_factory
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._queue: "asyncio.Queue[Tuple[WriteUnit, asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, unit: WriteUnit) -> Any:
+        """
+        Queue a unit of work and wait until the batch containing it is committed.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((unit, future))
+        return await future
+
+    async def stop(self):
+        """
+        Commit whatever is already queued and stop the background task.
+        """
+        if self._task is None or self._task.done():
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[WriteUnit, asyncio.Future]] = []
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _STOP:
+                    return
+                batch = [item]
+                stopping = False
+                deadline = loop.time() + self.max_delay
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                try:
+                    await self._flush(batch)
+                except Exception:
+                    # The batch's submitters have been told; keep serving the next ones
+                    logger.exception("Group commit of %d units failed", len(batch))
+                batch = []
+                if stopping:
+                    return
+        except BaseException:
+            # Cancelled (e.g. the event loop is shutting down): nobody may wait on a unit that will never run
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not _STOP:
+                    batch.append(item)
+            _fail_pending(batch, RuntimeError("The group-commit writer stopped"))
+            raise
+
+    async def _flush(self, batch: List[Tuple[WriteUnit, asyncio.Future]]):
+        outcomes = []
+        try:
+            async with self.session_factory() as session:
+                for unit, future in batch:
+                    if future.done():
+                        continue
+                    try:
+                        async with session.begin_nested():
+                            outcomes.append((future, await unit(session), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+                try:
+                    await session.commit()
+                except Exception as e:
+                    outcomes = [(future, None, e) for future, _, _ in outcomes]
+
+            for future, result, error in outcomes:
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+        except BaseException as e:
+            # Whatever went wrong (opening the session, a cancelled task), no submitter is left waiting
+            _fail_pending(batch, e if isinstance(e, Exception) else RuntimeError("The group commit was interrupted"))
+            raise
+
+
+def _fail_pending(batch: List[Tuple[WriteUnit, asyncio.Future]], error: Exception):
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
@@ -0,0 +1,33 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services.metrics_service import DB_QUERY_SECONDS, current_query_stats
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """
+    Time every statement an engine executes, and charge it to the request being
+    served, if any. For an async engine pass `async_engine.sync_engine`.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started_at"].pop()
+        DB_QUERY_SECONDS.labels(statement.lstrip()[:6].upper()).observe(seconds)
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.record(statement, seconds)
+
+    @event.listens_for(engine, "handle_error")
+    def discard_timer(context):
+        # A failed statement never reaches after_cursor_execute
+        started = context.connection.info.get("query_started_at") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    return engine
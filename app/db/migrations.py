@@ -0,0 +1,164 @@
+"""
+Schema migrations. Tables that don't exist yet are created from the models;
+changes to existing tables are applied by the migrations below, in order, each
+in its own transaction, and recorded in `schema_migrations`.
+
+    python -m app.db.migrations
+"""
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Engine, MetaData, String, Table, inspect, select, text, true
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex
+
+from app.db.session import create_sync_engine
+from app.db.timestamps import utcnow
+from app.models.lead import Base, Lead as DBLead
+from app.models import api_key  # noqa: F401 -- registers the API key table with Base
+from app.models import cache_version  # noqa: F401 -- registers the cache version table with Base
+from app.models import email_outbox  # noqa: F401 -- registers the outbox table with Base
+from app.models import lead_state_history  # noqa: F401 -- registers the history table with Base
+from app.schemas.lead import LeadState
+from app.services.cache_service import LEADS_CACHE_NAMESPACE
+from app.services.search_service import get_search_index
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+_SEARCH_TABLES = {"sqlite": "leads_fts", "postgresql": "lead_search"}
+
+
+def _create_lead_index(conn: Connection, name: str):
+    index = next(index for index in DBLead.__table__.indexes if index.name == name)
+    conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _add_lead_version(conn: Connection):
+    columns = {column["name"] for column in inspect(conn).get_columns("leads")}
+    if "version" not in columns:
+        conn.execute(text("ALTER TABLE leads ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+    if conn.dialect.name == "postgresql":
+        # Postgres stores LeadState as a native enum that only knows the original states
+        for state in LeadState:
+            conn.execute(text(f"ALTER TYPE leadstate ADD VALUE IF NOT EXISTS '{state.value}'"))
+    _create_lead_index(conn, "ux_leads_email_lower")
+
+
+def _rework_lead_indexes(conn: Connection):
+    # Nothing filters or sorts on names, and the primary key is already indexed
+    for name in ("ix_leads_first_name", "ix_leads_last_name", "ix_leads_id"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    _create_lead_index(conn, "ix_leads_created_at_id")
+    _create_lead_index(conn, "ix_leads_state_created_at_id")
+
+
+def _drop_email_index(conn: Connection):
+    # ux_leads_email_lower already enforces uniqueness (case-insensitively), so
+    # the plain unique index only doubled the cost of every insert
+    conn.execute(text("DROP INDEX IF EXISTS ix_leads_email"))
+
+
+def _add_lead_search(conn: Connection):
+    # Full-text search lives in dialect-specific structures the models can't describe
+    created = not inspect(conn).has_table(_SEARCH_TABLES[conn.dialect.name])
+    if conn.dialect.name == "sqlite":
+        # Prefix indexes let "term*" queries read one posting list instead of merging many
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS leads_fts USING fts5("
+            "first_name, last_name, email, resume_text, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4 5 6')"
+        ))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS lead_search ("
+            "lead_id INTEGER PRIMARY KEY REFERENCES leads (id), resume_text TEXT, document TSVECTOR NOT NULL)"
+        ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_lead_search_document ON lead_search USING GIN (document)"))
+    if created:
+        # Existing leads become searchable by name and email; `python -m app.cli.index_resumes` adds their resumes
+        conn.execute(get_search_index(conn.dialect.name).index_statement(true()))
+
+
+def _add_cache_versions(conn: Connection):
+    # Every write to leads, by the API or anything else, bumps the leads version in
+    # its own transaction, so cached pages can't outlive the data they were built from
+    conn.execute(
+        text("INSERT INTO cache_versions (namespace, version) VALUES (:namespace, 0) ON CONFLICT DO NOTHING"),
+        {"namespace": LEADS_CACHE_NAMESPACE},
+    )
+    bump = f"UPDATE cache_versions SET version = version + 1 WHERE namespace = '{LEADS_CACHE_NAMESPACE}';"
+    if conn.dialect.name == "sqlite":
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS leads_cache_version_{operation.lower()} "
+                f"AFTER {operation} ON leads BEGIN {bump} END"
+            ))
+    elif conn.dialect.name == "postgresql":
+        # Once per statement, so an import chunk bumps the version once rather than per row
+        conn.execute(text(
+            "CREATE OR REPLACE FUNCTION bump_leads_cache_version() RETURNS trigger LANGUAGE plpgsql AS "
+            f"$$ BEGIN {bump} RETURN NULL; END $$"
+        ))
+        conn.execute(text("DROP TRIGGER IF EXISTS leads_cache_version ON leads"))
+        conn.execute(text(
+            "CREATE TRIGGER leads_cache_version AFTER INSERT OR UPDATE OR DELETE ON leads "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_leads_cache_version()"
+        ))
+
+
+# (version, migration) in the order they are applied. Migrations must also be
+# safe to run on a database the current models just created.
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_lead_version", _add_lead_version),
+    ("0002_lead_indexes", _rework_lead_indexes),
+    ("0003_lead_search", _add_lead_search),
+    ("0004_drop_email_index", _drop_email_index),
+    ("0005_cache_versions", _add_cache_versions),
+]
+
+
+def migrate(conn: Connection) -> List[str]:
+    """
+    Create missing tables and apply pending migrations on `conn`, committing
+    after each one. Returns the versions applied.
+    """
+    Base.metadata.create_all(conn)
+    schema_migrations.create(conn, checkfirst=True)
+    applied_versions = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    conn.commit()
+
+    applied = []
+    for version, migration in MIGRATIONS:
+        if version in applied_versions:
+            continue
+        migration(conn)
+        conn.execute(schema_migrations.insert().values(version=version, applied_at=utcnow()))
+        conn.commit()
+        applied.append(version)
+    return applied
+
+
+def run_migrations(engine: Optional[Engine] = None) -> List[str]:
+    """
+    `migrate` on a connection of its own, from `engine` or else a sync engine
+    on DATABASE_URL that is disposed of afterwards. Async engines can run
+    `migrate` with `AsyncConnection.run_sync`.
+    """
+    if engine is None:
+        sync_engine = create_sync_engine()
+        try:
+            return run_migrations(sync_engine)
+        finally:
+            sync_engine.dispose()
+    with engine.connect() as conn:
+        return migrate(conn)
+
+
+if __name__ == "__main__":
+    applied = run_migrations()
+    print(f"Applied {len(applied)} migrations: {', '.join(applied)}" if applied else "Schema is up to date.")
@@ -0,0 +1,53 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Connection pragmas applied to every SQLite connection, loaded from .env.
+# WAL lets readers run alongside the single writer, and synchronous=NORMAL only
+# fsyncs at checkpoints, which is safe in WAL mode.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# Negative values are in KiB, so the default is a 64 MiB page cache
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64000))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+# How long a writer waits for the lock before failing with "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+
+def configure_sqlite_engine(
+    engine: Engine,
+    journal_mode: str = SQLITE_JOURNAL_MODE,
+    synchronous: str = SQLITE_SYNCHRONOUS,
+    cache_size: int = SQLITE_CACHE_SIZE,
+    mmap_size: int = SQLITE_MMAP_SIZE,
+    busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS,
+) -> Engine:
+    """
+    Apply performance pragmas to every new connection of a SQLite engine.
+
+    Also hands transaction control to SQLAlchemy instead of the sqlite3 driver,
+    which otherwise delays BEGIN and breaks SAVEPOINT support. For an async engine
+    pass `async_engine.sync_engine`.
+    """
+    pragmas = (
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA cache_size={cache_size}",
+        f"PRAGMA mmap_size={mmap_size}",
+        f"PRAGMA busy_timeout={busy_timeout_ms}",
+        "PRAGMA temp_store=MEMORY",
+    )
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
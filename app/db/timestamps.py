@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+
+# Timestamp columns are `timestamp without time zone` holding UTC. SQLite takes
+# aware datetimes there, but asyncpg rejects them, so everything written goes
+# through these helpers.
+
+
+def utcnow() -> datetime:
+    """
+    The current time as naive UTC, the way timestamp columns store it.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """
+    Timestamps are stored as naive UTC, so aware inputs are converted before comparing.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
@@ -1,17 +1,84 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Response
+from app.api.middleware import (
+    AdmissionControlMiddleware, MetricsMiddleware, RateLimitMiddleware, RequestSizeLimitMiddleware
+)
 from app.api.v1 import leads
-from app.db.session import engine
-from app.models.lead import Base
-from dotenv import load_dotenv
+from app.db.session import async_engine
+from app.db.migrations import run_migrations
+from app.services.api_key_service import close_api_key_store, get_api_key_store
+from app.services.cache_service import close_response_cache
+from app.services.metrics_service import render_metrics
+from app.services.rate_limit_service import ADMISSION_MAX_CONCURRENT, close_rate_limiter
+from app.services.storage_service import close_resume_store, get_resume_store
+from app.services.template_service import get_email_templates
 
-load_dotenv()
+# Bring the schema up to date when the app starts. Turn this off when several
+# workers share a database, and migrate once before starting them (app.serve does).
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Per-worker resources: created before the first request, released on shutdown.
+    """
+    if MIGRATE_ON_STARTUP:
+        run_migrations()
+    # Compile the email templates and open the resume store before the first lead comes in
+    get_email_templates().warm()
+    get_resume_store()
+    revocations = asyncio.create_task(get_api_key_store().listen_for_revocations())
+    yield
+    revocations.cancel()
+    with suppress(asyncio.CancelledError):
+        await revocations
+    # Commit any inserts still waiting in the group-commit writer
+    await leads.lead_writer.stop()
+    # Only then close the clients those inserts use (the cache bump), and the rest
+    await close_response_cache()
+    await close_rate_limiter()
+    await close_api_key_store()
+    await close_resume_store()
+    await async_engine.dispose()
 
-app = FastAPI(title="Lead Management API")
+def read_root():
+    return {"message": "Welcome to the Lead Management API"}
 
-app.include_router(leads.router, prefix="/api/v1/leads", tags=["leads"])
+def metrics():
+    """
+    Request, database, email and upload metrics in Prometheus' text format.
+    """
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
 
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to the Lead Management API"}
\ No newline at end of file
+def create_app() -> FastAPI:
+    """
+    Build the API. Nothing is connected or written until the app's lifespan starts,
+    so each worker process can call this independently.
+    """
+    app = FastAPI(title="Lead Management API", lifespan=lifespan)
+    # The last middleware added runs first: metrics see every response, and rate-limited
+    # clients and oversized uploads are turned away before they can take a place in the admission queue
+    if ADMISSION_MAX_CONCURRENT > 0:
+        app.add_middleware(
+            AdmissionControlMiddleware, exempt_paths=["/metrics", "/api/v1/leads/events"]
+        )
+    app.add_middleware(RequestSizeLimitMiddleware, limits=leads.MAX_BODY_BYTES)
+    app.add_middleware(RateLimitMiddleware, limits={("POST", "/api/v1/leads/"): leads.LEAD_SUBMIT_IP_LIMIT})
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(leads.router, prefix="/api/v1/leads", tags=["leads"])
+    app.add_api_route("/", read_root, methods=["GET"])
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+    return app
+
+def __getattr__(name: str):
+    # `uvicorn app.main:app` gets an app built on first use, so workers started
+    # with `--factory app.main:create_app` (as app.cli.serve does) build only their own
+    global app
+    if name == "app":
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.db.timestamps import utcnow
+from app.models.lead import Base
+
+class ApiKey(Base):
+    """
+    An API key, stored only as the SHA-256 of the key. `scopes` is a space-separated
+    list of what the key may do, e.g. "leads:read leads:write".
+    """
+    __tablename__ = "api_keys"
+
+    id = Column(Integer, primary_key=True)
+    # Who or what the key was issued to, e.g. an attorney's name
+    name = Column(String, nullable=False)
+    key_hash = Column(String(64), nullable=False, unique=True)
+    # The start of the key, so a key seen in a log can be matched to its row
+    key_prefix = Column(String, nullable=False)
+    scopes = Column(String, nullable=False, default="")
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+    expires_at = Column(DateTime)
+    revoked_at = Column(DateTime)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String
+from app.models.lead import Base
+
+class CacheVersion(Base):
+    """
+    The version of each response cache namespace. Database triggers bump a
+    namespace's row in the same transaction as every write to its tables (see
+    the 0005_cache_versions migration), so cached responses are invalidated by
+    any writer, not just the API.
+    """
+    __tablename__ = "cache_versions"
+
+    namespace = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
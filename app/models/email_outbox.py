@@ -0,0 +1,39 @@
+import enum
+from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Index
+from app.db.timestamps import utcnow
+from app.models.lead import Base
+
+class EmailKind(str, enum.Enum):
+    PROSPECT_CONFIRMATION = "PROSPECT_CONFIRMATION"
+    ATTORNEY_NOTIFICATION = "ATTORNEY_NOTIFICATION"
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    SENDING = "SENDING"
+    SENT = "SENT"
+    # Gave up after too many failed attempts
+    DEAD = "DEAD"
+
+class EmailOutbox(Base):
+    """
+    An email waiting to be sent by the outbox worker. Rows are written in the same
+    transaction as the lead they belong to, so no email is lost on a restart.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    lead_id = Column(Integer, ForeignKey("leads.id"), nullable=False, index=True)
+    kind = Column(Enum(EmailKind), nullable=False)
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=utcnow, nullable=False)
+    # A SENDING row whose lease has expired belongs to a crashed worker and is retried
+    locked_until = Column(DateTime)
+    last_error = Column(String)
+    created_at = Column(DateTime, default=utcnow)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        # Serves the worker's "due rows" claim query
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Index, func
 from sqlalchemy.ext.declarative import declarative_base
-from datetime import datetime, timezone
+from app.db.timestamps import utcnow
 from app.schemas.lead import LeadState
 
 Base = declarative_base()
@@ -8,10 +8,24 @@ Base = declarative_base()
 class Lead(Base):
     __tablename__ = "leads"
 
-    id = Column(Integer, primary_key=True, index=True)
-    first_name = Column(String, index=True)
-    last_name = Column(String, index=True)
-    email = Column(String, unique=True,  nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    first_name = Column(String)
+    last_name = Column(String)
+    # Unique case-insensitively through ux_leads_email_lower below
+    email = Column(String, nullable=False)
     resume_path = Column(String)
     state = Column(Enum(LeadState), default=LeadState.PENDING, nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    # Bumped on every state change, for optimistic concurrency
+    version = Column(Integer, default=1, nullable=False)
+    created_at = Column(DateTime, default=utcnow)
+
+    __table_args__ = (
+        # Serves the keyset pagination order of GET /api/v1/leads/
+        Index("ix_leads_created_at_id", "created_at", "id"),
+        # Serves the same order filtered by state, e.g. the attorney's PENDING queue
+        Index("ix_leads_state_created_at_id", "state", "created_at", "id"),
+    )
+
+# Case-insensitive uniqueness, so rows stored before emails were lower-cased
+# still block a resubmission that differs only in case
+Index("ux_leads_email_lower", func.lower(Lead.email), unique=True)
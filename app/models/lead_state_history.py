@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Enum, DateTime, ForeignKey
+from app.db.timestamps import utcnow
+from app.models.lead import Base
+from app.schemas.lead import LeadState
+
+class LeadStateHistory(Base):
+    """
+    Append-only record of lead state transitions. Rows are only ever inserted,
+    in the same transaction as the transition they describe.
+    """
+    __tablename__ = "lead_state_history"
+
+    id = Column(Integer, primary_key=True)
+    lead_id = Column(Integer, ForeignKey("leads.id"), nullable=False, index=True)
+    from_state = Column(Enum(LeadState), nullable=False)
+    to_state = Column(Enum(LeadState), nullable=False)
+    # The lead's version after this transition
+    version = Column(Integer, nullable=False)
+    changed_at = Column(DateTime, default=utcnow, nullable=False)
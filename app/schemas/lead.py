@@ -1,24 +1,93 @@
 import enum
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 from datetime import datetime
+from typing import List, Optional
 
 class LeadState(str, enum.Enum):
     PENDING = "PENDING"
     REACHED_OUT = "REACHED_OUT"
+    QUALIFIED = "QUALIFIED"
+    RETAINED = "RETAINED"
+    REJECTED = "REJECTED"
 
 class LeadBase(BaseModel):
     first_name: str
     last_name: str
     email: EmailStr
 
+    @field_validator("email")
+    @classmethod
+    def normalize_email(cls, value: str) -> str:
+        # Emails are unique case-insensitively, so they are stored lower-cased
+        return value.lower()
+
 class LeadUpdateState(BaseModel):
     state: LeadState = LeadState.REACHED_OUT
+    # When given, the update only applies if the lead is still at this version
+    version: Optional[int] = None
 
-class Lead(LeadBase):
+class LeadVersionRef(BaseModel):
     id: int
-    resume_path: str
+    version: Optional[int] = None
+
+class LeadBulkUpdateState(BaseModel):
     state: LeadState
+    leads: List[LeadVersionRef] = Field(..., min_length=1, max_length=1000)
+
+    @field_validator("leads")
+    @classmethod
+    def unique_ids(cls, leads: List[LeadVersionRef]) -> List[LeadVersionRef]:
+        # Two refs to one lead (perhaps with different versions) can't both be honored
+        seen, duplicates = set(), set()
+        for ref in leads:
+            (duplicates if ref.id in seen else seen).add(ref.id)
+        if duplicates:
+            raise ValueError(f"Each lead may appear only once; repeated ids: {sorted(duplicates)}")
+        return leads
+
+class LeadTransitionFailure(str, enum.Enum):
+    NOT_FOUND = "NOT_FOUND"
+    VERSION_CONFLICT = "VERSION_CONFLICT"
+    NOT_ALLOWED = "NOT_ALLOWED"
+
+class LeadTransitionError(BaseModel):
+    id: int
+    reason: LeadTransitionFailure
+    detail: str
+
+class Lead(BaseModel):
+    # Read straight from ORM objects and result rows
+    model_config = ConfigDict(from_attributes=True)
+
+    first_name: str
+    last_name: str
+    # Validated and normalized by LeadBase on the way in, so not re-validated on the way out
+    email: str = Field(json_schema_extra={"format": "email"})
+    id: int
+    # Leads brought in by a bulk import have no resume
+    resume_path: Optional[str] = None
+    state: LeadState
+    version: int
     created_at: datetime
 
-    class Config:
-        orm_mode = True 
\ No newline at end of file
+class LeadSearchHit(Lead):
+    # Relevance of the hit; higher is better
+    score: float
+
+class LeadImportError(BaseModel):
+    # 1-based position of the record in the imported file
+    row: int
+    email: Optional[str] = None
+    error: str
+
+class LeadImportReport(BaseModel):
+    processed: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: List[LeadImportError] = []
+
+class LeadBulkUpdateResult(BaseModel):
+    updated: List[Lead] = []
+    # Leads that were already in the requested state
+    unchanged: List[Lead] = []
+    failed: List[LeadTransitionError] = []
@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, FrozenSet, Iterable, List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.session import AsyncSessionLocal
+from app.db.timestamps import to_naive_utc, utcnow
+from app.models.api_key import ApiKey
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis is only needed to broadcast revocations
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# The single shared key from before per-user keys. It keeps every scope, and only works when API_KEY is set.
+LEGACY_API_KEY = os.getenv("API_KEY") or None
+# How long a verified (or rejected) key is trusted without another database lookup
+API_KEY_CACHE_TTL_SECONDS = float(os.getenv("API_KEY_CACHE_TTL_SECONDS", 60))
+# Keys remembered by each worker. Rejected keys are cached too, so a client retrying a bad
+# key costs no lookups; every guess is a new key, though, so get_api_key limits lookups per client.
+API_KEY_CACHE_MAX_ENTRIES = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", 10_000))
+# How revocations reach other workers: "memory" (they notice within the cache TTL) or "redis" (at once)
+API_KEY_REVOCATION_BACKEND = os.getenv("API_KEY_REVOCATION_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+READ_LEADS = "leads:read"
+WRITE_LEADS = "leads:write"
+ALL_SCOPES = frozenset({READ_LEADS, WRITE_LEADS})
+
+# Issued keys start with this, so they are easy to spot in logs and secret scanners
+KEY_PREFIX = "lt_"
+REVOCATION_CHANNEL = "lead-tracker:api-key-revoked"
+
+
+@dataclass(frozen=True)
+class ApiKeyIdentity:
+    """Who a verified key belongs to and what it may do."""
+
+    id: Optional[int]
+    name: str
+    scopes: FrozenSet[str]
+    expires_at: Optional[datetime] = None
+
+    def expired(self, now: datetime) -> bool:
+        return self.expires_at is not None and self.expires_at <= now
+
+
+LEGACY_IDENTITY = ApiKeyIdentity(id=None, name="legacy API_KEY", scopes=ALL_SCOPES)
+
+
+def generate_api_key() -> str:
+    return KEY_PREFIX + secrets.token_urlsafe(32)
+
+
+def hash_api_key(key: str) -> str:
+    """
+    Keys are 256 random bits, so a fast hash is enough: there is nothing to
+    brute-force that would be easier than guessing the key itself.
+    """
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes; they were stored in UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _identity(row: ApiKey) -> ApiKeyIdentity:
+    return ApiKeyIdentity(
+        id=row.id, name=row.name, scopes=frozenset(row.scopes.split()), expires_at=_as_utc(row.expires_at)
+    )
+
+
+class ApiKeyCache:
+    """
+    Verification results by key hash, each kept for `ttl` seconds, least
+    recently used dropped beyond `max_entries`. None records a key that isn't valid.
+    """
+
+    def __init__(
+        self,
+        ttl: float = API_KEY_CACHE_TTL_SECONDS,
+        max_entries: int = API_KEY_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Optional[ApiKeyIdentity]]]" = OrderedDict()
+
+    def get(self, key_hash: str) -> Tuple[bool, Optional[ApiKeyIdentity]]:
+        """
+        (True, result) for a cached key, or (False, None) if it has to be looked up.
+        """
+        entry = self._entries.get(key_hash)
+        if entry is None:
+            return False, None
+        stored_at, identity = entry
+        if self.clock() - stored_at >= self.ttl:
+            del self._entries[key_hash]
+            return False, None
+        self._entries.move_to_end(key_hash)
+        return True, identity
+
+    def set(self, key_hash: str, identity: Optional[ApiKeyIdentity]):
+        self._entries[key_hash] = (self.clock(), identity)
+        self._entries.move_to_end(key_hash)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key_hash: str):
+        self._entries.pop(key_hash, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class ApiKeyStore:
+    """
+    Issues, verifies and revokes API keys kept as hashes in `api_keys`.
+
+    Verifying a key costs one SHA-256 and, at most once per cache TTL, one
+    indexed lookup. With a Redis client, revocations are published so every
+    worker drops the key from its cache at once (see `listen_for_revocations`);
+    without one, other workers stop accepting it within the TTL.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        cache: Optional[ApiKeyCache] = None,
+        legacy_key: Optional[str] = LEGACY_API_KEY,
+        redis_client=None,
+    ):
+        self.session_factory = session_factory
+        self.cache = cache or ApiKeyCache()
+        self.legacy_key = legacy_key.encode() if legacy_key else None
+        self.redis = redis_client
+
+    async def verify(
+        self, key: Optional[str], before_lookup: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> Optional[ApiKeyIdentity]:
+        """
+        The identity `key` belongs to, or None if it is unknown, expired or revoked.
+        `before_lookup` is awaited before a key that isn't cached is looked up in
+        the database, and may raise to refuse the lookup.
+        """
+        if not key:
+            return None
+        if self.legacy_key is not None and hmac.compare_digest(key.encode(), self.legacy_key):
+            return LEGACY_IDENTITY
+
+        key_hash = hash_api_key(key)
+        cached, identity = self.cache.get(key_hash)
+        if not cached:
+            if before_lookup is not None:
+                await before_lookup()
+            async with self.session_factory() as db:
+                row = (await db.execute(
+                    select(ApiKey).where(ApiKey.key_hash == key_hash, ApiKey.revoked_at.is_(None))
+                )).scalar_one_or_none()
+            identity = _identity(row) if row is not None else None
+            self.cache.set(key_hash, identity)
+
+        if identity is None or identity.expired(datetime.now(timezone.utc)):
+            return None
+        return identity
+
+    async def create(
+        self, name: str, scopes: Iterable[str], expires_at: Optional[datetime] = None
+    ) -> Tuple[str, ApiKeyIdentity]:
+        """
+        Issue a new key. Returns the key itself, which is not stored and can't be shown again.
+        """
+        scopes = frozenset(scopes)
+        unknown = scopes - ALL_SCOPES
+        if unknown:
+            raise ValueError(f"Unknown scopes: {', '.join(sorted(unknown))}")
+        key = generate_api_key()
+        row = ApiKey(
+            name=name, key_hash=hash_api_key(key), key_prefix=key[:len(KEY_PREFIX) + 6],
+            scopes=" ".join(sorted(scopes)), expires_at=to_naive_utc(expires_at) if expires_at else None,
+        )
+        async with self.session_factory() as db:
+            db.add(row)
+            await db.commit()
+        return key, _identity(row)
+
+    async def list_keys(self) -> List[ApiKey]:
+        async with self.session_factory() as db:
+            return list((await db.execute(select(ApiKey).order_by(ApiKey.id))).scalars())
+
+    async def revoke(self, key_id: int) -> bool:
+        """
+        Revoke a key and drop it from the verification caches. Returns False if
+        there is no such key, or it was already revoked.
+        """
+        async with self.session_factory() as db:
+            key_hash = (await db.execute(
+                update(ApiKey)
+                .where(ApiKey.id == key_id, ApiKey.revoked_at.is_(None))
+                .values(revoked_at=utcnow())
+                .returning(ApiKey.key_hash)
+            )).scalar_one_or_none()
+            await db.commit()
+        if key_hash is None:
+            return False
+        self.cache.invalidate(key_hash)
+        if self.redis is not None:
+            await self.redis.publish(REVOCATION_CHANNEL, key_hash)
+        return True
+
+    async def listen_for_revocations(self):
+        """
+        Drop keys revoked by any process from this worker's cache, until cancelled.
+        Reconnects if the subscription is lost.
+        """
+        if self.redis is None:
+            return
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(REVOCATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.cache.invalidate(message["data"].decode())
+            except redis.RedisError as e:
+                # Keys revoked meanwhile could still be cached, so start over
+                logger.warning("Lost the API key revocation channel, retrying: %s", e)
+                self.cache.clear()
+                await asyncio.sleep(1)
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.aclose()
+
+
+_api_key_store: Optional[ApiKeyStore] = None
+
+
+def get_api_key_store() -> ApiKeyStore:
+    """
+    The process-wide API key store, created on first use and shared by all requests.
+    """
+    global _api_key_store
+    if _api_key_store is None:
+        redis_client = None
+        if API_KEY_REVOCATION_BACKEND == "redis":
+            if redis is None:
+                raise RuntimeError("Broadcasting API key revocations requires redis: pip install redis")
+            redis_client = redis.Redis.from_url(REDIS_URL)
+        _api_key_store = ApiKeyStore(redis_client=redis_client)
+    return _api_key_store
+
+
+async def close_api_key_store():
+    """
+    Close the key store's Redis connections, if this process ever opened it.
+    """
+    global _api_key_store
+    if _api_key_store is not None:
+        await _api_key_store.close()
+        _api_key_store = None
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.session import AsyncSessionLocal
+from app.models.cache_version import CacheVersion
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis is only needed for the shared backend
+    redis = None
+
+# Which ResponseCache backs the read endpoints: "memory" (per worker) or "redis" (shared)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+# Responses kept by each worker's in-process cache
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+# How long the shared cache keeps a response nobody asks for
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 300))
+# How long each worker trusts a version read from the database before reading it again
+RESPONSE_CACHE_VERSION_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_VERSION_TTL_SECONDS", 1))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# The version counter bumped whenever a lead is created or changes
+LEADS_CACHE_NAMESPACE = "leads"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A serialized JSON response and the headers that go with it."""
+
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class ResponseCache(ABC):
+    """
+    Cached responses of read endpoints, keyed by a namespace's version counter.
+
+    Writers bump the counter after they commit; the version is part of every
+    ETag and cache key, so a bump invalidates the whole namespace at once and
+    stale entries are simply never read again.
+    """
+
+    @abstractmethod
+    async def version(self, namespace: str) -> int:
+        """
+        The current version of `namespace`; 0 until it is first bumped.
+        """
+
+    @abstractmethod
+    async def bump(self, namespace: str) -> int:
+        """
+        Invalidate every cached response in `namespace` and return its new version.
+        """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        The response cached under `key`, if any.
+        """
+
+    @abstractmethod
+    async def set(self, key: str, entry: CachedResponse):
+        """
+        Cache a response under `key`.
+        """
+
+    async def close(self):
+        """
+        Release any connections the cache holds.
+        """
+
+
+class MemoryResponseCache(ResponseCache):
+    """
+    A least-recently-used cache in the worker's memory. Its own versions are per
+    worker too; wrapped in DatabaseVersionedCache, every worker agrees on them.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._versions: Dict[str, int] = {}
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    async def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    async def bump(self, namespace: str) -> int:
+        self._versions[namespace] = self._versions.get(namespace, 0) + 1
+        return self._versions[namespace]
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CachedResponse):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisResponseCache(ResponseCache):
+    """
+    Versions and responses in Redis, shared by every worker. Responses expire
+    after `ttl` seconds; those of old versions are never read and age out.
+    """
+
+    def __init__(self, client, ttl: int = RESPONSE_CACHE_TTL_SECONDS, prefix: str = "lead-tracker"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def version(self, namespace: str) -> int:
+        return int(await self.client.get(f"{self.prefix}:version:{namespace}") or 0)
+
+    async def bump(self, namespace: str) -> int:
+        return await self.client.incr(f"{self.prefix}:version:{namespace}")
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        value = await self.client.get(f"{self.prefix}:response:{key}")
+        if value is None:
+            return None
+        headers, body = value.split(b"\n", 1)
+        return CachedResponse(body=body, headers=json.loads(headers))
+
+    async def set(self, key: str, entry: CachedResponse):
+        # The headers are JSON, which never contains a raw newline
+        value = json.dumps(entry.headers).encode() + b"\n" + entry.body
+        await self.client.set(f"{self.prefix}:response:{key}", value, ex=self.ttl)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class DatabaseVersionedCache(ResponseCache):
+    """
+    Wraps a ResponseCache so that its versions are the counters in
+    `cache_versions`. Database triggers bump them in the same transaction as
+    every write, whether it comes from any worker, the import command or SQL
+    run by hand.
+
+    A version read is trusted for `ttl` seconds, so polling costs each worker at
+    most one primary-key lookup per namespace per `ttl`. Writes made elsewhere
+    show within that time. `bump` reads the counter again at once, so a worker
+    always sees its own writes.
+    """
+
+    def __init__(
+        self,
+        cache: ResponseCache,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        ttl: float = RESPONSE_CACHE_VERSION_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.cache = cache
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.clock = clock
+        self._versions: Dict[str, Tuple[float, int]] = {}
+
+    async def version(self, namespace: str) -> int:
+        read = self._versions.get(namespace)
+        if read is not None and self.clock() - read[0] < self.ttl:
+            return read[1]
+        read_at = self.clock()
+        async with self.session_factory() as db:
+            version = (await db.execute(
+                select(CacheVersion.version).where(CacheVersion.namespace == namespace)
+            )).scalar() or 0
+        self._versions[namespace] = (read_at, version)
+        return version
+
+    async def bump(self, namespace: str) -> int:
+        # The triggers already counted the write; just stop trusting the old value
+        self._versions.pop(namespace, None)
+        return await self.version(namespace)
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        return await self.cache.get(key)
+
+    async def set(self, key: str, entry: CachedResponse):
+        await self.cache.set(key, entry)
+
+    async def close(self):
+        await self.cache.close()
+
+
+def etag_for(version: int, request: Request) -> str:
+    """
+    The ETag of a response to `request` at `version`. Query parameters are
+    sorted, so the same query in any order shares one entry.
+    """
+    query = "&".join(sorted(f"{name}={value}" for name, value in request.query_params.multi_items()))
+    digest = hashlib.sha256(f"{request.url.path}?{query}".encode()).hexdigest()[:32]
+    return f'"{version}-{digest}"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+async def cached_json_response(
+    cache: ResponseCache,
+    namespace: str,
+    request: Request,
+    build: Callable[[], Awaitable[CachedResponse]],
+) -> Response:
+    """
+    Answer `request` from `cache`, calling `build` only on a miss.
+
+    The version is read before `build` runs, so a write that commits meanwhile
+    can only make the cached body newer than its version, never older. A
+    matching If-None-Match gets a 304 after that one version lookup.
+    """
+    version = await cache.version(namespace)
+    etag = etag_for(version, request)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = f"{namespace}:{etag}"
+    entry = await cache.get(key)
+    if entry is None:
+        entry = await build()
+        await cache.set(key, entry)
+    return Response(entry.body, media_type="application/json", headers={**entry.headers, **headers})
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    The configured response cache, created on first use and shared by all
+    requests. Its versions come from the database either way.
+    """
+    global _response_cache
+    if _response_cache is None:
+        if RESPONSE_CACHE_BACKEND == "redis":
+            if redis is None:
+                raise RuntimeError("The redis response cache requires redis: pip install redis")
+            _response_cache = DatabaseVersionedCache(RedisResponseCache(redis.Redis.from_url(REDIS_URL)))
+        else:
+            _response_cache = DatabaseVersionedCache(MemoryResponseCache())
+    return _response_cache
+
+
+async def close_response_cache():
+    """
+    Close the response cache's connections, if this process ever opened it.
+    """
+    global _response_cache
+    if _response_cache is not None:
+        await _response_cache.close()
+        _response_cache = None
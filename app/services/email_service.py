@@ -1,82 +1,112 @@
 import os
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
-from dotenv import load_dotenv
+from typing import List, Optional
+from fastapi_mail import MessageSchema, ConnectionConfig, MultipartSubtypeEnum
 from app.models.lead import Lead as DBLead 
+from app.services.smtp_pool import SMTPConnectionPool
+from app.services.template_service import get_email_templates
 
-load_dotenv()
+# SMTP sessions kept open and shared by every send in this process
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", 5))
+MAIL_POOL_MAX_IDLE_SECONDS = float(os.getenv("MAIL_POOL_MAX_IDLE_SECONDS", 30))
 
-# Configuration for the email server, loaded from .env
-conf = ConnectionConfig(
-    MAIL_USERNAME = os.getenv("MAIL_USERNAME"),
-    MAIL_PASSWORD = os.getenv("MAIL_PASSWORD"),
-    MAIL_FROM = os.getenv("MAIL_FROM"),
-    MAIL_PORT = int(os.getenv("MAIL_PORT", 587)),
-    MAIL_SERVER = os.getenv("MAIL_SERVER"),
-    MAIL_FROM_NAME = os.getenv("MAIL_FROM_NAME"),
-    MAIL_STARTTLS = True,
-    MAIL_SSL_TLS = False,
-    USE_CREDENTIALS = True,
-    VALIDATE_CERTS = True
-)
+def get_mail_config() -> ConnectionConfig:
+    """
+    Configuration for the email server, loaded from .env. Built on first use, so
+    processes that never send email (such as the API) don't need the MAIL_* settings.
+    """
+    return ConnectionConfig(
+        MAIL_USERNAME = os.getenv("MAIL_USERNAME"),
+        MAIL_PASSWORD = os.getenv("MAIL_PASSWORD"),
+        MAIL_FROM = os.getenv("MAIL_FROM"),
+        MAIL_PORT = int(os.getenv("MAIL_PORT", 587)),
+        MAIL_SERVER = os.getenv("MAIL_SERVER"),
+        MAIL_FROM_NAME = os.getenv("MAIL_FROM_NAME"),
+        MAIL_STARTTLS = True,
+        MAIL_SSL_TLS = False,
+        USE_CREDENTIALS = True,
+        VALIDATE_CERTS = True
+    )
+
+_mail_pool: Optional[SMTPConnectionPool] = None
+
+def get_mail_pool() -> SMTPConnectionPool:
+    """
+    The process-wide SMTP connection pool, created on first use.
+    """
+    global _mail_pool
+    if _mail_pool is None:
+        _mail_pool = SMTPConnectionPool(
+            get_mail_config(), max_size=MAIL_POOL_SIZE, max_idle_seconds=MAIL_POOL_MAX_IDLE_SECONDS
+        )
+    return _mail_pool
+
+async def close_mail_pool():
+    """
+    Close the pooled SMTP sessions, if this process ever opened any.
+    """
+    global _mail_pool
+    if _mail_pool is not None:
+        await _mail_pool.close()
+        _mail_pool = None
+
+# Signature used in the prospect confirmation
+MAIL_SENDER_NAME = os.getenv("MAIL_FROM_NAME") or "Lead Tracking Service"
+
+def build_prospect_message(lead: DBLead) -> MessageSchema:
+    """
+    The confirmation email sent to the prospect.
+    """
+    rendered = get_email_templates().render("prospect_confirmation", lead=lead, sender_name=MAIL_SENDER_NAME)
 
-async def send_new_lead_emails(lead: DBLead):
-    """
-    Sends two emails after a new lead is created:
-    1. A confirmation email to the prospect.
-    2. A notification email to the internal attorney.
-    """
-    # 1. Create the confirmation email for the prospect
-    prospect_body = f"""
-    <html>
-    <body>
-        <h2>Thank you for your application, {lead.first_name}!</h2>
-        <p>We have successfully received your information and resume.</p>
-        <p>Our team will review your application and an attorney will reach out to you shortly.</p>
-        <p>Best regards,<br>Lead Tracking Service</p>
-    </body>
-    </html>
-    """
-    
-    prospect_message = MessageSchema(
+    return MessageSchema(
         subject="Application Received",
         recipients=[lead.email],
-        body=prospect_body,
-        subtype="html"
+        body=rendered.html,
+        alternative_body=rendered.text,
+        subtype="html",
+        multipart_subtype=MultipartSubtypeEnum.alternative
     )
 
-    # 2. Create the notification email for the attorney
-    attorney_email_address = os.getenv("ATTORNEY_EMAIL")
-    if not attorney_email_address:
-        print("ATTORNEY_EMAIL environment variable not set. Skipping attorney notification.")
-        return
-
-    attorney_body = f"""
-    <html>
-    <body>
-        <h2>New Lead Submission</h2>
-        <p>A new lead has submitted their information:</p>
-        <ul>
-            <li><strong>Name:</strong> {lead.first_name} {lead.last_name}</li>
-            <li><strong>Email:</strong> {lead.email}</li>
-            <li><strong>Resume Path:</strong> {lead.resume_path}</li>
-        </ul>
-        <p>Please review and update status as needed.</p>
-    </body>
-    </html>
+def build_attorney_message(lead: DBLead, attorney_email_address: str) -> MessageSchema:
+    """
+    The notification email sent to the internal attorney.
     """
+    rendered = get_email_templates().render("attorney_notification", lead=lead)
 
-    attorney_message = MessageSchema(
+    return MessageSchema(
         subject="New Lead Received",
         recipients=[attorney_email_address],
-        body=attorney_body,
-        subtype="html"
+        body=rendered.html,
+        alternative_body=rendered.text,
+        subtype="html",
+        multipart_subtype=MultipartSubtypeEnum.alternative
     )
 
-    # 3. Send both emails
-    fm = FastMail(conf)
-    try:
-        await fm.send_message(prospect_message)
-        await fm.send_message(attorney_message)
-        print("Emails sent successfully.")
-    except Exception as e:
-        print(f"Failed to send emails: {e}")
\ No newline at end of file
+def build_attorney_digest_message(leads: List[DBLead], attorney_email_address: str) -> MessageSchema:
+    """
+    One summary email to the internal attorney covering several new leads.
+    """
+    rendered = get_email_templates().render("attorney_digest", leads=leads)
+
+    return MessageSchema(
+        subject=f"{len(leads)} New Lead{'s' if len(leads) != 1 else ''} Received",
+        recipients=[attorney_email_address],
+        body=rendered.html,
+        alternative_body=rendered.text,
+        subtype="html",
+        multipart_subtype=MultipartSubtypeEnum.alternative
+    )
+
+async def send_message(message: MessageSchema):
+    """
+    Send a single email over a pooled SMTP session. Failures are raised so the
+    caller can retry.
+    """
+    await get_mail_pool().send_message(message)
+
+async def send_many(messages: List[MessageSchema]) -> List[Optional[Exception]]:
+    """
+    Send many emails over one authenticated SMTP session. Returns None for each
+    message that was sent, or the exception it failed with.
+    """
+    return await get_mail_pool().send_many(messages)
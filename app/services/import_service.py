@@ -0,0 +1,147 @@
+import csv
+import io
+import json
+import os
+from itertools import islice
+from typing import IO, Iterator, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.crud.lead import insert_leads_if_new
+from app.models.lead import Lead as DBLead
+from app.schemas.lead import LeadBase, LeadImportError, LeadImportReport
+from app.services.search_service import search_index_for
+
+# Rows validated, deduplicated and inserted per transaction
+LEAD_IMPORT_CHUNK_SIZE = int(os.getenv("LEAD_IMPORT_CHUNK_SIZE", 1000))
+# Per-row errors kept in the report; the rest are only counted
+LEAD_IMPORT_MAX_ERRORS = int(os.getenv("LEAD_IMPORT_MAX_ERRORS", 1000))
+# Largest import upload accepted, in bytes
+LEAD_IMPORT_MAX_BYTES = int(os.getenv("LEAD_IMPORT_MAX_BYTES", 100 * 1024 * 1024))
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# (1-based row number, parsed record or the reason it could not be parsed)
+Record = Tuple[int, object]
+
+
+class UnsupportedImportFormatError(Exception):
+    """Raised when an import file is neither CSV nor NDJSON."""
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    """
+    Guess the import format from a filename or content type.
+    """
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if extension in ("ndjson", "jsonl") or (content_type or "").endswith(("ndjson", "jsonl")):
+        return "ndjson"
+    if extension == "csv" or (content_type or "").endswith("csv"):
+        return "csv"
+    raise UnsupportedImportFormatError(f"Cannot tell the format of {filename!r}; expected one of {IMPORT_FORMATS}.")
+
+
+def read_records(binary: IO[bytes], fmt: str) -> Iterator[Record]:
+    """
+    Lazily parse an import file into records, one line (or CSV row) at a time.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise UnsupportedImportFormatError(f"Unsupported import format {fmt!r}; expected one of {IMPORT_FORMATS}.")
+    # utf-8-sig drops the byte order mark spreadsheet exports often start with
+    text = io.TextIOWrapper(binary, encoding="utf-8-sig", errors="replace", newline="")
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, row
+        return
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, e
+
+
+async def import_leads(
+    db: AsyncSession,
+    records: Iterator[Record],
+    chunk_size: int = LEAD_IMPORT_CHUNK_SIZE,
+    max_errors: int = LEAD_IMPORT_MAX_ERRORS,
+) -> LeadImportReport:
+    """
+    Validate, deduplicate and insert leads in chunks of `chunk_size` rows.
+
+    Each chunk is one executemany INSERT ... ON CONFLICT DO NOTHING, committed on
+    its own, so an interrupted import keeps the chunks before it. Starting each
+    transaction with the write (rather than a read of the existing emails) means
+    it waits its turn for SQLite's write lock instead of failing with "database
+    is locked" when another connection commits first. Rows that fail validation
+    or whose email is already registered (in the database or earlier in the
+    file) are skipped and reported with their row number.
+    """
+    report = LeadImportReport()
+    seen: Set[str] = set()
+
+    def reject(number: int, email: Optional[str], error: str):
+        report.failed += 1
+        if len(report.errors) < max_errors:
+            report.errors.append(LeadImportError(row=number, email=email, error=error))
+
+    while True:
+        # Parsing reads the file, so it runs off the event loop
+        chunk = await run_in_threadpool(lambda: list(islice(records, chunk_size)))
+        if not chunk:
+            break
+        report.processed += len(chunk)
+
+        valid: List[Tuple[int, LeadBase]] = []
+        for number, record in chunk:
+            if isinstance(record, Exception):
+                reject(number, None, f"Could not parse row: {record}")
+                continue
+            if not isinstance(record, dict):
+                reject(number, None, "Row must be an object with first_name, last_name and email.")
+                continue
+            try:
+                valid.append((number, LeadBase.model_validate(record)))
+            except ValidationError as e:
+                email = record.get("email")
+                reject(number, email if isinstance(email, str) else None, _describe(e))
+
+        rows = []
+        for number, lead in valid:
+            if lead.email in seen:
+                reject(number, lead.email, "Email already registered.")
+                continue
+            seen.add(lead.email)
+            rows.append((number, lead.model_dump()))
+
+        report.imported += await _insert_chunk(db, rows, reject)
+
+    report.errors.sort(key=lambda error: error.row)
+    return report
+
+
+async def _insert_chunk(db: AsyncSession, rows: List[Tuple[int, dict]], reject) -> int:
+    """
+    Insert and index a chunk, rejecting the rows whose email is already registered.
+    """
+    if not rows:
+        return 0
+    inserted = await insert_leads_if_new(db, [values for _, values in rows])
+    if inserted:
+        await search_index_for(db).index_leads(db, DBLead.id.in_(inserted.values()))
+    await db.commit()
+    for number, values in rows:
+        if values["email"] not in inserted:
+            reject(number, values["email"], "Email already registered.")
+    return len(inserted)
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}" for item in error.errors()
+    )
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import AsyncIterator, Deque, Iterable, List, Optional
+from sqlalchemy import Row
+
+from app.schemas.lead import Lead
+
+# Events kept for clients that reconnect with a Last-Event-ID
+LEAD_EVENTS_BUFFER_SIZE = int(os.getenv("LEAD_EVENTS_BUFFER_SIZE", 1000))
+# Seconds between keep-alive comments on an idle stream, so proxies don't close it
+LEAD_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("LEAD_EVENTS_HEARTBEAT_SECONDS", 15))
+# How long clients wait before reconnecting after the stream drops
+LEAD_EVENTS_RETRY_MS = int(os.getenv("LEAD_EVENTS_RETRY_MS", 2000))
+
+LEAD_CREATED = "lead.created"
+LEAD_STATE_CHANGED = "lead.state_changed"
+LEADS_IMPORTED = "leads.imported"
+# Sent instead of events the client can no longer get; it should refetch the list
+RESET = "reset"
+
+
+@dataclass(frozen=True)
+class LeadEvent:
+    seq: int
+    type: str
+    # JSON, serialized once when the event is published
+    data: str
+
+
+class LeadEventBroker:
+    """
+    In-process pub/sub for lead changes, served as Server-Sent Events.
+
+    Published events go into a ring buffer shared by every subscriber, and each
+    subscriber only keeps its position in it. A subscriber is therefore just a
+    coroutine waiting for the next publish, however many there are. Publishing
+    never waits for anyone. A consumer too slow to keep up (or reconnecting
+    after too long) falls off the end of the buffer and is sent a `reset`
+    event in place of what it missed.
+
+    Event ids include an id of this broker, so a client resuming against
+    another process (e.g. after a restart) is reset rather than shown the
+    wrong events.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = LEAD_EVENTS_BUFFER_SIZE,
+        heartbeat: float = LEAD_EVENTS_HEARTBEAT_SECONDS,
+        retry_ms: int = LEAD_EVENTS_RETRY_MS,
+    ):
+        self.heartbeat = heartbeat
+        self.retry_ms = retry_ms
+        self.broker_id = uuid.uuid4().hex[:12]
+        self.subscribers = 0
+        self._events: Deque[LeadEvent] = deque(maxlen=buffer_size)
+        self._last_seq = 0
+        self._published = asyncio.Event()
+
+    def publish(self, event_type: str, data: str):
+        """
+        Send an event with JSON `data` to every subscriber.
+        """
+        self._last_seq += 1
+        self._events.append(LeadEvent(self._last_seq, event_type, data))
+        # Wake everyone waiting on the current event, and give later waiters a fresh one
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.broker_id}-{seq}"
+
+    def _resume_from(self, last_event_id: Optional[str]) -> Optional[int]:
+        """
+        The sequence number a Last-Event-ID points at, or None if it isn't one of ours.
+        """
+        broker_id, _, seq = (last_event_id or "").strip().rpartition("-")
+        if broker_id != self.broker_id or not seq.isdigit() or int(seq) > self._last_seq:
+            return None
+        return int(seq)
+
+    def events_after(self, seq: int) -> Optional[List[LeadEvent]]:
+        """
+        The buffered events after `seq`, or None if some have already been dropped.
+        """
+        first_seq = self._events[0].seq if self._events else self._last_seq + 1
+        if seq < first_seq - 1:
+            return None
+        return list(islice(self._events, max(seq - first_seq + 1, 0), None))
+
+    def _format(self, seq: int, event_type: str, data: str) -> str:
+        return f"id: {self.event_id(seq)}\nevent: {event_type}\ndata: {data}\n\n"
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Server-Sent Events for one subscriber, starting after `last_event_id`,
+        or with the next event published when there is none.
+        """
+        position = self._last_seq
+        resumed = self._resume_from(last_event_id)
+        yield f"retry: {self.retry_ms}\n\n"
+        if resumed is not None:
+            position = resumed
+        elif last_event_id:
+            yield self._format(position, RESET, "{}")
+
+        self.subscribers += 1
+        try:
+            while True:
+                published = self._published
+                events = self.events_after(position)
+                if events is None:
+                    position = self._last_seq
+                    yield self._format(position, RESET, "{}")
+                elif events:
+                    # Everything this subscriber is behind on goes out in one write
+                    yield "".join(self._format(event.seq, event.type, event.data) for event in events)
+                    position = events[-1].seq
+                else:
+                    try:
+                        await asyncio.wait_for(published.wait(), self.heartbeat)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+        finally:
+            self.subscribers -= 1
+
+
+def publish_lead_created(broker: LeadEventBroker, lead: Lead):
+    broker.publish(LEAD_CREATED, lead.model_dump_json())
+
+
+def publish_state_changes(broker: LeadEventBroker, rows: Iterable[Row]):
+    """
+    One compact event per lead moved by a state update.
+    """
+    for row in rows:
+        broker.publish(LEAD_STATE_CHANGED, json.dumps({"id": row.id, "state": row.state.value, "version": row.version}))
+
+
+def publish_leads_imported(broker: LeadEventBroker, imported: int):
+    # Imports can add thousands of leads, so subscribers are told to refetch instead
+    broker.publish(LEADS_IMPORTED, json.dumps({"imported": imported}))
+
+
+_lead_event_broker: Optional[LeadEventBroker] = None
+
+
+def get_lead_event_broker() -> LeadEventBroker:
+    """
+    This process's lead event broker, created on first use and shared by all requests.
+    """
+    global _lead_event_broker
+    if _lead_event_broker is None:
+        _lead_event_broker = LeadEventBroker()
+    return _lead_event_broker
@@ -0,0 +1,125 @@
+import json
+import os
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+from sqlalchemy import Row, insert, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.lead import LEAD_LIST_COLUMNS
+from app.db.timestamps import utcnow
+from app.models.lead import Lead as DBLead
+from app.models.lead_state_history import LeadStateHistory
+from app.schemas.lead import LeadState, LeadTransitionError, LeadTransitionFailure
+
+Transitions = Dict[LeadState, FrozenSet[LeadState]]
+
+# Which states a lead may move to from each state. Moving a lead to the state it
+# is already in is always accepted and changes nothing.
+DEFAULT_LEAD_STATE_TRANSITIONS: Transitions = {
+    LeadState.PENDING: frozenset({LeadState.REACHED_OUT, LeadState.REJECTED}),
+    LeadState.REACHED_OUT: frozenset({LeadState.QUALIFIED, LeadState.REJECTED}),
+    LeadState.QUALIFIED: frozenset({LeadState.RETAINED, LeadState.REJECTED}),
+    LeadState.RETAINED: frozenset(),
+    LeadState.REJECTED: frozenset({LeadState.PENDING}),
+}
+
+
+def load_transitions(raw: Optional[str]) -> Transitions:
+    """
+    Parse a transition table given as JSON, e.g. {"PENDING": ["REACHED_OUT"]}.
+    States missing from the table have no outgoing transitions.
+    """
+    if not raw:
+        return DEFAULT_LEAD_STATE_TRANSITIONS
+    table = json.loads(raw)
+    transitions: Transitions = {state: frozenset() for state in LeadState}
+    for source, targets in table.items():
+        transitions[LeadState(source)] = frozenset(LeadState(target) for target in targets)
+    return transitions
+
+
+# Override the default state machine with a JSON object of state -> allowed next states
+LEAD_STATE_TRANSITIONS = load_transitions(os.getenv("LEAD_STATE_TRANSITIONS"))
+
+
+async def transition_leads(
+    db: AsyncSession,
+    refs: Sequence[Tuple[int, Optional[int]]],
+    target: LeadState,
+    transitions: Transitions = LEAD_STATE_TRANSITIONS,
+) -> Tuple[List[Row], List[Row], List[LeadTransitionError]]:
+    """
+    Move the leads in `refs` ((id, expected version or None) pairs) to `target`.
+
+    The work is set-based: one UPDATE ... RETURNING per state that may move to
+    `target`, so a row only changes if its current state allows it (and its
+    version matches), however many leads are moved. The history rows for all of
+    them go in with one INSERT. Leads that could not be moved cost one more
+    SELECT to explain why. The caller commits.
+
+    Returns the rows (as LEAD_LIST_COLUMNS) of the leads that moved and of those
+    already in `target`, each in request order, and the failures. Ids must be
+    unique.
+    """
+    versions = dict(refs)
+    unversioned = [lead_id for lead_id, version in versions.items() if version is None]
+    versioned = [(lead_id, version) for lead_id, version in versions.items() if version is not None]
+    conditions = []
+    if unversioned:
+        conditions.append(DBLead.id.in_(unversioned))
+    if versioned:
+        conditions.append(tuple_(DBLead.id, DBLead.version).in_(versioned))
+    selected = or_(*conditions)
+
+    changed_at = utcnow()
+    rows: Dict[int, Row] = {}
+    history = []
+    sources = [state for state, targets in transitions.items() if target in targets and state != target]
+    for source in sources:
+        result = await db.execute(
+            update(DBLead)
+            .where(selected, DBLead.state == source)
+            .values(state=target, version=DBLead.version + 1)
+            .returning(*LEAD_LIST_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        for row in result:
+            rows[row.id] = row
+            history.append(
+                dict(lead_id=row.id, from_state=source, to_state=target, version=row.version, changed_at=changed_at)
+            )
+    if history:
+        await db.execute(insert(LeadStateHistory), history)
+
+    unchanged: Dict[int, Row] = {}
+    failed = []
+    remaining = [lead_id for lead_id in versions if lead_id not in rows]
+    if remaining:
+        current = {
+            row.id: row
+            for row in await db.execute(select(*LEAD_LIST_COLUMNS).where(DBLead.id.in_(remaining)))
+        }
+        for lead_id in remaining:
+            row = current.get(lead_id)
+            expected = versions[lead_id]
+            if row is None:
+                failed.append(LeadTransitionError(
+                    id=lead_id, reason=LeadTransitionFailure.NOT_FOUND, detail="Lead not found"
+                ))
+            elif expected is not None and row.version != expected:
+                failed.append(LeadTransitionError(
+                    id=lead_id, reason=LeadTransitionFailure.VERSION_CONFLICT,
+                    detail=f"Lead is at version {row.version}, not {expected}.",
+                ))
+            elif row.state == target:
+                unchanged[lead_id] = row
+            else:
+                failed.append(LeadTransitionError(
+                    id=lead_id, reason=LeadTransitionFailure.NOT_ALLOWED,
+                    detail=f"Cannot move a {row.state.value} lead to {target.value}.",
+                ))
+
+    return (
+        [rows[lead_id] for lead_id in versions if lead_id in rows],
+        [unchanged[lead_id] for lead_id in versions if lead_id in unchanged],
+        failed,
+    )
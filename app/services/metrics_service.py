@@ -0,0 +1,110 @@
+import os
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+
+# A request running the same SELECT at least this many times is counted as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 10))
+
+# Buckets for request and query latencies, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending its response headers.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Time spent executing each database statement.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Database statements executed while serving a request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500),
+)
+DB_N_PLUS_ONE = Counter(
+    "db_n_plus_one_requests_total",
+    "Requests that ran one SELECT at least N_PLUS_ONE_THRESHOLD times.",
+    ["route"],
+)
+REQUESTS_REJECTED = Counter(
+    "http_requests_rejected_total",
+    "Requests turned away by rate limits or admission control, by reason.",
+    ["reason"],
+)
+EMAILS_SENT = Counter(
+    "emails_sent_total",
+    "Emails handed to the SMTP server, by outcome.",
+    ["outcome"],
+)
+EMAIL_SEND_SECONDS = Histogram(
+    "email_send_duration_seconds",
+    "Time to send one email, including checking out an SMTP session.",
+    buckets=LATENCY_BUCKETS,
+)
+RESUME_UPLOAD_BYTES = Histogram(
+    "resume_upload_bytes",
+    "Size of each stored resume upload.",
+    ["backend"],
+    buckets=(16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2),
+)
+RESUME_UPLOAD_SECONDS = Histogram(
+    "resume_upload_duration_seconds",
+    "Time to stream a resume upload into the store.",
+    ["backend"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+@dataclass
+class RequestQueryStats:
+    """The database statements executed on behalf of one request."""
+
+    count: int = 0
+    seconds: float = 0.0
+    selects: StatementCounter = field(default_factory=StatementCounter)
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        if statement.lstrip()[:6].upper() == "SELECT":
+            self.selects[statement] += 1
+
+    def repeated_select(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> Optional[Tuple[str, int]]:
+        """
+        The most repeated SELECT and its count, if it ran at least `threshold` times.
+        """
+        if not self.selects:
+            return None
+        statement, count = self.selects.most_common(1)[0]
+        return (statement, count) if count >= threshold else None
+
+
+def record_resume_upload(backend: str, size: Optional[int], seconds: float):
+    if size is not None:
+        RESUME_UPLOAD_BYTES.labels(backend).observe(size)
+    RESUME_UPLOAD_SECONDS.labels(backend).observe(seconds)
+
+
+# Set by the metrics middleware for the request being served
+current_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    The metrics in Prometheus' text format, and its content type. With several
+    workers, set PROMETHEUS_MULTIPROC_DIR so every worker's metrics are combined.
+    """
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,141 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List, Sequence
+from sqlalchemy import select, update, or_, and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.timestamps import utcnow
+from app.models.email_outbox import EmailKind, EmailOutbox, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+# Failed sends are retried after RETRY_BASE * 2^(attempts - 1) seconds, up to RETRY_MAX
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 8))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", 30))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", 3600))
+
+
+def enqueue_new_lead_emails(db: AsyncSession, lead_id: int):
+    """
+    Queue the emails for a new lead in the caller's transaction, so they are
+    committed (or rolled back) together with the lead.
+    """
+    db.add(EmailOutbox(lead_id=lead_id, kind=EmailKind.PROSPECT_CONFIRMATION))
+    if os.getenv("ATTORNEY_EMAIL"):
+        db.add(EmailOutbox(lead_id=lead_id, kind=EmailKind.ATTORNEY_NOTIFICATION))
+    else:
+        _warn_attorney_email_missing()
+
+
+_warned_attorney_email_missing = False
+
+
+def _warn_attorney_email_missing():
+    # Once per process: every lead would repeat it otherwise
+    global _warned_attorney_email_missing
+    if not _warned_attorney_email_missing:
+        _warned_attorney_email_missing = True
+        logger.warning("ATTORNEY_EMAIL environment variable not set. Skipping attorney notifications.")
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Exponential backoff before the next attempt of an email that has failed `attempts` times.
+    """
+    return timedelta(seconds=min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS))
+
+
+def _is_due(now: datetime):
+    """
+    Rows that are waiting to be sent, or were claimed by a worker whose lease has expired.
+    """
+    return or_(
+        and_(EmailOutbox.status == OutboxStatus.PENDING, EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.status == OutboxStatus.SENDING, EmailOutbox.locked_until < now),
+    )
+
+
+async def digest_is_due(db: AsyncSession, max_leads: int, max_age: timedelta) -> bool:
+    """
+    Whether enough attorney notifications have piled up to send a digest: at
+    least `max_leads` of them, or any that has been waiting longer than `max_age`.
+
+    The pending outbox rows are the digest's only state, so a restarted worker
+    picks up where the previous one left off.
+    """
+    now = utcnow()
+    result = await db.execute(
+        select(func.count(EmailOutbox.id), func.min(EmailOutbox.created_at))
+        .where(EmailOutbox.kind == EmailKind.ATTORNEY_NOTIFICATION, _is_due(now))
+    )
+    count, oldest = result.one()
+    await db.commit()
+    if not count:
+        return False
+    return count >= max_leads or oldest <= now - max_age
+
+
+async def claim_due_emails(
+    db: AsyncSession, limit: int, lease_seconds: float, kinds: Sequence[EmailKind] = tuple(EmailKind)
+) -> List[EmailOutbox]:
+    """
+    Atomically mark up to `limit` due emails as SENDING and return them.
+
+    Claimed rows are leased for `lease_seconds`; if the worker dies before
+    recording the outcome, another worker picks them up once the lease expires.
+    """
+    now = utcnow()
+    due = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.kind.in_(kinds), _is_due(now))
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = await db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(due.scalar_subquery()))
+        .values(status=OutboxStatus.SENDING, locked_until=now + timedelta(seconds=lease_seconds))
+        .returning(EmailOutbox)
+        .execution_options(synchronize_session=False)
+    )
+    rows = list(claimed.scalars())
+    await db.commit()
+    return rows
+
+
+async def mark_sent(db: AsyncSession, ids: Sequence[int]):
+    """
+    Record a successful send for the given outbox rows.
+    """
+    if not ids:
+        return
+    await db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids))
+        .values(status=OutboxStatus.SENT, sent_at=utcnow(), locked_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def mark_failed(db: AsyncSession, row: EmailOutbox, error: str):
+    """
+    Record a failed send: schedule a retry with backoff, or dead-letter the row
+    once it has used up EMAIL_MAX_ATTEMPTS.
+    """
+    attempts = row.attempts + 1
+    values = dict(attempts=attempts, last_error=error[:1000], locked_until=None)
+    if attempts >= EMAIL_MAX_ATTEMPTS:
+        values["status"] = OutboxStatus.DEAD
+    else:
+        values["status"] = OutboxStatus.PENDING
+        values["next_attempt_at"] = utcnow() + retry_delay(attempts)
+    await db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id == row.id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, Optional
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis is only needed for the shared backend
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Which RateLimiter counts requests: "memory" (per worker) or "redis" (shared by every node)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Clients tracked by each worker's in-process limiter
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100_000))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Requests handled at once by each worker, and how many more may wait for a turn (0 turns admission control off)
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", 64))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 128))
+# The longest a request waits for a turn before it is turned away
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", 2))
+# What turned-away clients are told to wait before retrying
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 1))
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """A sustained `rate` of requests per second, with bursts of up to `burst` requests."""
+
+    rate: float
+    burst: int
+
+    @classmethod
+    def per_minute(cls, requests: float, burst: int) -> "RateLimit":
+        return cls(rate=requests / 60, burst=burst)
+
+
+class RateLimiter(ABC):
+    """
+    Token buckets keyed by client, implemented as GCRA: each key stores only the
+    time at which its bucket will be full again.
+    """
+
+    @abstractmethod
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        """
+        Take a token from `key`'s bucket. Returns 0 if there was one, otherwise the
+        seconds until there will be (and nothing is taken).
+        """
+
+    async def close(self):
+        """
+        Release any connections the limiter holds.
+        """
+
+
+class MemoryRateLimiter(RateLimiter):
+    """
+    Buckets in this process, for a single worker. The least recently used keys
+    are dropped beyond `max_keys`; a dropped bucket starts out full again.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._full_at: "OrderedDict[str, float]" = OrderedDict()
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        now = self.clock()
+        interval = 1 / limit.rate
+        full_at = max(self._full_at.get(key, now), now) + interval
+        retry_after = full_at - limit.burst * interval - now
+        if retry_after > 0:
+            return retry_after
+        self._full_at[key] = full_at
+        self._full_at.move_to_end(key)
+        if len(self._full_at) > self.max_keys:
+            self._full_at.popitem(last=False)
+        return 0.0
+
+
+# KEYS[1] holds the time its bucket is full again; ARGV is the interval between tokens and the burst.
+# Redis' clock is used so every node agrees on the time.
+_GCRA_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local full_at = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now) + interval
+local retry_after = full_at - tonumber(ARGV[2]) * interval - now
+if retry_after > 0 then
+    return tostring(retry_after)
+end
+redis.call('SET', KEYS[1], tostring(full_at), 'PX', math.ceil((full_at - now) * 1000))
+return '0'
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Buckets in Redis, shared by every worker and node. Each one is updated by a
+    single script call and expires once it is full again. If Redis can't be
+    reached, requests are let through rather than failed.
+    """
+
+    def __init__(self, client, prefix: str = "lead-tracker"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_GCRA_SCRIPT)
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        try:
+            retry_after = await self._script(keys=[f"{self.prefix}:rate:{key}"], args=[1 / limit.rate, limit.burst])
+        except redis.RedisError as e:
+            logger.warning("Rate limiter unavailable, allowing request: %s", e)
+            return 0.0
+        return float(retry_after)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def retry_after_header(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(math.ceil(seconds), 1))}
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    The configured rate limiter, created on first use and shared by all requests.
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        if RATE_LIMIT_BACKEND == "redis":
+            if redis is None:
+                raise RuntimeError("The redis rate limiter requires redis: pip install redis")
+            _rate_limiter = RedisRateLimiter(redis.Redis.from_url(REDIS_URL))
+        else:
+            _rate_limiter = MemoryRateLimiter()
+    return _rate_limiter
+
+
+async def close_rate_limiter():
+    """
+    Close the rate limiter's connections, if this process ever opened it.
+    """
+    global _rate_limiter
+    if _rate_limiter is not None:
+        await _rate_limiter.close()
+        _rate_limiter = None
+
+
+class OverloadedError(Exception):
+    """Raised when a request can't be admitted: too many are already waiting, or it waited too long."""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__("The server is too busy to take this request; retry later.")
+
+
+class AdmissionController:
+    """
+    Lets `max_concurrent` requests run at once, and up to `max_queue` more wait
+    for a turn. Beyond that, or after waiting `queue_timeout` seconds, requests
+    are turned away at once, so those that are admitted keep their latency
+    instead of everyone slowing down together.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        retry_after: int = ADMISSION_RETRY_AFTER_SECONDS,
+    ):
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        if self._slots.locked():
+            if self.waiting >= self.max_queue:
+                raise OverloadedError(self.retry_after)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise OverloadedError(self.retry_after)
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+        try:
+            yield
+        finally:
+            self._slots.release()
@@ -0,0 +1,72 @@
+import io
+import logging
+import os
+import re
+import zipfile
+from xml.etree import ElementTree
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.services.search_service import search_index_for
+from app.services.storage_service import ResumeStore
+
+try:
+    import pypdf
+except ImportError:  # pypdf is only needed to index PDF resumes
+    pypdf = None
+
+logger = logging.getLogger(__name__)
+
+# Characters of resume text kept in the search index
+RESUME_TEXT_MAX_CHARS = int(os.getenv("RESUME_TEXT_MAX_CHARS", 100_000))
+
+_WORD_XML_TEXT = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t"
+
+
+def _pdf_text(data: bytes) -> str:
+    if pypdf is None:
+        logger.warning("pypdf is not installed; PDF resumes are not indexed.")
+        return ""
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    return " ".join(page.extract_text() or "" for page in reader.pages)
+
+
+def _docx_text(data: bytes) -> str:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        document = ElementTree.fromstring(archive.read("word/document.xml"))
+    return " ".join(node.text or "" for node in document.iter(_WORD_XML_TEXT))
+
+
+def extract_text(key: str, data: bytes, max_chars: int = RESUME_TEXT_MAX_CHARS) -> str:
+    """
+    The searchable text of a resume, chosen by the extension of its storage key.
+    Formats we cannot read yield "". This is CPU-bound; run it off the event loop.
+    """
+    extension = os.path.splitext(key)[1].lower()
+    if extension in (".txt", ".md"):
+        text = data.decode("utf-8", errors="replace")
+    elif extension == ".pdf":
+        text = _pdf_text(data)
+    elif extension == ".docx":
+        text = _docx_text(data)
+    else:
+        text = ""
+    return re.sub(r"\s+", " ", text).strip()[:max_chars]
+
+
+async def read_resume(store: ResumeStore, key: str) -> bytes:
+    return b"".join([chunk async for chunk in store.open(key)])
+
+
+async def index_resume_text(session_factory: async_sessionmaker, store: ResumeStore, lead_id: int, key: str):
+    """
+    Extract a lead's resume text and add it to the search index. Failures are
+    logged and leave the text missing, for `python -m app.cli.index_resumes` to retry.
+    """
+    try:
+        text = await run_in_threadpool(extract_text, key, await read_resume(store, key))
+        async with session_factory() as db:
+            await search_index_for(db).set_resume_text(db, lead_id, text)
+            await db.commit()
+    except Exception:
+        logger.exception("Could not index the resume of lead %s.", lead_id)
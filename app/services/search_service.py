@@ -0,0 +1,204 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import (
+    Column, ColumnElement, Float, Integer, MetaData, Row, Select, String, Table, Text, func, insert,
+    literal_column, select, update
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import Insert
+
+from app.crud.lead import LEAD_LIST_COLUMNS
+from app.models.lead import Lead as DBLead
+
+# Search tables are dialect-specific and created by the migrations, not by create_all
+_search_metadata = MetaData()
+
+# SQLite: an FTS5 table whose rowid is the lead id
+leads_fts = Table(
+    "leads_fts",
+    _search_metadata,
+    Column("rowid", Integer, primary_key=True),
+    Column("first_name", String),
+    Column("last_name", String),
+    Column("email", String),
+    Column("resume_text", Text),
+    # FTS5's hidden ranking column
+    Column("rank", Float),
+)
+
+# Postgres: a weighted tsvector per lead, behind a GIN index
+lead_search = Table(
+    "lead_search",
+    _search_metadata,
+    Column("lead_id", Integer, primary_key=True),
+    Column("resume_text", Text),
+    Column("document", TSVECTOR, nullable=False),
+)
+
+# At most this many words of a search are used
+MAX_SEARCH_TERMS = 10
+
+
+def search_terms(query: str) -> List[str]:
+    """
+    The words of a free-text search. Punctuation is dropped, so user input can
+    never be read as FTS query syntax.
+    """
+    return re.findall(r"\w+", query.lower())[:MAX_SEARCH_TERMS]
+
+
+class SearchIndex(ABC):
+    """
+    Full-text index over lead names, emails and resume text. Writes happen in the
+    caller's transaction, so a lead becomes searchable when it is committed.
+    """
+
+    @abstractmethod
+    def index_statement(self, condition: ColumnElement) -> Insert:
+        """
+        The INSERT ... SELECT that indexes every lead matching `condition`.
+        """
+
+    async def index_leads(self, db: AsyncSession, condition: ColumnElement):
+        """
+        Add the leads matching `condition` to the index, in one statement.
+        """
+        await db.execute(self.index_statement(condition))
+
+    @abstractmethod
+    async def set_resume_text(self, db: AsyncSession, lead_id: int, text: str):
+        """
+        Store a lead's extracted resume text in the index.
+        """
+
+    @abstractmethod
+    def search_query(self, terms: Sequence[str]) -> Select:
+        """
+        LEAD_LIST_COLUMNS plus a `score` (higher is better) for every lead
+        matching all of `terms` as word prefixes, best first.
+        """
+
+    async def search(self, db: AsyncSession, query: str, limit: int, offset: int = 0) -> List[Row]:
+        terms = search_terms(query)
+        if not terms:
+            return []
+        return (await db.execute(self.search_query(terms).limit(limit).offset(offset))).all()
+
+    @abstractmethod
+    def missing_resume_text_query(self, after_id: int, limit: int) -> Select:
+        """
+        (id, resume_path) of leads with a resume whose text has not been indexed, by id.
+        """
+
+    async def leads_missing_resume_text(self, db: AsyncSession, after_id: int, limit: int) -> List[Tuple[int, str]]:
+        return [tuple(row) for row in await db.execute(self.missing_resume_text_query(after_id, limit))]
+
+
+class SQLiteSearchIndex(SearchIndex):
+    """
+    SQLite FTS5. Name matches outrank email matches, which outrank resume matches.
+    """
+
+    # bm25 column weights, in table order: first_name, last_name, email, resume_text
+    RANKING = "bm25(10.0, 10.0, 5.0, 1.0)"
+
+    def index_statement(self, condition: ColumnElement) -> Insert:
+        return insert(leads_fts).from_select(
+            ["rowid", "first_name", "last_name", "email"],
+            select(DBLead.id, DBLead.first_name, DBLead.last_name, DBLead.email).where(condition),
+        )
+
+    async def set_resume_text(self, db: AsyncSession, lead_id: int, text: str):
+        await db.execute(update(leads_fts).where(leads_fts.c.rowid == lead_id).values(resume_text=text))
+
+    def search_query(self, terms: Sequence[str]) -> Select:
+        match = " ".join(f'"{term}"*' for term in terms)
+        return (
+            select(*LEAD_LIST_COLUMNS, (-leads_fts.c.rank).label("score"))
+            .join_from(leads_fts, DBLead, DBLead.id == leads_fts.c.rowid)
+            .where(literal_column("leads_fts").op("MATCH")(match), leads_fts.c.rank.op("MATCH")(self.RANKING))
+            # Ordering by FTS5's own rank column lets it return hits best-first; the id
+            # breaks ties so equally ranked leads don't shift between pages
+            .order_by(leads_fts.c.rank, DBLead.id)
+        )
+
+    def missing_resume_text_query(self, after_id: int, limit: int) -> Select:
+        return (
+            select(DBLead.id, DBLead.resume_path)
+            .join_from(leads_fts, DBLead, DBLead.id == leads_fts.c.rowid)
+            .where(leads_fts.c.rowid > after_id, leads_fts.c.resume_text.is_(None), DBLead.resume_path.isnot(None))
+            .order_by(leads_fts.c.rowid)
+            .limit(limit)
+        )
+
+
+class PostgresSearchIndex(SearchIndex):
+    """
+    Postgres tsvector search. Names are weighted A, the email B and the resume C.
+    """
+
+    @staticmethod
+    def _document(resume_text):
+        names = func.coalesce(DBLead.first_name, "") + " " + func.coalesce(DBLead.last_name, "")
+        return (
+            func.setweight(func.to_tsvector("simple", names), "A").op("||")(
+                func.setweight(func.to_tsvector("simple", DBLead.email), "B")
+            ).op("||")(
+                func.setweight(func.to_tsvector("simple", func.coalesce(resume_text, "")), "C")
+            )
+        )
+
+    def index_statement(self, condition: ColumnElement) -> Insert:
+        return insert(lead_search).from_select(
+            ["lead_id", "document"],
+            select(DBLead.id, self._document(None)).where(condition),
+        )
+
+    async def set_resume_text(self, db: AsyncSession, lead_id: int, text: str):
+        await db.execute(
+            update(lead_search)
+            .where(lead_search.c.lead_id == DBLead.id, DBLead.id == lead_id)
+            .values(resume_text=text, document=self._document(text))
+        )
+
+    def search_query(self, terms: Sequence[str]) -> Select:
+        query = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        score = func.ts_rank_cd(lead_search.c.document, query)
+        return (
+            select(*LEAD_LIST_COLUMNS, score.label("score"))
+            .join_from(lead_search, DBLead, DBLead.id == lead_search.c.lead_id)
+            .where(lead_search.c.document.op("@@")(query))
+            .order_by(score.desc(), DBLead.id)
+        )
+
+    def missing_resume_text_query(self, after_id: int, limit: int) -> Select:
+        return (
+            select(DBLead.id, DBLead.resume_path)
+            .join_from(lead_search, DBLead, DBLead.id == lead_search.c.lead_id)
+            .where(lead_search.c.lead_id > after_id, lead_search.c.resume_text.is_(None), DBLead.resume_path.isnot(None))
+            .order_by(lead_search.c.lead_id)
+            .limit(limit)
+        )
+
+
+SEARCH_INDEXES: Dict[str, SearchIndex] = {
+    "sqlite": SQLiteSearchIndex(),
+    "postgresql": PostgresSearchIndex(),
+}
+
+
+def get_search_index(dialect_name: str) -> SearchIndex:
+    """
+    The search index for a database dialect.
+    """
+    try:
+        return SEARCH_INDEXES[dialect_name]
+    except KeyError:
+        raise ValueError(f"Full-text search is not supported on {dialect_name}.") from None
+
+
+def search_index_for(db: AsyncSession) -> SearchIndex:
+    return get_search_index(db.get_bind().dialect.name)
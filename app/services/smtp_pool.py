@@ -0,0 +1,154 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import Deque, List, Optional, Tuple, Union
+
+import aiosmtplib
+from fastapi_mail import ConnectionConfig, FastMail, MessageSchema
+
+from app.services.metrics_service import EMAIL_SEND_SECONDS, EMAILS_SENT
+
+
+class SMTPConnectionPool:
+    """
+    A bounded pool of connected, authenticated SMTP sessions.
+
+    Opening a session costs a TCP connect, STARTTLS and AUTH round trips; the pool
+    pays that once per connection and reuses it for many messages. At most
+    `max_size` sessions are open at once. Idle sessions older than `max_idle_seconds`
+    are closed rather than reused, since servers drop idle clients, and a session
+    that fails mid-send is discarded and the message retried on a fresh one.
+    """
+
+    def __init__(self, config: ConnectionConfig, max_size: int = 5, max_idle_seconds: float = 30):
+        self.config = config
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        # FastMail is only used to turn MessageSchema into MIME messages
+        self._builder = FastMail(config)
+        self._idle: Deque[Tuple[aiosmtplib.SMTP, float]] = deque()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            timeout=self.config.TIMEOUT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+            local_hostname=self.config.LOCAL_HOSTNAME,
+            cert_bundle=self.config.CERT_BUNDLE,
+        )
+        await smtp.connect()
+        if self.config.USE_CREDENTIALS:
+            await smtp.login(self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD.get_secret_value())
+        return smtp
+
+    async def _discard(self, smtp: aiosmtplib.SMTP):
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _checkout(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            smtp, returned_at = self._idle.pop()
+            if smtp.is_connected and time.monotonic() - returned_at < self.max_idle_seconds:
+                return smtp
+            await self._discard(smtp)
+        return await self._connect()
+
+    @asynccontextmanager
+    async def _slot(self):
+        # Created lazily so the semaphore binds to the loop that uses the pool
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_size)
+        async with self._slots:
+            yield
+
+    async def _send_on(self, smtp: aiosmtplib.SMTP, message) -> aiosmtplib.SMTP:
+        """
+        Send on `smtp`, reconnecting once if the server dropped the session.
+        Returns the session that is now in use.
+        """
+        try:
+            await smtp.send_message(message)
+            return smtp
+        except aiosmtplib.SMTPServerDisconnected:
+            smtp.close()
+            smtp = await self._connect()
+            await smtp.send_message(message)
+            return smtp
+
+    async def _prepare(self, messages: List[MessageSchema]) -> List[Union[Message, Exception]]:
+        """
+        Each message as MIME, or the exception building it raised. They are built
+        one at a time, so a malformed message fails alone.
+        """
+        prepared: List[Union[Message, Exception]] = []
+        for message in messages:
+            try:
+                prepared.append(await self._builder.get_message(message))
+            except Exception as e:
+                prepared.append(e)
+        return prepared
+
+    async def send_message(self, message: MessageSchema):
+        """
+        Send one message over a pooled session, raising if it fails.
+        """
+        error = (await self.send_many([message]))[0]
+        if error is not None:
+            raise error
+
+    async def send_many(self, messages: List[MessageSchema]) -> List[Optional[Exception]]:
+        """
+        Send many messages over a single authenticated session.
+
+        Returns one entry per message: None if it was sent, otherwise the exception
+        it failed with. A failed message does not stop the rest from being sent.
+        """
+        if not messages:
+            return []
+        prepared = await self._prepare(messages)
+        if self.config.SUPPRESS_SEND:
+            return [message if isinstance(message, Exception) else None for message in prepared]
+
+        results: List[Optional[Exception]] = []
+        async with self._slot():
+            smtp = None
+            for message in prepared:
+                if isinstance(message, Exception):
+                    results.append(message)
+                    EMAILS_SENT.labels("failed").inc()
+                    continue
+                started = time.perf_counter()
+                try:
+                    if smtp is None:
+                        smtp = await self._checkout()
+                    smtp = await self._send_on(smtp, message)
+                    results.append(None)
+                except aiosmtplib.SMTPRecipientsRefused as e:
+                    # The session is still usable after a rejected recipient
+                    results.append(e)
+                except Exception as e:
+                    results.append(e)
+                    if smtp is not None:
+                        await self._discard(smtp)
+                        smtp = None
+                EMAIL_SEND_SECONDS.observe(time.perf_counter() - started)
+                EMAILS_SENT.labels("sent" if results[-1] is None else "failed").inc()
+            if smtp is not None:
+                self._idle.append((smtp, time.monotonic()))
+        return results
+
+    async def close(self):
+        """
+        Close every idle session.
+        """
+        while self._idle:
+            smtp, _ = self._idle.pop()
+            await self._discard(smtp)
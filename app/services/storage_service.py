@@ -0,0 +1,323 @@
+import hashlib
+import os
+import re
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+except ImportError:  # boto3 is only needed for the S3 backend
+    boto3 = None
+
+# Which ResumeStore backs resume uploads: "local" or "s3"
+RESUME_STORAGE_BACKEND = os.getenv("RESUME_STORAGE_BACKEND", "local")
+# Largest resume accepted, in bytes
+RESUME_MAX_BYTES = int(os.getenv("RESUME_MAX_BYTES", 10 * 1024 * 1024))
+# Lifetime of presigned download URLs
+RESUME_URL_EXPIRES_SECONDS = int(os.getenv("RESUME_URL_EXPIRES_SECONDS", 300))
+# Bytes read from the upload and written to disk per step
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Size of each S3 multipart part (S3 requires at least 5 MiB for all but the last)
+S3_PART_SIZE = int(os.getenv("S3_PART_SIZE", 8 * 1024 * 1024))
+
+_SAFE_EXTENSION = re.compile(r"^\.[a-z0-9]{1,10}$")
+# What content_key returns: the first two hex digits of the SHA-256, then all of it
+_CONTENT_KEY = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]{1,10})?$")
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size cap."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Resume exceeds the maximum size of {max_bytes} bytes.")
+        self.max_bytes = max_bytes
+
+
+class ResumeNotFoundError(Exception):
+    """Raised when a storage key does not exist in the store."""
+
+
+def safe_extension(filename: str) -> str:
+    """
+    The lower-cased extension of a client-supplied filename, or "" if it looks unsafe.
+    """
+    extension = os.path.splitext(os.path.basename(filename or ""))[1].lower()
+    return extension if _SAFE_EXTENSION.match(extension) else ""
+
+
+def content_key(sha: str, filename: str) -> str:
+    """
+    The content-addressed storage key for a file with the given SHA-256.
+    """
+    return f"{sha[:2]}/{sha}{safe_extension(filename)}"
+
+
+async def _read_capped(upload: UploadFile, size: int, total: int, max_bytes: int) -> bytes:
+    chunk = await upload.read(size)
+    if total + len(chunk) > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+    return chunk
+
+
+class ResumeStore(ABC):
+    """
+    Where uploaded resumes live. Leads store the key returned by `save`.
+    """
+
+    max_bytes: int = RESUME_MAX_BYTES
+
+    @abstractmethod
+    async def save(self, upload: UploadFile) -> str:
+        """
+        Stream an upload into the store and return its content-addressed key.
+        Raises `UploadTooLargeError` as soon as more than `max_bytes` have been read.
+        """
+
+    @abstractmethod
+    def open(self, key: str) -> AsyncIterator[bytes]:
+        """
+        Stream the stored file in chunks. Raises `ResumeNotFoundError` for unknown keys.
+        """
+
+    async def url(self, key: str, expires_in: int = RESUME_URL_EXPIRES_SECONDS) -> Optional[str]:
+        """
+        A URL the client can download the file from directly, or None if it has to
+        be streamed through the API with `open`.
+        """
+        return None
+
+    async def close(self):
+        """
+        Release any connections the store holds.
+        """
+
+
+class LocalResumeStore(ResumeStore):
+    """
+    Stores resumes on the local filesystem under `root`.
+    """
+
+    def __init__(self, root: str, max_bytes: int = RESUME_MAX_BYTES):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """
+        The file behind `key`, relative to `root`. Paths leads stored before the
+        store existed (e.g. `./uploads/resume.pdf`, relative to the working
+        directory) are still found, as long as they resolve inside `root`; content
+        keys never depend on the working directory.
+        """
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not _CONTENT_KEY.match(key) and not os.path.exists(path):
+            legacy_path = os.path.abspath(key)
+            if self._contains(legacy_path):
+                return legacy_path
+        if not self._contains(path):
+            raise ResumeNotFoundError(key)
+        return path
+
+    def _contains(self, path: str) -> bool:
+        return os.path.commonpath([path, self.root]) == self.root
+
+    async def save(self, upload: UploadFile) -> str:
+        """
+        The file is written to a temporary file, hashed while it streams, then
+        atomically renamed to its content-addressed path, so concurrent uploads never
+        overwrite each other's half-written data. Disk writes run in the threadpool
+        to keep the event loop free.
+        """
+        max_bytes = self.max_bytes
+        if upload.size is not None and upload.size > max_bytes:
+            raise UploadTooLargeError(max_bytes)
+
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                while chunk := await _read_capped(upload, UPLOAD_CHUNK_SIZE, size, max_bytes):
+                    size += len(chunk)
+                    digest.update(chunk)
+                    await run_in_threadpool(buffer.write, chunk)
+
+            key = content_key(digest.hexdigest(), upload.filename)
+            final_path = self.path(key)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(temp_path, final_path)
+            return key
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    async def open(self, key: str) -> AsyncIterator[bytes]:
+        path = self.path(key)
+        if not os.path.isfile(path):
+            raise ResumeNotFoundError(key)
+        with open(path, "rb") as f:
+            while chunk := await run_in_threadpool(f.read, UPLOAD_CHUNK_SIZE):
+                yield chunk
+
+
+class S3ResumeStore(ResumeStore):
+    """
+    Stores resumes in an S3-compatible bucket (AWS S3, MinIO, ...).
+
+    One boto3 client, and so one connection pool, is shared by every request.
+    Uploads that fit in a single part go up with one PUT; larger ones stream as a
+    multipart upload to a temporary key, which is copied server-side to the
+    content-addressed key once the hash is known.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region_name: Optional[str] = None,
+        max_pool_connections: int = 50,
+        part_size: int = S3_PART_SIZE,
+        max_bytes: int = RESUME_MAX_BYTES,
+    ):
+        if boto3 is None:
+            raise RuntimeError("The S3 resume store requires boto3: pip install boto3")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.part_size = part_size
+        self.max_bytes = max_bytes
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region_name,
+            config=BotoConfig(
+                max_pool_connections=max_pool_connections,
+                retries={"max_attempts": 3, "mode": "standard"},
+            ),
+        )
+
+    async def close(self):
+        await run_in_threadpool(self.client.close)
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    async def save(self, upload: UploadFile) -> str:
+        max_bytes = self.max_bytes
+        if upload.size is not None and upload.size > max_bytes:
+            raise UploadTooLargeError(max_bytes)
+
+        digest = hashlib.sha256()
+        size = 0
+
+        async def read_part() -> bytes:
+            nonlocal size
+            part = await _read_capped(upload, self.part_size, size, max_bytes)
+            size += len(part)
+            digest.update(part)
+            return part
+
+        # Read one part ahead so the last part is known when it is uploaded
+        part = await read_part()
+        next_part = await read_part()
+
+        if not next_part:
+            # The whole file fits in one part, so its key is already known
+            key = content_key(digest.hexdigest(), upload.filename)
+            await run_in_threadpool(
+                self.client.put_object, Bucket=self.bucket, Key=self.object_key(key), Body=part
+            )
+            return key
+
+        temp_key = self.object_key(f"tmp/{uuid.uuid4().hex}")
+        multipart = await run_in_threadpool(
+            self.client.create_multipart_upload, Bucket=self.bucket, Key=temp_key
+        )
+        upload_id = multipart["UploadId"]
+        parts = []
+        try:
+            while part:
+                response = await run_in_threadpool(
+                    self.client.upload_part,
+                    Bucket=self.bucket, Key=temp_key, UploadId=upload_id,
+                    PartNumber=len(parts) + 1, Body=part,
+                )
+                parts.append({"PartNumber": len(parts) + 1, "ETag": response["ETag"]})
+                part = next_part
+                next_part = await read_part() if part else b""
+            await run_in_threadpool(
+                self.client.complete_multipart_upload,
+                Bucket=self.bucket, Key=temp_key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            await run_in_threadpool(
+                self.client.abort_multipart_upload, Bucket=self.bucket, Key=temp_key, UploadId=upload_id
+            )
+            raise
+
+        key = content_key(digest.hexdigest(), upload.filename)
+        await run_in_threadpool(
+            self.client.copy_object,
+            Bucket=self.bucket, Key=self.object_key(key),
+            CopySource={"Bucket": self.bucket, "Key": temp_key},
+        )
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=temp_key)
+        return key
+
+    async def open(self, key: str) -> AsyncIterator[bytes]:
+        try:
+            response = await run_in_threadpool(
+                self.client.get_object, Bucket=self.bucket, Key=self.object_key(key)
+            )
+        except self.client.exceptions.NoSuchKey:
+            raise ResumeNotFoundError(key)
+        chunks = response["Body"].iter_chunks(UPLOAD_CHUNK_SIZE)
+        while chunk := await run_in_threadpool(next, chunks, b""):
+            yield chunk
+
+    async def url(self, key: str, expires_in: int = RESUME_URL_EXPIRES_SECONDS) -> Optional[str]:
+        return await run_in_threadpool(
+            self.client.generate_presigned_url,
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self.object_key(key)},
+            ExpiresIn=expires_in,
+        )
+
+
+_resume_store: Optional[ResumeStore] = None
+
+
+def get_resume_store() -> ResumeStore:
+    """
+    The configured resume store, created on first use and shared by all requests.
+    """
+    global _resume_store
+    if _resume_store is None:
+        if RESUME_STORAGE_BACKEND == "s3":
+            _resume_store = S3ResumeStore(
+                bucket=os.environ["S3_BUCKET"],
+                prefix=os.getenv("S3_PREFIX", "resumes"),
+                endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+                region_name=os.getenv("S3_REGION"),
+                max_pool_connections=int(os.getenv("S3_MAX_POOL_CONNECTIONS", 50)),
+            )
+        else:
+            _resume_store = LocalResumeStore(os.getenv("UPLOAD_DIRECTORY", "./uploads"))
+    return _resume_store
+
+
+async def close_resume_store():
+    """
+    Close the resume store's connections, if this process ever opened it.
+    """
+    global _resume_store
+    if _resume_store is not None:
+        await _resume_store.close()
+        _resume_store = None
@@ -0,0 +1,83 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+# Directory holding the email templates, and the firm whose overrides (in
+# `firms/<firm>/` under that directory) take precedence over the defaults
+EMAIL_TEMPLATE_DIR = os.getenv(
+    "EMAIL_TEMPLATE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "email")
+)
+EMAIL_TEMPLATE_FIRM = os.getenv("EMAIL_TEMPLATE_FIRM") or None
+# Re-check template files' mtimes on render and recompile the ones that changed
+EMAIL_TEMPLATE_AUTO_RELOAD = os.getenv("EMAIL_TEMPLATE_AUTO_RELOAD", "true").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class RenderedEmail:
+    html: str
+    text: str
+
+
+class EmailTemplates:
+    """
+    Compiled, cached Jinja2 templates for outgoing email.
+
+    Each email has an HTML and a plain-text template (`<name>.html`, `<name>.txt`).
+    HTML templates autoescape every value, so lead-supplied fields cannot inject
+    markup. Templates are compiled once and kept in memory; with `auto_reload` a
+    template whose file mtime changes is recompiled on its next render.
+    """
+
+    def __init__(self, directory: str = EMAIL_TEMPLATE_DIR, auto_reload: bool = EMAIL_TEMPLATE_AUTO_RELOAD):
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=select_autoescape(enabled_extensions=("html",), default_for_string=False),
+            auto_reload=auto_reload,
+            cache_size=-1,
+            keep_trailing_newline=True,
+        )
+        # (firm, filename) -> template name, so missing firm overrides are not
+        # looked up on disk for every render
+        self._resolved: Dict[tuple, str] = {}
+
+    def warm(self):
+        """
+        Compile every template up front so the first emails don't pay for it.
+        """
+        for name in self.env.list_templates(extensions=("html", "txt")):
+            self.env.get_template(name)
+
+    def _template(self, filename: str, firm: Optional[str]) -> Template:
+        key = (firm, filename)
+        name = self._resolved.get(key)
+        if name is not None:
+            return self.env.get_template(name)
+        candidates = [f"firms/{firm}/{filename}", filename] if firm else [filename]
+        template = self.env.select_template(candidates)
+        if not self.env.auto_reload:
+            self._resolved[key] = template.name
+        return template
+
+    def render(self, name: str, /, firm: Optional[str] = EMAIL_TEMPLATE_FIRM, **context) -> RenderedEmail:
+        """
+        Render the HTML and plain-text parts of the email `name`, preferring the
+        firm's override of each part when one exists.
+        """
+        return RenderedEmail(
+            html=self._template(f"{name}.html", firm).render(**context),
+            text=self._template(f"{name}.txt", firm).render(**context),
+        )
+
+
+_email_templates: Optional[EmailTemplates] = None
+
+
+def get_email_templates() -> EmailTemplates:
+    """
+    The process-wide template set, created on first use.
+    """
+    global _email_templates
+    if _email_templates is None:
+        _email_templates = EmailTemplates()
+    return _email_templates
@@ -0,0 +1,228 @@
+"""
+Drains the email outbox. Run it as a separate process next to the API:
+
+    python -m app.workers.email_worker
+"""
+import asyncio
+import logging
+import os
+import signal
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.session import AsyncSessionLocal
+from app.models.email_outbox import EmailKind, EmailOutbox
+from app.models.lead import Lead as DBLead
+from app.services import email_service
+from app.services.outbox_service import claim_due_emails, digest_is_due, mark_failed, mark_sent
+
+logger = logging.getLogger(__name__)
+
+# How many SMTP sessions send at once (at most MAIL_POOL_SIZE), and how many emails are claimed per poll
+EMAIL_WORKER_CONCURRENCY = int(os.getenv("EMAIL_WORKER_CONCURRENCY", email_service.MAIL_POOL_SIZE))
+EMAIL_WORKER_BATCH_SIZE = int(os.getenv("EMAIL_WORKER_BATCH_SIZE", 100))
+# Seconds to sleep when the outbox is empty
+EMAIL_WORKER_POLL_INTERVAL = float(os.getenv("EMAIL_WORKER_POLL_INTERVAL", 1.0))
+# Upper bound on sends per second, 0 for no limit
+EMAIL_WORKER_MAX_PER_SECOND = float(os.getenv("EMAIL_WORKER_MAX_PER_SECOND", 0))
+# How long a claimed email stays reserved for this worker
+EMAIL_WORKER_LEASE_SECONDS = float(os.getenv("EMAIL_WORKER_LEASE_SECONDS", 300))
+# Digest mode: collect attorney notifications and send one summary every N minutes,
+# or as soon as M leads are waiting. 0 minutes sends one email per lead.
+ATTORNEY_DIGEST_MINUTES = float(os.getenv("ATTORNEY_DIGEST_MINUTES", 0))
+ATTORNEY_DIGEST_MAX_LEADS = int(os.getenv("ATTORNEY_DIGEST_MAX_LEADS", 100))
+
+
+class EmailOutboxWorker:
+    """
+    Claims due outbox rows in batches and spreads them over `concurrency` pooled
+    SMTP sessions, retrying failures with backoff and dead-lettering emails that
+    keep failing.
+
+    With `digest_minutes` set, attorney notifications are left in the outbox and
+    sent together as one digest email; prospect confirmations still go out
+    immediately.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        concurrency: int = EMAIL_WORKER_CONCURRENCY,
+        batch_size: int = EMAIL_WORKER_BATCH_SIZE,
+        poll_interval: float = EMAIL_WORKER_POLL_INTERVAL,
+        max_per_second: float = EMAIL_WORKER_MAX_PER_SECOND,
+        lease_seconds: float = EMAIL_WORKER_LEASE_SECONDS,
+        digest_minutes: float = ATTORNEY_DIGEST_MINUTES,
+        digest_max_leads: int = ATTORNEY_DIGEST_MAX_LEADS,
+    ):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_per_second = max_per_second
+        self.lease_seconds = lease_seconds
+        self.digest_minutes = digest_minutes
+        self.digest_max_leads = digest_max_leads
+        self._stopping = asyncio.Event()
+
+    def build_message(self, row: EmailOutbox, lead: DBLead):
+        if row.kind == EmailKind.PROSPECT_CONFIRMATION:
+            return email_service.build_prospect_message(lead)
+        return email_service.build_attorney_message(lead, attorney_address())
+
+    async def run_once(self) -> int:
+        """
+        Claim and send one batch of due emails, plus the attorney digest when it
+        is due. Returns how many outbox rows were claimed.
+        """
+        if not self.digest_minutes:
+            return await self.send_batch(tuple(EmailKind))
+        claimed = await self.send_batch((EmailKind.PROSPECT_CONFIRMATION,))
+        return claimed + await self.send_digest()
+
+    async def send_batch(self, kinds: Sequence[EmailKind]) -> int:
+        """
+        Claim up to `batch_size` due emails of the given kinds and send each one.
+        """
+        async with self.session_factory() as db:
+            rows = await claim_due_emails(db, self.batch_size, self.lease_seconds, kinds)
+            if not rows:
+                return 0
+            leads_by_id = await load_leads(db, rows)
+
+        started = asyncio.get_running_loop().time()
+        sent, failed, sendable = [], [], []
+        for row in rows:
+            try:
+                lead = leads_by_id.get(row.lead_id)
+                if lead is None:
+                    raise RuntimeError(f"Lead {row.lead_id} no longer exists.")
+                sendable.append((row, self.build_message(row, lead)))
+            except Exception as e:
+                failed.append((row, f"{type(e).__name__}: {e}"))
+
+        async def send_group(group):
+            # One pooled SMTP session sends the whole group
+            try:
+                results = await email_service.send_many([message for _, message in group])
+            except Exception as e:
+                # None of the group is known to have gone out; the other groups' results still count
+                results = [e] * len(group)
+            for (row, _), error in zip(group, results):
+                if error is None:
+                    sent.append(row.id)
+                else:
+                    failed.append((row, f"{type(error).__name__}: {error}"))
+
+        groups = [sendable[i::self.concurrency] for i in range(self.concurrency)]
+        await asyncio.gather(*(send_group(group) for group in groups if group))
+
+        async with self.session_factory() as db:
+            await mark_sent(db, sent)
+            for row, error in failed:
+                logger.warning("Email %s (%s) for lead %s failed: %s", row.id, row.kind.value, row.lead_id, error)
+                await mark_failed(db, row, error)
+
+        logger.info("Sent %d emails, %d failed.", len(sent), len(failed))
+
+        # Stretch the batch out to stay under the configured send rate
+        if self.max_per_second:
+            elapsed = asyncio.get_running_loop().time() - started
+            await asyncio.sleep(max(0, len(rows) / self.max_per_second - elapsed))
+        return len(rows)
+
+    async def send_digest(self) -> int:
+        """
+        Once `digest_max_leads` attorney notifications are waiting, or the oldest
+        has waited `digest_minutes`, claim up to `digest_max_leads` of them and
+        send a single summary email. Returns how many rows were claimed.
+        """
+        async with self.session_factory() as db:
+            max_age = timedelta(minutes=self.digest_minutes)
+            if not await digest_is_due(db, self.digest_max_leads, max_age):
+                return 0
+            rows = await claim_due_emails(
+                db, self.digest_max_leads, self.lease_seconds, (EmailKind.ATTORNEY_NOTIFICATION,)
+            )
+            if not rows:
+                return 0
+            leads_by_id = await load_leads(db, rows)
+
+        included = [row for row in rows if row.lead_id in leads_by_id]
+        failed = [(row, f"RuntimeError: Lead {row.lead_id} no longer exists.") for row in rows if row.lead_id not in leads_by_id]
+        if included:
+            try:
+                message = email_service.build_attorney_digest_message(
+                    [leads_by_id[row.lead_id] for row in included], attorney_address()
+                )
+                error = (await email_service.send_many([message]))[0]
+            except Exception as e:
+                error = e
+            if error is not None:
+                failed.extend((row, f"{type(error).__name__}: {error}") for row in included)
+                included = []
+
+        async with self.session_factory() as db:
+            await mark_sent(db, [row.id for row in included])
+            for row, error in failed:
+                await mark_failed(db, row, error)
+
+        if included:
+            logger.info("Sent attorney digest covering %d leads.", len(included))
+        if failed:
+            logger.warning("Attorney digest failed for %d leads: %s", len(failed), failed[0][1])
+        return len(rows)
+
+    async def run(self):
+        """
+        Drain the outbox until `stop` is called, sleeping while it is empty.
+        """
+        while not self._stopping.is_set():
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Email worker iteration failed.")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stop(self):
+        self._stopping.set()
+
+
+def attorney_address() -> str:
+    attorney_email_address = os.getenv("ATTORNEY_EMAIL")
+    if not attorney_email_address:
+        raise RuntimeError("ATTORNEY_EMAIL environment variable not set.")
+    return attorney_email_address
+
+
+async def load_leads(db, rows: List[EmailOutbox]) -> Dict[int, DBLead]:
+    """
+    The leads the claimed outbox rows belong to, by id.
+    """
+    leads = await db.execute(select(DBLead).where(DBLead.id.in_({row.lead_id for row in rows})))
+    return {lead.id: lead for lead in leads.scalars()}
+
+
+async def main(worker: Optional[EmailOutboxWorker] = None):
+    worker = worker or EmailOutboxWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    logger.info(
+        "Email worker started (concurrency=%d, attorney digest every %s minutes).",
+        worker.concurrency, worker.digest_minutes or "-",
+    )
+    await worker.run()
+    await email_service.close_mail_pool()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""
+Renders/sec for the new-lead emails.
+
+  1. f-string  - the inline f-string bodies the service used to build
+  2. uncached  - Jinja2 templates compiled from source on every render
+  3. cached    - the service's EmailTemplates (compiled once, HTML + text parts)
+
+Usage: python -m benchmarks.bench_email_templates [--renders 20000]
+"""
+import argparse
+import os
+import time
+
+from jinja2 import Environment, select_autoescape
+
+from app.models.lead import Lead
+from app.services.template_service import EMAIL_TEMPLATE_DIR, EmailTemplates
+
+NAMES = ("prospect_confirmation", "attorney_notification")
+
+
+def make_lead() -> Lead:
+    lead = Lead()
+    lead.id = 1
+    lead.first_name = "María"
+    lead.last_name = "O'Brien"
+    lead.email = "maria@example.com"
+    lead.resume_path = "ab/abcdef.pdf"
+    return lead
+
+
+def render_fstring(lead: Lead):
+    prospect = f"""
+    <html><body>
+    <p>Dear {lead.first_name},</p>
+    <p>Thank you for your submission. We have received your information and will be in touch shortly.</p>
+    <p>Best regards,<br>Lead Tracking Service</p>
+    </body></html>
+    """
+    attorney = f"""
+    <html><body>
+    <p>A new lead has been submitted:</p>
+    <ul>
+        <li><b>Name:</b> {lead.first_name} {lead.last_name}</li>
+        <li><b>Email:</b> {lead.email}</li>
+        <li><b>Resume:</b> {lead.resume_path}</li>
+    </ul>
+    </body></html>
+    """
+    return prospect, attorney
+
+
+def load_sources():
+    sources = {}
+    for name in NAMES:
+        for ext in ("html", "txt"):
+            with open(os.path.join(EMAIL_TEMPLATE_DIR, f"{name}.{ext}")) as f:
+                sources[f"{name}.{ext}"] = f.read()
+    return sources
+
+
+def timed(label: str, renders: int, render):
+    start = time.perf_counter()
+    for _ in range(renders):
+        render()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {renders / elapsed:>10.0f} renders/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=20000)
+    args = parser.parse_args()
+
+    lead = make_lead()
+    context = dict(lead=lead, sender_name="Lead Tracking Service")
+    sources = load_sources()
+    env = Environment(autoescape=select_autoescape(("html",), default_for_string=False))
+    templates = EmailTemplates(auto_reload=False)
+    templates.warm()
+
+    def render_uncached():
+        for filename, source in sources.items():
+            env.from_string(source).render(**context)
+
+    def render_cached():
+        for name in NAMES:
+            templates.render(name, **context)
+
+    # Each "render" produces both emails for one lead
+    timed("f-string", args.renders, lambda: render_fstring(lead))
+    timed("uncached", max(args.renders // 50, 1), render_uncached)
+    timed("cached", args.renders, render_cached)
+
+
+if __name__ == "__main__":
+    main()
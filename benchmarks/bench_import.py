@@ -0,0 +1,81 @@
+"""
+Rows/sec imported from a CSV file into SQLite.
+
+  1. per-row      - what a client looping over POST /api/v1/leads/ costs: a
+                    duplicate check, an insert and a commit for every row
+  2. bulk-<N>     - import_service.import_leads with chunks of N rows: one
+                    dedupe query and one executemany INSERT per chunk
+
+Usage: python -m benchmarks.bench_import [--rows 20000] [--chunk-sizes 100,1000,5000]
+"""
+import argparse
+import asyncio
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.sqlite import configure_sqlite_engine
+from app.models.lead import Base, Lead as DBLead
+from app.services.import_service import import_leads, read_records
+
+
+def make_csv(rows: int) -> bytes:
+    lines = ["first_name,last_name,email"]
+    lines += [f"Bench,{i},bench{i}@example.com" for i in range(rows)]
+    # Every tenth row repeats an earlier email, as partner files often do
+    lines += [f"Bench,{i},bench{i}@example.com" for i in range(0, rows, 10)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def new_database(path: Path) -> async_sessionmaker:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    configure_sqlite_engine(engine.sync_engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+
+
+async def import_per_row(session_factory: async_sessionmaker, data: bytes):
+    async with session_factory() as db:
+        for _, record in read_records(io.BytesIO(data), "csv"):
+            if (await db.execute(select(DBLead.id).where(DBLead.email == record["email"]))).first():
+                continue
+            db.add(DBLead(**record))
+            await db.commit()
+
+
+async def timed(label: str, rows: int, coro):
+    start = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {rows / elapsed:>10.0f} rows/sec")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--chunk-sizes", default="100,1000,5000")
+    args = parser.parse_args()
+
+    data = make_csv(args.rows)
+    total = data.count(b"\n") - 1
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = await new_database(Path(directory) / "per-row.db")
+        await timed("per-row", total, import_per_row(session_factory, data))
+
+        for chunk_size in (int(size) for size in args.chunk_sizes.split(",")):
+            session_factory = await new_database(Path(directory) / f"bulk-{chunk_size}.db")
+
+            async def bulk():
+                async with session_factory() as db:
+                    await import_leads(db, read_records(io.BytesIO(data), "csv"), chunk_size=chunk_size)
+
+            await timed(f"bulk-{chunk_size}", total, bulk())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
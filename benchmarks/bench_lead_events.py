@@ -0,0 +1,118 @@
+"""
+How many idle subscribers one worker can hold on GET /api/v1/leads/events.
+
+Starts one uvicorn worker serving app.main against a scratch SQLite database.
+It then opens idle SSE connections in steps, and after each step reports the
+worker's resident memory and the time from POST /api/v1/leads/ until every
+subscriber has read the `lead.created` event.
+
+Usage: python -m benchmarks.bench_lead_events [--subscribers 1000,5000,10000] [--port 8765]
+
+Each subscriber takes a file descriptor on both sides, so `ulimit -n` must be
+above the largest step.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+# The legacy shared key the benchmarked server is started with
+API_KEY = "bench-api-key"
+# Connections opened at once, kept below uvicorn's listen backlog
+CONNECT_BATCH = 500
+
+
+def rss_mib(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def subscribe(port: int):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET /api/v1/leads/events HTTP/1.1\r\nHost: bench\r\nX-API-Key: {API_KEY}\r\n"
+        "Accept: text/event-stream\r\n\r\n".encode()
+    )
+    await writer.drain()
+    await reader.readuntil(b"retry:")
+    return reader, writer
+
+
+async def wait_for_server(port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(f"http://127.0.0.1:{port}/")
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", default="1000,5000,10000")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    steps = [int(step) for step in args.subscribers.split(",")]
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{directory}/bench.db",
+            UPLOAD_DIRECTORY=f"{directory}/uploads",
+            API_KEY=API_KEY,
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+            env=env,
+        )
+        subscribers = []
+        try:
+            await wait_for_server(args.port)
+            baseline = rss_mib(server.pid)
+            print(f"{'subscribers':>11} {'RSS MiB':>9} {'KiB/sub':>8} {'fan-out ms':>11}")
+            print(f"{0:>11} {baseline:>9.1f}")
+
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}") as client:
+                for lead_number, step in enumerate(steps):
+                    while len(subscribers) < step:
+                        batch = min(CONNECT_BATCH, step - len(subscribers))
+                        subscribers += await asyncio.gather(*(subscribe(args.port) for _ in range(batch)))
+                    await asyncio.sleep(1)
+                    rss = rss_mib(server.pid)
+
+                    start = time.perf_counter()
+                    response = await client.post(
+                        "/api/v1/leads/",
+                        data={"first_name": "Bench", "last_name": "Lead", "email": f"bench{lead_number}@example.com"},
+                        files={"resume": ("resume.txt", b"resume", "text/plain")},
+                    )
+                    response.raise_for_status()
+                    await asyncio.gather(*(reader.readuntil(b"event: lead.created") for reader, _ in subscribers))
+                    fan_out = (time.perf_counter() - start) * 1000
+
+                    print(f"{step:>11} {rss:>9.1f} {(rss - baseline) * 1024 / step:>8.1f} {fan_out:>11.1f}")
+        finally:
+            for _, writer in subscribers:
+                writer.close()
+            await asyncio.gather(*(writer.wait_closed() for _, writer in subscribers), return_exceptions=True)
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Polls/sec of GET /api/v1/leads/ (one 100-lead page) through the ASGI app, the
+way an attorney dashboard polls it.
+
+  1. miss          - the lead version is bumped before every poll, so each one
+                     runs the query and serializes the page
+  2. hit           - the page is served from the response cache
+  3. not-modified  - the poll sends the ETag it got last time and gets a 304
+
+Usage: python -m benchmarks.bench_list_cache [--leads 10000] [--polls 2000]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1 import leads
+from app.db.migrations import migrate
+from app.db.session import get_async_db
+from app.db.sqlite import configure_sqlite_engine
+from app.models.lead import Lead as DBLead
+from app.services.api_key_service import ApiKeyStore, get_api_key_store
+from app.services.cache_service import get_response_cache, MemoryResponseCache, LEADS_CACHE_NAMESPACE
+
+# The legacy shared key the benchmarked app's key store accepts
+API_KEY = "bench-api-key"
+
+
+async def new_app(path: Path, lead_count: int, cache: MemoryResponseCache) -> FastAPI:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    configure_sqlite_engine(engine.sync_engine)
+    async with engine.connect() as conn:
+        await conn.run_sync(migrate)
+        start = datetime(2024, 1, 1)
+        await conn.execute(insert(DBLead), [
+            dict(first_name="Bench", last_name=str(i), email=f"bench{i}@example.com",
+                 created_at=start + timedelta(seconds=i))
+            for i in range(lead_count)
+        ])
+        await conn.commit()
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    store = ApiKeyStore(session_factory, legacy_key=API_KEY)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(leads.router, prefix="/api/v1/leads")
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_response_cache] = lambda: cache
+    app.dependency_overrides[get_api_key_store] = lambda: store
+    return app
+
+
+async def timed(label: str, polls: int, poll):
+    start = time.perf_counter()
+    for _ in range(polls):
+        await poll()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14} {polls / elapsed:>8.0f} polls/sec  {elapsed / polls * 1000:>7.2f} ms/poll")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=10000)
+    parser.add_argument("--polls", type=int, default=2000)
+    args = parser.parse_args()
+
+    cache = MemoryResponseCache()
+    with tempfile.TemporaryDirectory() as directory:
+        app = await new_app(Path(directory) / "bench.db", args.leads, cache)
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench", headers={"X-API-Key": API_KEY}) as client:
+
+            async def miss():
+                await cache.bump(LEADS_CACHE_NAMESPACE)
+                assert (await client.get("/api/v1/leads/")).status_code == 200
+
+            async def hit():
+                assert (await client.get("/api/v1/leads/")).status_code == 200
+
+            async def not_modified():
+                assert (await client.get("/api/v1/leads/", headers={"If-None-Match": etag})).status_code == 304
+
+            await timed("miss", args.polls, miss)
+            etag = (await client.get("/api/v1/leads/")).headers["etag"]
+            await timed("hit", args.polls, hit)
+            await timed("not-modified", args.polls, not_modified)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Search latency on a large SQLite corpus.
+
+Seeds a database with --rows leads (names, emails and a short resume each),
+then times GET /api/v1/leads/search-style queries through the search index and
+prints p50/p95/max milliseconds per query.
+
+Usage: python -m benchmarks.bench_search [--rows 1000000] [--queries 200]
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.migrations import run_migrations
+from app.db.sqlite import configure_sqlite_engine
+from app.services.search_service import search_index_for
+
+FIRST_NAMES = ["Maria", "James", "Wei", "Fatima", "Olga", "Carlos", "Aisha", "John", "Priya", "Lucas"]
+LAST_NAMES = ["Garcia", "Smith", "Chen", "Khan", "Ivanova", "Silva", "Okafor", "Brown", "Patel", "Martin"]
+SKILLS = ["litigation", "patent", "immigration", "tax", "maritime", "contracts", "compliance", "family", "estate"]
+
+
+def seed(path: Path, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    configure_sqlite_engine(engine)
+    run_migrations(engine)
+    engine.dispose()
+
+    rng = random.Random(0)
+    conn = sqlite3.connect(path)
+    leads = []
+    for i in range(rows):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        resume = " ".join(rng.sample(SKILLS, 3)) + f" candidate {i}"
+        leads.append((i + 1, f"{first}{i % 997}", last, f"{first.lower()}.{last.lower()}{i}@example.com", resume))
+    conn.executemany(
+        "INSERT INTO leads (id, first_name, last_name, email, state, version, created_at) "
+        "VALUES (?, ?, ?, ?, 'PENDING', 1, '2024-01-01 00:00:00')",
+        [lead[:4] for lead in leads],
+    )
+    conn.executemany(
+        "INSERT INTO leads_fts (rowid, first_name, last_name, email, resume_text) VALUES (?, ?, ?, ?, ?)", leads
+    )
+    conn.commit()
+    conn.close()
+
+
+async def run(path: Path, queries: int):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    configure_sqlite_engine(engine.sync_engine)
+    session_factory = async_sessionmaker(bind=engine)
+    rng = random.Random(1)
+    samples = {"rare": [], "common": []}
+    async with session_factory() as db:
+        index = search_index_for(db)
+        for _ in range(queries):
+            # A name plus a number matches a handful of leads; a bare skill matches a third of them
+            for kind, query in (
+                ("rare", f"{rng.choice(FIRST_NAMES).lower()}{rng.randrange(997)} {rng.choice(LAST_NAMES)}"),
+                ("common", rng.choice(SKILLS)),
+            ):
+                start = time.perf_counter()
+                await index.search(db, query, limit=20)
+                samples[kind].append((time.perf_counter() - start) * 1000)
+    await engine.dispose()
+
+    for kind, timings in samples.items():
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{kind:<7} p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms   max {timings[-1]:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "search.db"
+        start = time.perf_counter()
+        seed(path, args.rows)
+        print(f"Seeded {args.rows} leads in {time.perf_counter() - start:.1f}s")
+        asyncio.run(run(path, args.queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Messages/sec sent to a local aiosmtpd stand-in, with and without the SMTP pool.
+
+  1. per-message  - a new FastMail (new connection + handshake) for every message
+  2. pool         - concurrent send_message calls over the pooled sessions
+  3. send_many    - batches of messages over one session each
+
+Set --handshake-ms to simulate the extra latency of STARTTLS + AUTH against a real
+mail server; the stand-in adds it to every new session's EHLO.
+
+Usage: python -m benchmarks.bench_smtp [--messages 500] [--pool-size 5] [--handshake-ms 20]
+"""
+import argparse
+import asyncio
+import socket
+import time
+
+from aiosmtpd.controller import Controller
+from fastapi_mail import ConnectionConfig, FastMail, MessageSchema
+
+from app.services.smtp_pool import SMTPConnectionPool
+
+
+class SlowHandshakeHandler:
+    def __init__(self, handshake_seconds: float):
+        self.handshake_seconds = handshake_seconds
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        await asyncio.sleep(self.handshake_seconds)
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        return "250 Message accepted"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_messages(count: int):
+    return [
+        MessageSchema(subject="Benchmark", recipients=[f"user{i}@example.com"], body="<p>Hi</p>", subtype="html")
+        for i in range(count)
+    ]
+
+
+async def timed(label: str, count: int, handler: SlowHandshakeHandler, coro):
+    handler.sessions = 0
+    start = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {count / elapsed:>8.0f} messages/sec  ({handler.sessions} SMTP sessions)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--handshake-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    port = free_port()
+    handler = SlowHandshakeHandler(args.handshake_ms / 1000)
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    config = ConnectionConfig(
+        MAIL_USERNAME="", MAIL_PASSWORD="", MAIL_FROM="leads@example.com", MAIL_PORT=port,
+        MAIL_SERVER="127.0.0.1", MAIL_STARTTLS=False, MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False, VALIDATE_CERTS=False,
+    )
+
+    try:
+        semaphore = asyncio.Semaphore(args.pool_size)
+
+        async def per_message(message):
+            async with semaphore:
+                await FastMail(config).send_message(message)
+
+        await timed("per-message", args.messages, handler,
+                    asyncio.gather(*(per_message(m) for m in make_messages(args.messages))))
+
+        pool = SMTPConnectionPool(config, max_size=args.pool_size)
+        await timed("pool", args.messages, handler,
+                    asyncio.gather(*(pool.send_message(m) for m in make_messages(args.messages))))
+        await pool.close()
+
+        pool = SMTPConnectionPool(config, max_size=args.pool_size)
+        messages = make_messages(args.messages)
+        groups = [messages[i::args.pool_size] for i in range(args.pool_size)]
+        await timed("send_many", args.messages, handler,
+                    asyncio.gather(*(pool.send_many(group) for group in groups)))
+        await pool.close()
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
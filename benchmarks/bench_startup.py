@@ -0,0 +1,104 @@
+"""
+Cold-start time of the API.
+
+  1. import - seconds to `import app.main` in a fresh interpreter
+  2. serve  - seconds from launching uvicorn with --workers N against a new,
+              empty SQLite database until every worker has logged
+              "Application startup complete", and until the first request
+              is answered
+
+Usage: python -m benchmarks.bench_startup [--workers 1,4] [--repeat 3] [--port 8766]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+STARTUP_COMPLETE = "Application startup complete"
+
+
+def import_seconds(env: dict) -> float:
+    code = "import time; start = time.perf_counter(); import app.main; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def serve_seconds(env: dict, workers: int, port: int, command: list) -> tuple:
+    """
+    Returns (seconds until the first response, seconds until every worker has started).
+    """
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m"] + command + ["--port", str(port), "--workers", str(workers), "--log-level", "info", "--no-access-log"],
+        env=env, stderr=subprocess.PIPE, text=True,
+    )
+    started = []
+    all_started = threading.Event()
+
+    def watch_log():
+        for line in server.stderr:
+            if STARTUP_COMPLETE in line:
+                started.append(time.perf_counter())
+                if len(started) == workers:
+                    all_started.set()
+
+    threading.Thread(target=watch_log, daemon=True).start()
+    try:
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/", timeout=1).raise_for_status()
+                first_response = time.perf_counter() - start
+                break
+            except httpx.TransportError:
+                if server.poll() is not None:
+                    raise RuntimeError(f"The server exited with {server.returncode}")
+                time.sleep(0.01)
+        if not all_started.wait(timeout=60):
+            raise RuntimeError(f"Only {len(started)} of {workers} workers started")
+        return first_response, started[-1] - start
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,4")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument(
+        "--command", default="app.cli.serve",
+        help="module (and arguments) that serves the app and accepts --port/--workers, e.g. 'uvicorn app.main:app'",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, UPLOAD_DIRECTORY=f"{directory}/uploads")
+
+        imports = [import_seconds(dict(env, DATABASE_URL=f"sqlite:///{directory}/import{i}.db"))
+                   for i in range(args.repeat)]
+        print(f"{'import':<10} {statistics.median(imports) * 1000:>8.0f} ms")
+
+        for workers in (int(n) for n in args.workers.split(",")):
+            runs = [
+                serve_seconds(dict(env, DATABASE_URL=f"sqlite:///{directory}/serve{workers}-{i}.db"),
+                              workers, args.port, args.command.split())
+                for i in range(args.repeat)
+            ]
+            first = statistics.median(run[0] for run in runs)
+            every = statistics.median(run[1] for run in runs)
+            print(f"{f'serve x{workers}':<10} {first * 1000:>8.0f} ms to first response, "
+                  f"{every * 1000:>6.0f} ms until every worker started")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+Load test of the lead API: latency percentiles and requests/sec under a mixed,
+concurrent workload, at several database sizes.
+
+Serves app.main in-process over ASGI against a scratch SQLite database, with
+the email worker draining the outbox into a local aiosmtpd stand-in. For each
+size in --rows a fresh database is seeded with that many leads, then --requests
+requests are spread over --concurrency clients:
+
+  create  - POST /api/v1/leads/ with a resume, cycling through --resume-sizes
+  list    - GET /api/v1/leads/, the first page, a page of PENDING leads, or the
+            page after a random point in time
+  patch   - PATCH /api/v1/leads/{id}/state, moving a seeded PENDING lead on
+
+in the proportions given by --mix. Operations are drawn from a seeded random
+generator, so two runs with the same arguments send the same requests.
+
+The results (p50/p95/p99 latency and requests/sec per operation, plus the
+commit they were measured at) are written as JSON. Pass a previous results
+file as --compare to print the change against it.
+
+Usage: python -m benchmarks.load_test [--rows 10000,100000,1000000] [--requests 3000]
+           [--concurrency 50] [--mix create=1,list=6,patch=3] [--resume-sizes 10k,200k,2m]
+           [--output results.json] [--compare baseline.json] [--verbose]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+OPERATIONS = ("create", "list", "patch")
+BASE_TIME = datetime(2024, 1, 1)
+# Every ninth seeded lead is PENDING; those are the ones the patch operation moves on
+PENDING_EVERY = 9
+SEEDED_STATES = ["REACHED_OUT"] * 5 + ["QUALIFIED", "RETAINED", "REJECTED", "PENDING"]
+SIZE_SUFFIXES = {"k": 1024, "m": 1024 ** 2}
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    if value[-1:] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{name}', expected one of {', '.join(OPERATIONS)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True)
+        return commit + ("-dirty" if dirty.stdout.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def seed_leads(path: Path, count: int):
+    """
+    Insert `count` leads straight through sqlite3, and index them for search.
+    """
+    conn = sqlite3.connect(path)
+    rows = (
+        (
+            f"First{i}", f"Last{i}", f"lead{i}@example.com", f"ab/{i}.pdf",
+            SEEDED_STATES[i % PENDING_EVERY], 1, (BASE_TIME + timedelta(seconds=i)).isoformat(" "),
+        )
+        for i in range(count)
+    )
+    conn.executemany(
+        "INSERT INTO leads (first_name, last_name, email, resume_path, state, version, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.execute(
+        "INSERT INTO leads_fts (rowid, first_name, last_name, email) SELECT id, first_name, last_name, email FROM leads"
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+
+def resume_text(size: int) -> bytes:
+    words = b"litigation contract negotiation compliance immigration paralegal research "
+    return (words * (size // len(words) + 1))[:size]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    summary = {"requests": len(latencies), "errors": errors, "requests_per_sec": len(latencies) / elapsed}
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        summary.update(p50_ms=cuts[49] * 1000, p95_ms=cuts[94] * 1000, p99_ms=cuts[98] * 1000)
+    elif latencies:
+        summary.update(p50_ms=latencies[0] * 1000, p95_ms=latencies[0] * 1000, p99_ms=latencies[0] * 1000)
+    return summary
+
+
+class Workload:
+    """
+    The requests of one run, drawn up front from a seeded generator.
+    """
+
+    def __init__(self, args, rows: int, run: int):
+        self.random = random.Random(args.seed + run)
+        names = list(args.mix)
+        self.operations = self.random.choices(names, weights=[args.mix[name] for name in names], k=args.requests)
+        self.resume_sizes = args.resume_sizes
+        self.rows = rows
+        self.run = run
+        # Seeded ids are 1-based; lead i (0-based) was seeded PENDING when i % PENDING_EVERY == PENDING_EVERY - 1
+        self.pending_ids = list(range(PENDING_EVERY, rows + 1, PENDING_EVERY))
+        self.random.shuffle(self.pending_ids)
+        # Plain-text resumes, so the resume text indexer has words to extract
+        self.resumes = {size: resume_text(size) for size in set(self.resume_sizes)}
+
+    def request(self, index: int, operation: str) -> dict:
+        if operation == "create":
+            size = self.resume_sizes[index % len(self.resume_sizes)]
+            return dict(
+                method="POST", url="/api/v1/leads/",
+                data={"first_name": "Load", "last_name": str(index), "email": f"load{self.run}-{index}@example.com"},
+                files={"resume": ("resume.txt", self.resumes[size], "text/plain")},
+            )
+        if operation == "patch":
+            # Each PENDING lead is moved once; once they run out, moves repeat and come back 409
+            lead_id = self.pending_ids[index % len(self.pending_ids)]
+            return dict(method="PATCH", url=f"/api/v1/leads/{lead_id}/state", json={"state": "REACHED_OUT"})
+        page = self.random.randrange(3)
+        if page == 0:
+            params = {"limit": 50}
+        elif page == 1:
+            params = {"limit": 50, "state": "PENDING"}
+        else:
+            created_after = BASE_TIME + timedelta(seconds=self.random.randrange(self.rows))
+            params = {"limit": 50, "created_after": created_after.isoformat()}
+        return dict(method="GET", url="/api/v1/leads/", params=params)
+
+
+async def drive(client, workload: Workload, concurrency: int) -> dict:
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    requests = iter([workload.request(i, op) | {"operation": op} for i, op in enumerate(workload.operations)])
+
+    async def client_loop():
+        for request in requests:
+            operation = request.pop("operation")
+            start = time.perf_counter()
+            response = await client.request(**request)
+            latencies[operation].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[operation] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    everything = [latency for values in latencies.values() for latency in values]
+    return {
+        "elapsed_seconds": elapsed,
+        "total": summarize(everything, sum(errors.values()), elapsed),
+        "operations": {op: summarize(latencies[op], errors[op], elapsed) for op in OPERATIONS if latencies[op]},
+    }
+
+
+async def run(args, directory: Path) -> List[dict]:
+    from aiosmtpd.controller import Controller
+    from fastapi_mail import ConnectionConfig
+    from httpx import ASGITransport, AsyncClient
+
+    # The app reads its configuration when imported
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{directory / 'load.db'}",
+        UPLOAD_DIRECTORY=str(directory / "uploads"),
+        ATTORNEY_EMAIL="attorney@example.com",
+    )
+    os.environ.setdefault("API_KEY", "load-test-key")
+    # Every request comes from one client IP and email domain; measure the API, not its rate limits
+    for name in ("LEAD_SUBMIT_IP_PER_MINUTE", "LEAD_SUBMIT_IP_BURST", "LEAD_SUBMIT_DOMAIN_PER_MINUTE",
+                 "LEAD_SUBMIT_DOMAIN_BURST"):
+        os.environ.setdefault(name, "1000000")
+    from app.api.v1.dependencies import API_KEY
+    from app.db.migrations import run_migrations
+    from app.db.session import async_engine
+    from app.main import app
+    from app.services import email_service
+    from app.services import cache_service
+    from app.services.smtp_pool import SMTPConnectionPool
+    from app.workers.email_worker import EmailOutboxWorker
+
+    class CountingHandler:
+        messages = 0
+
+        async def handle_DATA(self, server, session, envelope):
+            self.messages += 1
+            return "250 Message accepted"
+
+    async def reset_database(rows: int):
+        # Every size starts from a fresh database, so seeded ids are 1..rows
+        await async_engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{database}{suffix}").unlink(missing_ok=True)
+        run_migrations()
+        started = time.perf_counter()
+        seed_leads(database, rows)
+        print(f"Seeded {rows} leads in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        # The new database counts versions from scratch, so pages cached from the previous one must go
+        cache_service._response_cache = None
+
+    database = directory / "load.db"
+    port = free_port()
+    handler = CountingHandler()
+    smtp = Controller(handler, hostname="127.0.0.1", port=port)
+    smtp.start()
+    email_service._mail_pool = SMTPConnectionPool(
+        ConnectionConfig(
+            MAIL_USERNAME="", MAIL_PASSWORD="", MAIL_FROM="leads@example.com", MAIL_PORT=port,
+            MAIL_SERVER="127.0.0.1", MAIL_STARTTLS=False, MAIL_SSL_TLS=False,
+            USE_CREDENTIALS=False, VALIDATE_CERTS=False,
+        ),
+        max_size=email_service.MAIL_POOL_SIZE,
+    )
+
+    results = []
+    try:
+        async with app.router.lifespan_context(app):
+            # Unhandled errors come back as 500s and are counted, rather than ending the run
+            transport = ASGITransport(app=app, raise_app_exceptions=False)
+            async with AsyncClient(transport=transport, base_url="http://load", headers={"X-API-Key": API_KEY}) as client:
+                for run_number, rows in enumerate(args.rows):
+                    await reset_database(rows)
+                    handler.messages = 0
+                    worker = EmailOutboxWorker(poll_interval=0.1)
+                    worker_task = asyncio.create_task(worker.run())
+                    try:
+                        result = await drive(client, Workload(args, rows, run_number), args.concurrency)
+                    finally:
+                        worker.stop()
+                        await worker_task
+                    result.update(rows=rows, emails_delivered=handler.messages)
+                    results.append(result)
+                    print_result(result)
+    finally:
+        await email_service.close_mail_pool()
+        smtp.stop()
+    return results
+
+
+def print_result(result: dict):
+    print(f"\n{result['rows']} leads: {result['total']['requests_per_sec']:.0f} requests/sec, "
+          f"{result['emails_delivered']} emails delivered")
+    print(f"{'operation':<10} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, op in [("total", result["total"])] + list(result["operations"].items()):
+        line = (f"{name:<10} {op['requests']:>8} {op['errors']:>6} {op['requests_per_sec']:>8.0f} "
+                f"{op.get('p50_ms', 0):>8.1f} {op.get('p95_ms', 0):>8.1f} {op.get('p99_ms', 0):>8.1f}")
+        print(line)
+
+
+def compare(results: List[dict], baseline_path: Path):
+    """
+    Print each operation's change in throughput and p95 latency against a previous results file.
+    """
+    baseline = json.loads(baseline_path.read_text())
+    before = {result["rows"]: result for result in baseline["results"]}
+    print(f"\nCompared with {baseline['commit']} ({baseline_path}):")
+    print(f"{'leads':>9} {'operation':<10} {'req/s':>16} {'p95 ms':>18}")
+    for result in results:
+        old = before.get(result["rows"])
+        if old is None:
+            continue
+        for name in ("total",) + OPERATIONS:
+            new_op = result["total"] if name == "total" else result["operations"].get(name)
+            old_op = old["total"] if name == "total" else old["operations"].get(name)
+            if not new_op or not old_op or "p95_ms" not in new_op or "p95_ms" not in old_op:
+                continue
+            rps = (new_op["requests_per_sec"] / old_op["requests_per_sec"] - 1) * 100
+            p95 = (new_op["p95_ms"] / old_op["p95_ms"] - 1) * 100
+            print(f"{result['rows']:>9} {name:<10} {new_op['requests_per_sec']:>8.0f} ({rps:+5.1f}%) "
+                  f"{new_op['p95_ms']:>9.1f} ({p95:+5.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000,1000000")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("create=1,list=6,patch=3"))
+    parser.add_argument("--resume-sizes", default="10k,200k,2m")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--verbose", action="store_true", help="log the app's warnings and errors")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING if args.verbose else logging.CRITICAL)
+    args.rows = sorted(int(rows) for rows in args.rows.split(","))
+    args.resume_sizes = [parse_size(size) for size in args.resume_sizes.split(",")]
+
+    commit = git_commit()
+    with tempfile.TemporaryDirectory() as directory:
+        results = asyncio.run(run(args, Path(directory)))
+
+    report = {
+        "commit": commit,
+        "measured_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "requests": args.requests, "concurrency": args.concurrency, "mix": args.mix,
+            "resume_sizes": args.resume_sizes, "seed": args.seed,
+        },
+        "results": results,
+    }
+    output = args.output or Path(f"load_test-{commit}.json")
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
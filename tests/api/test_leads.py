@@ -0,0 +1,501 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import event, select, true
+
+from app.api.middleware import RequestSizeLimitMiddleware
+from app.api.v1 import leads
+from app.crud.lead import build_leads_query
+from app.db.group_commit import GroupCommitWriter
+from app.models.email_outbox import EmailKind, EmailOutbox
+from app.models.lead import Lead as DBLead
+from app.schemas.lead import Lead, LeadState
+from app.services.api_key_service import READ_LEADS
+from app.services.cache_service import LEADS_CACHE_NAMESPACE
+from app.services.rate_limit_service import RateLimit
+from app.services.search_service import search_index_for
+from app.services.storage_service import get_resume_store, LocalResumeStore
+
+
+BASE_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+async def seeded_leads(db_sessionmaker):
+    """Fixture that inserts five leads, alternating states, one minute apart."""
+    async with db_sessionmaker() as db:
+        for i in range(5):
+            db.add(DBLead(
+                first_name=f"First{i}",
+                last_name=f"Last{i}",
+                email=f"lead{i}@example.com",
+                resume_path=f"./uploads/resume{i}.pdf",
+                state=LeadState.PENDING if i % 2 == 0 else LeadState.REACHED_OUT,
+                created_at=BASE_TIME + timedelta(minutes=i),
+            ))
+        await db.commit()
+
+
+async def test_get_leads_requires_api_key(client, seeded_leads):
+    """Test that the list endpoint rejects requests without a valid API key."""
+    response = await client.get("/api/v1/leads/", headers={"X-API-Key": "wrong"})
+    assert response.status_code == 403
+
+
+async def test_api_key_scopes_are_enforced(client, api_key_store, seeded_leads):
+    """Test that an issued key can only call the endpoints its scopes allow, until revoked."""
+    key, identity = await api_key_store.create("Read only", [READ_LEADS])
+
+    response = await client.get("/api/v1/leads/", headers={"X-API-Key": key})
+    assert response.status_code == 200
+    response = await client.patch("/api/v1/leads/1/state", json={"state": "REACHED_OUT"}, headers={"X-API-Key": key})
+    assert response.status_code == 403
+    assert "leads:write" in response.json()["detail"]
+
+    await api_key_store.revoke(identity.id)
+    response = await client.get("/api/v1/leads/", headers={"X-API-Key": key})
+    assert response.status_code == 403
+
+
+async def test_get_leads_keyset_pagination(client, seeded_leads):
+    """Test that following X-Next-Cursor walks every lead exactly once, in order."""
+    response = await client.get("/api/v1/leads/", params={"limit": 2})
+    assert response.status_code == 200
+    assert [lead["email"] for lead in response.json()] == ["lead0@example.com", "lead1@example.com"]
+
+    seen = [lead["id"] for lead in response.json()]
+    cursor = response.headers["X-Next-Cursor"]
+    while cursor:
+        response = await client.get("/api/v1/leads/", params={"limit": 2, "cursor": cursor})
+        seen.extend(lead["id"] for lead in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+
+async def test_get_leads_last_page_has_no_cursor(client, seeded_leads):
+    """Test that no cursor is returned when the page holds the remaining rows."""
+    response = await client.get("/api/v1/leads/", params={"limit": 5})
+    assert len(response.json()) == 5
+    assert "X-Next-Cursor" not in response.headers
+
+
+async def test_get_leads_filters(client, seeded_leads):
+    """Test filtering by state and created_after."""
+    response = await client.get("/api/v1/leads/", params={"state": "PENDING"})
+    assert [lead["email"] for lead in response.json()] == [
+        "lead0@example.com", "lead2@example.com", "lead4@example.com"
+    ]
+
+    after = (BASE_TIME + timedelta(minutes=2)).isoformat()
+    response = await client.get("/api/v1/leads/", params={"created_after": after})
+    assert [lead["email"] for lead in response.json()] == ["lead3@example.com", "lead4@example.com"]
+
+
+async def test_get_leads_invalid_cursor(client, seeded_leads):
+    """Test that a malformed cursor is rejected with a 400."""
+    response = await client.get("/api/v1/leads/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+async def test_get_leads_ndjson_stream(client, seeded_leads):
+    """Test that stream=true returns one JSON document per line."""
+    response = await client.get("/api/v1/leads/", params={"stream": "true", "state": "REACHED_OUT"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [lead["email"] for lead in lines] == ["lead1@example.com", "lead3@example.com"]
+
+
+async def test_get_leads_matches_lead_schema(client, seeded_leads, db_sessionmaker):
+    """Test that pages and streams encoded straight from rows are what the Lead schema would produce."""
+    async with db_sessionmaker() as db:
+        rows = (await db.execute(build_leads_query())).all()
+    leads_adapter = TypeAdapter(List[Lead])
+    expected = json.loads(leads_adapter.dump_json(leads_adapter.validate_python(rows)))
+
+    assert (await client.get("/api/v1/leads/")).json() == expected
+    response = await client.get("/api/v1/leads/", params={"stream": "true"})
+    assert [json.loads(line) for line in response.text.splitlines()] == expected
+
+
+async def test_get_leads_not_modified(client, seeded_leads, db_sessionmaker):
+    """Test that a poll with the current ETag gets a 304 without querying the database."""
+    first = await client.get("/api/v1/leads/", params={"limit": 2, "state": "PENDING"})
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    statements = []
+    engine = db_sessionmaker.kw["bind"].sync_engine
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        # The same query with its parameters in another order has the same ETag
+        response = await client.get(
+            "/api/v1/leads/", params={"state": "PENDING", "limit": 2}, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+        cached = await client.get("/api/v1/leads/", params={"limit": 2, "state": "PENDING"})
+        assert cached.status_code == 200
+        assert cached.content == first.content
+        assert cached.headers["x-next-cursor"] == first.headers["x-next-cursor"]
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert statements == []
+
+
+async def test_get_leads_cache_invalidated_by_writes(client, seeded_leads):
+    """Test that creating a lead or changing a state changes the ETag of every page."""
+    etag = (await client.get("/api/v1/leads/")).headers["etag"]
+
+    response = await client.patch("/api/v1/leads/1/state", json={"state": "REACHED_OUT"})
+    assert response.status_code == 200
+    response = await client.get("/api/v1/leads/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["state"] == "REACHED_OUT"
+    etag = response.headers["etag"]
+
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "New", "last_name": "Lead", "email": "new.lead@example.com"},
+        files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+    )
+    assert response.status_code == 200
+    response = await client.get("/api/v1/leads/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 6
+
+
+async def test_writes_publish_lead_events(client, seeded_leads, lead_events):
+    """Test that creating a lead and changing states publish compact change events."""
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "New", "last_name": "Lead", "email": "new.lead@example.com"},
+        files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+    )
+    lead_id = response.json()["id"]
+    await client.patch("/api/v1/leads/1/state", json={"state": "REACHED_OUT"})
+    await client.patch("/api/v1/leads/state", json={"state": "REJECTED", "leads": [{"id": 2}, {"id": 999}]})
+
+    events = [(event.type, json.loads(event.data)) for event in lead_events.events_after(0)]
+    assert events[0][0] == "lead.created"
+    assert events[0][1]["id"] == lead_id
+    assert events[1:] == [
+        ("lead.state_changed", {"id": 1, "state": "REACHED_OUT", "version": 2}),
+        ("lead.state_changed", {"id": 2, "state": "REJECTED", "version": 2}),
+    ]
+
+
+async def test_lead_events_requires_api_key(client):
+    """Test that the event stream rejects requests without a valid API key."""
+    response = await client.get("/api/v1/leads/events", headers={"X-API-Key": "wrong"})
+    assert response.status_code == 403
+
+
+async def test_create_lead(client, db_sessionmaker, monkeypatch):
+    """Test that a submitted lead is stored with its resume and its emails are queued."""
+    monkeypatch.setenv("ATTORNEY_EMAIL", "attorney@lawfirm.com")
+
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "John", "last_name": "Doe", "email": "john.doe@example.com"},
+        files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["email"] == "john.doe@example.com"
+    assert body["state"] == "PENDING"
+    async with db_sessionmaker() as db:
+        queued = (await db.execute(select(EmailOutbox.kind).where(EmailOutbox.lead_id == body["id"]))).scalars().all()
+    assert sorted(queued) == [EmailKind.ATTORNEY_NOTIFICATION, EmailKind.PROSPECT_CONFIRMATION]
+
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "John", "last_name": "Doe", "email": "john.doe@example.com"},
+        files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+    )
+    assert response.status_code == 400
+
+
+async def test_create_lead_email_is_case_insensitive(client):
+    """Test that emails are stored lower-cased and a differently-cased resubmission is rejected."""
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "John", "last_name": "Doe", "email": "John.Doe@Example.com"},
+        files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+    )
+    assert response.status_code == 200
+    assert response.json()["email"] == "john.doe@example.com"
+
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "John", "last_name": "Doe", "email": "JOHN.DOE@example.com"},
+        files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+    )
+    assert response.status_code == 400
+
+
+async def test_create_lead_concurrent_duplicates(client, db_sessionmaker):
+    """Test that concurrent submissions of one email create a single lead and a 400, not a 500."""
+    async def submit():
+        return await client.post(
+            "/api/v1/leads/",
+            data={"first_name": "John", "last_name": "Doe", "email": "race@example.com"},
+            files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+        )
+
+    responses = await asyncio.gather(*(submit() for _ in range(5)))
+    assert sorted(response.status_code for response in responses) == [200, 400, 400, 400, 400]
+    async with db_sessionmaker() as db:
+        ids = (await db.execute(select(DBLead.id).where(DBLead.email == "race@example.com"))).scalars().all()
+    assert len(ids) == 1
+
+
+async def test_create_lead_group_commit_duplicates(client, db_sessionmaker, monkeypatch):
+    """Test that duplicates submitted through the group-commit writer are rejected with a 400."""
+    writer = GroupCommitWriter(db_sessionmaker)
+    monkeypatch.setattr(leads, "LEAD_GROUP_COMMIT", True)
+    monkeypatch.setattr(leads, "lead_writer", writer)
+
+    async def submit():
+        return await client.post(
+            "/api/v1/leads/",
+            data={"first_name": "John", "last_name": "Doe", "email": "batch@example.com"},
+            files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+        )
+
+    responses = await asyncio.gather(*(submit() for _ in range(3)))
+    await writer.stop()
+    assert sorted(response.status_code for response in responses) == [200, 400, 400]
+
+
+async def test_create_lead_invalid_email(client):
+    """Test that an invalid email is rejected with a validation error."""
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "John", "last_name": "Doe", "email": "not-an-email"},
+        files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+    )
+    assert response.status_code == 422
+
+
+async def test_create_lead_rate_limited_per_email_domain(client, monkeypatch):
+    """Test that one email domain is limited across clients, and others are not."""
+    monkeypatch.setattr(leads, "LEAD_SUBMIT_DOMAIN_LIMIT", RateLimit(rate=0.1, burst=1))
+
+    def lead_form(number, domain):
+        return dict(
+            data={"first_name": "John", "last_name": "Doe", "email": f"john{number}@{domain}"},
+            files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+        )
+
+    assert (await client.post("/api/v1/leads/", **lead_form(0, "bots.example"))).status_code == 200
+    response = await client.post("/api/v1/leads/", **lead_form(1, "bots.example"))
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert (await client.post("/api/v1/leads/", **lead_form(2, "example.org"))).status_code == 200
+
+
+async def test_search_leads(client):
+    """Test that a created lead can be found by name and, once extracted, by resume text."""
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "Grace", "last_name": "Hopper", "email": "grace@example.com"},
+        files={"resume": ("resume.txt", b"Compiler pioneer and naval officer", "text/plain")},
+    )
+    assert response.status_code == 200
+
+    for query in ("grace hop", "compiler"):
+        response = await client.get("/api/v1/leads/search", params={"q": query})
+        assert response.status_code == 200
+        hits = response.json()
+        assert [hit["email"] for hit in hits] == ["grace@example.com"]
+        assert hits[0]["score"] > 0
+        assert "X-Next-Offset" not in response.headers
+
+
+async def test_search_leads_pagination(client, seeded_leads, db_sessionmaker):
+    """Test that X-Next-Offset pages through every hit once."""
+    async with db_sessionmaker() as db:
+        await search_index_for(db).index_leads(db, true())
+        await db.commit()
+
+    response = await client.get("/api/v1/leads/search", params={"q": "lead", "limit": 3})
+    emails = [hit["email"] for hit in response.json()]
+    response = await client.get(
+        "/api/v1/leads/search", params={"q": "lead", "limit": 3, "offset": response.headers["X-Next-Offset"]}
+    )
+    emails += [hit["email"] for hit in response.json()]
+    assert "X-Next-Offset" not in response.headers
+    assert sorted(emails) == [f"lead{i}@example.com" for i in range(5)]
+
+
+async def test_update_lead_state(client, seeded_leads):
+    """Test updating a lead's state, and the 404 for an unknown lead."""
+    response = await client.patch("/api/v1/leads/1/state", json={"state": "REACHED_OUT"})
+    assert response.status_code == 200
+    assert response.json()["state"] == "REACHED_OUT"
+
+    response = await client.patch("/api/v1/leads/999/state", json={"state": "REACHED_OUT"})
+    assert response.status_code == 404
+
+
+async def test_update_lead_state_version_conflict(client, seeded_leads):
+    """Test that a stale version or a disallowed transition is rejected with a 409."""
+    response = await client.patch("/api/v1/leads/1/state", json={"state": "REACHED_OUT", "version": 2})
+    assert response.status_code == 409
+
+    response = await client.patch("/api/v1/leads/1/state", json={"state": "RETAINED"})
+    assert response.status_code == 409
+
+    response = await client.patch("/api/v1/leads/1/state", json={"state": "REACHED_OUT", "version": 1})
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+
+
+async def test_bulk_update_lead_states(client, seeded_leads):
+    """Test that the bulk endpoint moves every allowed lead and reports the rest."""
+    response = await client.patch("/api/v1/leads/state", json={
+        "state": "QUALIFIED",
+        "leads": [{"id": 1}, {"id": 2}, {"id": 4, "version": 7}, {"id": 999}],
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert [(lead["id"], lead["state"]) for lead in body["updated"]] == [(2, "QUALIFIED")]
+    assert [(error["id"], error["reason"]) for error in body["failed"]] == [
+        (1, "NOT_ALLOWED"), (4, "VERSION_CONFLICT"), (999, "NOT_FOUND")
+    ]
+
+
+
+async def test_bulk_update_rejects_repeated_ids(client, seeded_leads):
+    """Test that listing a lead twice in one bulk update is rejected with a 422."""
+    response = await client.patch("/api/v1/leads/state", json={
+        "state": "REJECTED", "leads": [{"id": 1}, {"id": 2}, {"id": 1, "version": 1}],
+    })
+    assert response.status_code == 422
+    assert "repeated ids: [1]" in response.text
+
+
+async def test_moves_to_the_current_state_change_nothing(client, seeded_leads, response_cache, lead_events):
+    """Test that moving leads to the state they are in publishes no event and keeps cached pages."""
+    version = await response_cache.version(LEADS_CACHE_NAMESPACE)
+    response = await client.patch("/api/v1/leads/state", json={"state": "REACHED_OUT", "leads": [{"id": 2}, {"id": 4}]})
+    body = response.json()
+    assert body["updated"] == []
+    assert [(lead["id"], lead["version"]) for lead in body["unchanged"]] == [(2, 1), (4, 1)]
+
+    response = await client.patch("/api/v1/leads/2/state", json={"state": "REACHED_OUT"})
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+
+    assert lead_events.events_after(0) == []
+    assert await response_cache.version(LEADS_CACHE_NAMESPACE) == version
+
+async def test_create_lead_rejects_oversized_resume(app, client, tmp_path):
+    """Test that a resume over the size cap is rejected with a 413."""
+    app.dependency_overrides[get_resume_store] = lambda: LocalResumeStore(str(tmp_path), max_bytes=8)
+
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "John", "last_name": "Doe", "email": "john.doe@example.com"},
+        files={"resume": ("resume.txt", b"x" * 64, "text/plain")},
+    )
+    assert response.status_code == 413
+
+
+
+async def test_oversized_upload_bodies_are_rejected_before_parsing(app, client, db_sessionmaker, tmp_path):
+    """Test that a body over the route's cap gets a 413 from its Content-Length, or as it streams without one."""
+    app.add_middleware(RequestSizeLimitMiddleware, limits={("POST", "/api/v1/leads/"): 1024})
+
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "John", "last_name": "Doe", "email": "john.doe@example.com"},
+        files={"resume": ("resume.txt", b"x" * 2048, "text/plain")},
+    )
+    assert response.status_code == 413
+
+    form = httpx.Request(
+        "POST", "http://test", data={"first_name": "John", "last_name": "Doe", "email": "john.doe@example.com"},
+        files={"resume": ("resume.txt", b"x" * 2048, "text/plain")},
+    )
+    body = form.read()
+
+    async def chunks():
+        # A streamed body is sent without a Content-Length
+        for start in range(0, len(body), 512):
+            yield body[start:start + 512]
+
+    response = await client.post("/api/v1/leads/", content=chunks(), headers={"Content-Type": form.headers["Content-Type"]})
+    assert response.status_code == 413
+
+    async with db_sessionmaker() as db:
+        assert (await db.execute(select(DBLead))).first() is None
+    assert not list((tmp_path / "uploads").rglob("*.txt"))
+
+async def test_get_lead_resume_streams_local_file(client):
+    """Test that a resume stored locally is streamed back through the API."""
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "John", "last_name": "Doe", "email": "john.doe@example.com"},
+        files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+    )
+    lead_id = response.json()["id"]
+
+    response = await client.get(f"/api/v1/leads/{lead_id}/resume")
+    assert response.status_code == 200
+    assert response.content == b"resume contents"
+    assert response.headers["content-type"].startswith("text/plain")
+
+    response = await client.get("/api/v1/leads/999/resume")
+    assert response.status_code == 404
+
+
+async def test_import_leads_csv(client, seeded_leads, db_sessionmaker):
+    """Test that a CSV import inserts new leads and reports rejected rows."""
+    csv_body = (
+        "first_name,last_name,email\n"
+        "Ada,Lovelace,ada@example.com\n"
+        "Dup,Existing,lead0@example.com\n"
+        "Bad,Email,not-an-email\n"
+    )
+    response = await client.post(
+        "/api/v1/leads/import", files={"file": ("partner.csv", csv_body.encode(), "text/csv")}
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["processed"], report["imported"], report["failed"]) == (3, 1, 2)
+    assert [(error["row"], error["email"]) for error in report["errors"]] == [
+        (2, "lead0@example.com"), (3, "not-an-email")
+    ]
+
+    response = await client.get("/api/v1/leads/", params={"limit": 100})
+    imported = [lead for lead in response.json() if lead["email"] == "ada@example.com"]
+    assert imported[0]["resume_path"] is None
+
+
+async def test_import_leads_rejects_unknown_format(client):
+    """Test that a file whose format cannot be detected is rejected."""
+    response = await client.post("/api/v1/leads/import", files={"file": ("leads.xlsx", b"", "application/zip")})
+    assert response.status_code == 400
+
+
+async def test_import_leads_requires_api_key(client):
+    """Test that the import endpoint rejects requests without a valid API key."""
+    response = await client.post(
+        "/api/v1/leads/import", files={"file": ("leads.csv", b"", "text/csv")}, headers={"X-API-Key": "wrong"}
+    )
+    assert response.status_code == 403
@@ -0,0 +1,91 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app import main
+from app.cli import serve
+from app.services import api_key_service, cache_service, rate_limit_service, storage_service
+
+
+def test_create_app_builds_a_new_app_each_time():
+    """Test that create_app returns a fresh app with every route on each call."""
+    first, second = main.create_app(), main.create_app()
+
+    assert first is not second
+    paths = first.openapi()["paths"]
+    assert {"/", "/api/v1/leads/", "/api/v1/leads/{lead_id}/state"} <= set(paths)
+
+
+@pytest.mark.parametrize("migrate_on_startup", [True, False])
+async def test_lifespan_migrates_only_when_enabled(migrate_on_startup, monkeypatch):
+    """Test that the lifespan runs migrations only when MIGRATE_ON_STARTUP is set."""
+    run_migrations = MagicMock()
+    monkeypatch.setattr(main, "run_migrations", run_migrations)
+    monkeypatch.setattr(main, "get_resume_store", MagicMock())
+    monkeypatch.setattr(main, "MIGRATE_ON_STARTUP", migrate_on_startup)
+    app = main.create_app()
+
+    async with app.router.lifespan_context(app):
+        assert run_migrations.called == migrate_on_startup
+
+
+def test_module_app_is_built_only_when_asked_for(monkeypatch):
+    """Test that app.main builds its module-level app on first access, and only once."""
+    monkeypatch.delitem(vars(main), "app", raising=False)
+    create_app = MagicMock()
+    monkeypatch.setattr(main, "create_app", create_app)
+
+    assert not create_app.called
+    assert main.app is main.app is create_app.return_value
+    create_app.assert_called_once_with()
+
+
+async def test_lifespan_stops_the_revocation_listener_and_closes_clients(monkeypatch):
+    """Test that shutdown awaits the cancelled revocation listener and closes every client."""
+    listening = asyncio.Event()
+    cancelled = []
+
+    async def listen_for_revocations():
+        listening.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    store = MagicMock(listen_for_revocations=listen_for_revocations, close=AsyncMock())
+    clients = [store, MagicMock(close=AsyncMock()), MagicMock(close=AsyncMock()), MagicMock(close=AsyncMock())]
+    monkeypatch.setattr(main, "MIGRATE_ON_STARTUP", False)
+    monkeypatch.setattr(api_key_service, "_api_key_store", clients[0])
+    monkeypatch.setattr(cache_service, "_response_cache", clients[1])
+    monkeypatch.setattr(rate_limit_service, "_rate_limiter", clients[2])
+    monkeypatch.setattr(storage_service, "_resume_store", clients[3])
+    app = main.create_app()
+
+    async with app.router.lifespan_context(app):
+        await listening.wait()
+
+    assert cancelled == [True]
+    for client in clients:
+        client.close.assert_awaited_once_with()
+    assert api_key_service._api_key_store is None
+    assert cache_service._response_cache is None
+    assert rate_limit_service._rate_limiter is None
+    assert storage_service._resume_store is None
+
+
+def test_serve_warns_about_per_worker_state_only_with_several_workers(monkeypatch):
+    """Test that serve warns about per-worker state only when it starts several workers."""
+    monkeypatch.setattr(rate_limit_service, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(api_key_service, "API_KEY_REVOCATION_BACKEND", "memory")
+
+    assert serve.per_worker_state_warnings(1) == []
+    warnings = serve.per_worker_state_warnings(4)
+    assert len(warnings) == 3
+    assert "Lead events are published in-process" in warnings[0]
+    assert "up to 4 times their limit" in warnings[1]
+
+    monkeypatch.setattr(rate_limit_service, "RATE_LIMIT_BACKEND", "redis")
+    monkeypatch.setattr(api_key_service, "API_KEY_REVOCATION_BACKEND", "redis")
+    assert len(serve.per_worker_state_warnings(4)) == 1
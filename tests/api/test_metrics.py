@@ -0,0 +1,106 @@
+import logging
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import select
+
+from app.api import middleware
+from app.api.middleware import MetricsMiddleware
+from app.api.v1 import dependencies
+from app.db.instrumentation import instrument_engine
+from app.models.lead import Lead as DBLead
+from app.services.metrics_service import render_metrics
+from app.services.rate_limit_service import RateLimit
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.fixture
+def app(app, db_sessionmaker):
+    """Fixture that adds the metrics middleware, and an endpoint with an N+1 pattern, to the test app."""
+    instrument_engine(db_sessionmaker.kw["bind"].sync_engine)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/n-plus-one")
+    async def n_plus_one():
+        async with db_sessionmaker() as db:
+            for lead_id in range(12):
+                await db.execute(select(DBLead.email).where(DBLead.id == lead_id))
+        return {}
+
+    return app
+
+
+async def test_requests_are_timed_by_route(client):
+    """Test that latency is recorded under the route template, not the raw path."""
+    labels = dict(method="PATCH", route="/api/v1/leads/{lead_id}/state", status="404")
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    response = await client.patch("/api/v1/leads/12345/state", json={"state": "REACHED_OUT"})
+    assert response.status_code == 404
+    assert sample("http_request_duration_seconds_count", **labels) == before + 1
+
+
+async def test_queries_are_counted_per_request(client):
+    """Test that statements run for a request are counted, and uploads measured."""
+    queries = sample("db_queries_per_request_sum", route="/api/v1/leads/")
+    uploaded = sample("resume_upload_bytes_sum", backend="LocalResumeStore")
+
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "John", "last_name": "Doe", "email": "john.doe@example.com"},
+        files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+    )
+    assert response.status_code == 200
+    # The insert and the outbox and search index writes
+    assert sample("db_queries_per_request_sum", route="/api/v1/leads/") >= queries + 3
+    assert sample("resume_upload_bytes_sum", backend="LocalResumeStore") == uploaded + len(b"resume contents")
+
+
+async def test_repeated_selects_are_flagged(client, caplog):
+    """Test that a request running one SELECT many times is counted and logged as a likely N+1."""
+    before = sample("db_n_plus_one_requests_total", route="/n-plus-one")
+    with caplog.at_level(logging.WARNING, logger="app.api.middleware"):
+        await client.get("/n-plus-one")
+
+    assert sample("db_n_plus_one_requests_total", route="/n-plus-one") == before + 1
+    assert "ran 12 times" in caplog.text
+
+    await client.get("/api/v1/leads/")
+    assert sample("db_n_plus_one_requests_total", route="/api/v1/leads/") == 0
+
+
+async def test_profiling_requires_opt_in_and_api_key(client, monkeypatch):
+    """Test that X-Profile returns a profile only when enabled and authenticated."""
+    pytest.importorskip("pyinstrument")
+    response = await client.get("/api/v1/leads/", headers={"X-Profile": "text"})
+    assert response.headers["content-type"] == "application/json"
+
+    monkeypatch.setattr(middleware, "REQUEST_PROFILING", True)
+    response = await client.get("/api/v1/leads/", headers={"X-Profile": "text", "X-API-Key": "wrong"})
+    assert response.status_code == 403
+
+    response = await client.get("/api/v1/leads/", headers={"X-Profile": "text"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "Samples:" in response.text
+
+
+async def test_profiling_key_checks_count_against_the_lookup_limit(client, monkeypatch):
+    """Test that keys checked for X-Profile are charged to the client's API key lookup limit."""
+    monkeypatch.setattr(middleware, "REQUEST_PROFILING", True)
+    monkeypatch.setattr(dependencies, "API_KEY_LOOKUP_LIMIT", RateLimit(rate=0.1, burst=1))
+
+    response = await client.get("/api/v1/leads/", headers={"X-Profile": "text", "X-API-Key": "guess-1"})
+    assert response.status_code == 403
+    response = await client.get("/api/v1/leads/", headers={"X-Profile": "text", "X-API-Key": "guess-2"})
+    assert response.status_code == 429
+
+
+def test_render_metrics():
+    """Test that metrics are exposed in Prometheus' text format."""
+    body, content_type = render_metrics()
+    assert content_type.startswith("text/plain")
+    assert b"# TYPE http_request_duration_seconds histogram" in body
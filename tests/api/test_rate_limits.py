@@ -0,0 +1,72 @@
+import pytest
+
+from app.api.middleware import AdmissionControlMiddleware, RateLimitMiddleware
+from app.api.v1 import dependencies
+from app.services.api_key_service import READ_LEADS
+from app.services.rate_limit_service import AdmissionController, RateLimit
+
+
+def lead_form(number, domain="example.com"):
+    return dict(
+        data={"first_name": "John", "last_name": "Doe", "email": f"john{number}@{domain}"},
+        files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+    )
+
+
+@pytest.fixture
+def app(app, rate_limiter):
+    """Fixture that limits the test app's lead submissions to two per client IP."""
+    app.add_middleware(
+        RateLimitMiddleware, limits={("POST", "/api/v1/leads/"): RateLimit(rate=0.1, burst=2)}, limiter=rate_limiter
+    )
+    return app
+
+
+async def test_submissions_are_limited_per_ip(client):
+    """Test that an IP over its limit gets a 429 with Retry-After, and nothing is stored."""
+    for number in range(2):
+        assert (await client.post("/api/v1/leads/", **lead_form(number))).status_code == 200
+
+    response = await client.post("/api/v1/leads/", **lead_form(2))
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 10
+
+    leads_page = await client.get("/api/v1/leads/")
+    assert len(leads_page.json()) == 2
+
+
+async def test_other_routes_are_not_limited(client):
+    """Test that the IP limit only applies to the routes it was given."""
+    for _ in range(5):
+        assert (await client.get("/api/v1/leads/")).status_code == 200
+
+
+async def test_key_lookups_are_limited_per_ip(client, api_key_store, monkeypatch):
+    """Test that a client guessing keys gets a 429 once its lookups run out, while cached keys keep working."""
+    monkeypatch.setattr(dependencies, "API_KEY_LOOKUP_LIMIT", RateLimit(rate=0.1, burst=3))
+    key, _ = await api_key_store.create("Dashboard", [READ_LEADS])
+    assert (await client.get("/api/v1/leads/", headers={"X-API-Key": key})).status_code == 200
+
+    # A rejected key is cached, so repeating it costs no lookups
+    for _ in range(3):
+        assert (await client.get("/api/v1/leads/", headers={"X-API-Key": "guess-0"})).status_code == 403
+    assert (await client.get("/api/v1/leads/", headers={"X-API-Key": "guess-1"})).status_code == 403
+
+    response = await client.get("/api/v1/leads/", headers={"X-API-Key": "guess-2"})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 10
+    assert (await client.get("/api/v1/leads/", headers={"X-API-Key": key})).status_code == 200
+    assert (await client.get("/api/v1/leads/")).status_code == 200
+
+
+async def test_requests_beyond_admission_queue_get_503(app, client):
+    """Test that a request the admission controller can't take is answered 503 with Retry-After."""
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        controller=AdmissionController(max_concurrent=0, max_queue=0, retry_after=2),
+        exempt_paths=["/api/v1/leads/events"],
+    )
+
+    response = await client.get("/api/v1/leads/")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
@@ -1,7 +1,25 @@
+from datetime import datetime
+
 import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1 import leads
+from app.db.session import get_async_db
+from app.db.migrations import migrate
+from app.db.sqlite import configure_sqlite_engine
+from app.services.api_key_service import ApiKeyStore, get_api_key_store
+from app.services.cache_service import get_response_cache, DatabaseVersionedCache, MemoryResponseCache
+from app.services.lead_event_service import get_lead_event_broker, LeadEventBroker
+from app.services.rate_limit_service import get_rate_limiter, MemoryRateLimiter
 from app.models.lead import Lead as DBLead
+from app.services.storage_service import get_resume_store, LocalResumeStore
 from app.schemas.lead import LeadState
 
+# The legacy shared key the test app's key store accepts
+API_KEY = "test-api-key"
 
 @pytest.fixture
 def sample_lead():
@@ -49,3 +67,76 @@ def leads_with_same_name():
     lead2.state = LeadState.PENDING
 
     return [lead1, lead2]
+
+
+def reject_aware_datetimes(conn, cursor, statement, parameters, context, executemany):
+    # SQLite quietly drops the zone of an aware datetime, but asyncpg refuses them
+    # for `timestamp without time zone` columns, so the test database refuses them too
+    for params in getattr(context, "compiled_parameters", None) or ():
+        for name, value in params.items():
+            if isinstance(value, datetime) and value.tzinfo is not None:
+                raise AssertionError(f"Aware datetime bound to {name}; store naive UTC (app.db.timestamps.utcnow)")
+
+
+@pytest.fixture
+async def db_sessionmaker(tmp_path):
+    """Fixture that provides an async session factory bound to a fresh, migrated SQLite database."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    configure_sqlite_engine(engine.sync_engine)
+    event.listen(engine.sync_engine, "before_cursor_execute", reject_aware_datetimes)
+    async with engine.connect() as conn:
+        await conn.run_sync(migrate)
+    yield async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def response_cache(db_sessionmaker):
+    """Fixture that provides an empty in-process response cache, versioned by the test database."""
+    return DatabaseVersionedCache(MemoryResponseCache(), db_sessionmaker)
+
+
+@pytest.fixture
+def lead_events():
+    """Fixture that provides a lead event broker with no subscribers."""
+    return LeadEventBroker()
+
+
+@pytest.fixture
+def rate_limiter():
+    """Fixture that provides an in-process rate limiter with no requests counted yet."""
+    return MemoryRateLimiter()
+
+
+@pytest.fixture
+def api_key_store(db_sessionmaker):
+    """Fixture that provides an API key store backed by the test database, accepting the legacy key."""
+    return ApiKeyStore(db_sessionmaker, legacy_key=API_KEY)
+
+
+@pytest.fixture
+def app(db_sessionmaker, response_cache, lead_events, rate_limiter, api_key_store, tmp_path, monkeypatch):
+    """Fixture that provides an app serving the leads router, backed by the test database."""
+    app = FastAPI()
+    app.include_router(leads.router, prefix="/api/v1/leads")
+
+    async def override_get_async_db():
+        async with db_sessionmaker() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_resume_store] = lambda: LocalResumeStore(str(tmp_path / "uploads"))
+    app.dependency_overrides[get_response_cache] = lambda: response_cache
+    app.dependency_overrides[get_lead_event_broker] = lambda: lead_events
+    app.dependency_overrides[get_rate_limiter] = lambda: rate_limiter
+    app.dependency_overrides[get_api_key_store] = lambda: api_key_store
+    monkeypatch.setattr(leads, "AsyncSessionLocal", db_sessionmaker)
+    return app
+
+
+@pytest.fixture
+async def client(app):
+    """Fixture that provides an HTTP client for the test app, authenticated with the API key."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test", headers={"X-API-Key": API_KEY}) as test_client:
+        yield test_client
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import IntegrityError
+
+from app.api.v1 import leads
+from app.db.group_commit import GroupCommitWriter
+from app.models.lead import Lead as DBLead
+
+
+def make_insert(email):
+    async def insert(db):
+        lead = DBLead(first_name="First", last_name="Last", email=email, resume_path="resume.pdf")
+        db.add(lead)
+        await db.flush()
+        return lead.id
+    return insert
+
+
+async def test_sqlite_pragmas_applied(db_sessionmaker):
+    """Test that connections come up in WAL mode with the configured busy timeout."""
+    async with db_sessionmaker() as db:
+        assert (await db.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        assert (await db.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+        assert (await db.execute(text("PRAGMA busy_timeout"))).scalar() == 5000
+
+
+async def test_concurrent_submissions_share_a_commit(db_sessionmaker):
+    """Test that concurrent inserts are coalesced and every submitter gets its result."""
+    writer = GroupCommitWriter(db_sessionmaker, max_delay=0.05)
+    commits = 0
+    original_factory = writer.session_factory
+
+    def counting_factory():
+        session = original_factory()
+        original_commit = session.commit
+
+        async def commit():
+            nonlocal commits
+            commits += 1
+            await original_commit()
+
+        session.commit = commit
+        return session
+
+    writer.session_factory = counting_factory
+    ids = await asyncio.gather(*(writer.submit(make_insert(f"lead{i}@example.com")) for i in range(20)))
+    await writer.stop()
+
+    assert len(set(ids)) == 20
+    assert commits < 20
+    async with db_sessionmaker() as db:
+        assert (await db.execute(select(func.count(DBLead.id)))).scalar() == 20
+
+
+async def test_failing_unit_only_rolls_back_itself(db_sessionmaker):
+    """Test that a duplicate email fails its own submission without losing the rest of the batch."""
+    writer = GroupCommitWriter(db_sessionmaker, max_delay=0.05)
+    results = await asyncio.gather(
+        writer.submit(make_insert("a@example.com")),
+        writer.submit(make_insert("a@example.com")),
+        writer.submit(make_insert("b@example.com")),
+        return_exceptions=True,
+    )
+    await writer.stop()
+
+    assert isinstance(results[1], IntegrityError)
+    assert isinstance(results[0], int) and isinstance(results[2], int)
+    async with db_sessionmaker() as db:
+        emails = (await db.execute(select(DBLead.email).order_by(DBLead.email))).scalars().all()
+    assert emails == ["a@example.com", "b@example.com"]
+
+
+async def test_stop_flushes_queued_units(db_sessionmaker):
+    """Test that stopping the writer commits units that were already queued."""
+    writer = GroupCommitWriter(db_sessionmaker, max_delay=1.0)
+    pending = asyncio.ensure_future(writer.submit(make_insert("queued@example.com")))
+    await asyncio.sleep(0.01)
+    await writer.stop()
+
+    assert isinstance(await pending, int)
+
+
+@pytest.mark.parametrize("group_commit", [False, True])
+async def test_create_lead_with_group_commit(client, monkeypatch, db_sessionmaker, group_commit):
+    """Test that create_lead behaves the same with and without group commit."""
+    writer = GroupCommitWriter(db_sessionmaker)
+    monkeypatch.setattr(leads, "LEAD_GROUP_COMMIT", group_commit)
+    monkeypatch.setattr(leads, "lead_writer", writer)
+
+    form = {"first_name": "John", "last_name": "Doe", "email": "john@example.com"}
+    files = {"resume": ("resume.txt", b"resume", "text/plain")}
+    response = await client.post("/api/v1/leads/", data=form, files=files)
+    assert response.status_code == 200
+    assert response.json()["id"] == 1
+    await writer.stop()
+
+
+async def test_cancelled_submission_is_not_committed(db_sessionmaker):
+    """Test that a unit whose submitter gave up before its batch started is skipped."""
+    writer = GroupCommitWriter(db_sessionmaker, max_delay=0.05)
+    cancelled = asyncio.ensure_future(writer.submit(make_insert("gone@example.com")))
+    kept = asyncio.ensure_future(writer.submit(make_insert("kept@example.com")))
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+    assert isinstance(await kept, int)
+    await writer.stop()
+
+    async with db_sessionmaker() as db:
+        emails = (await db.execute(select(DBLead.email))).scalars().all()
+    assert emails == ["kept@example.com"]
+
+
+async def test_failed_flush_fails_its_submitters_and_keeps_running(db_sessionmaker):
+    """Test that an error outside the units fails the whole batch without stopping the writer."""
+    def broken_factory():
+        raise OSError("disk full")
+
+    writer = GroupCommitWriter(db_sessionmaker, max_delay=0.01)
+    writer.session_factory = broken_factory
+    with pytest.raises(OSError):
+        await asyncio.wait_for(writer.submit(make_insert("a@example.com")), 1)
+
+    writer.session_factory = db_sessionmaker
+    assert isinstance(await asyncio.wait_for(writer.submit(make_insert("b@example.com")), 1), int)
+    await writer.stop()
+
+
+async def test_cancelled_writer_fails_queued_submissions(db_sessionmaker):
+    """Test that submitters are not left waiting forever when the writer task is cancelled."""
+    writer = GroupCommitWriter(db_sessionmaker, max_delay=1.0)
+    pending = asyncio.ensure_future(writer.submit(make_insert("queued@example.com")))
+    await asyncio.sleep(0.01)
+    writer._task.cancel()
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(pending, 1)
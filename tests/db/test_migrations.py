@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.migrations import MIGRATIONS, run_migrations
+from app.db.sqlite import configure_sqlite_engine
+
+# The leads table as the first release of the app created it
+BASELINE_LEADS_DDL = """
+CREATE TABLE leads (
+    id INTEGER NOT NULL PRIMARY KEY,
+    first_name VARCHAR,
+    last_name VARCHAR,
+    email VARCHAR NOT NULL,
+    resume_path VARCHAR,
+    state VARCHAR(11) NOT NULL,
+    created_at DATETIME
+)
+"""
+
+
+@pytest.fixture
+def sync_engine(tmp_path):
+    """Fixture that provides a synchronous engine on an empty SQLite database."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    configure_sqlite_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+def lead_indexes(engine):
+    # The inspector skips expression indexes such as lower(email), so ask SQLite directly
+    with engine.connect() as conn:
+        query = text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'leads' AND sql IS NOT NULL")
+        return set(conn.execute(query).scalars())
+
+
+def test_migrates_baseline_schema(sync_engine):
+    """Test that a database created by the first release is brought up to date, keeping its rows."""
+    with sync_engine.begin() as conn:
+        conn.execute(text(BASELINE_LEADS_DDL))
+        for name in ("id", "first_name", "last_name"):
+            conn.execute(text(f"CREATE INDEX ix_leads_{name} ON leads ({name})"))
+        conn.execute(text("CREATE UNIQUE INDEX ix_leads_email ON leads (email)"))
+        conn.execute(text(
+            "INSERT INTO leads (first_name, last_name, email, state) VALUES ('A', 'B', 'a@example.com', 'PENDING')"
+        ))
+
+    assert run_migrations(sync_engine) == [version for version, _ in MIGRATIONS]
+
+    columns = {column["name"] for column in inspect(sync_engine).get_columns("leads")}
+    assert "version" in columns
+    assert lead_indexes(sync_engine) == {
+        "ux_leads_email_lower", "ix_leads_created_at_id", "ix_leads_state_created_at_id"
+    }
+    assert {"email_outbox", "lead_state_history", "schema_migrations"} <= set(inspect(sync_engine).get_table_names())
+    with sync_engine.begin() as conn:
+        assert conn.execute(text("SELECT email, version FROM leads")).all() == [("a@example.com", 1)]
+        # Writes to leads bump the response cache version
+        conn.execute(text("UPDATE leads SET state = 'REJECTED'"))
+        assert conn.execute(text("SELECT namespace, version FROM cache_versions")).all() == [("leads", 1)]
+
+
+def test_migrations_are_recorded_and_not_rerun(sync_engine):
+    """Test that a fresh database gets every migration once and a second run applies nothing."""
+    assert len(run_migrations(sync_engine)) == len(MIGRATIONS)
+    assert lead_indexes(sync_engine) == {
+        "ux_leads_email_lower", "ix_leads_created_at_id", "ix_leads_state_created_at_id"
+    }
+    assert run_migrations(sync_engine) == []
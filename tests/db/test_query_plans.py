@@ -0,0 +1,162 @@
+"""
+Runs every lead endpoint against a seeded database, captures the SQL it
+executes, and checks each statement's EXPLAIN QUERY PLAN for full table scans
+and sorts that an index should have made unnecessary.
+
+The seeded database is small by default so the check runs with the rest of the
+suite. Plans can change as tables grow, so set QUERY_PLAN_ROWS=1000000 before
+changing an index or a hot query, to check them at production size as well.
+"""
+import os
+import re
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.migrations import run_migrations
+from app.db.sqlite import configure_sqlite_engine
+from app.schemas.lead import LeadState
+
+QUERY_PLAN_ROWS = int(os.getenv("QUERY_PLAN_ROWS", 20_000))
+
+BASE_TIME = datetime(2024, 1, 1)
+# Roughly the mix of a working queue: most leads have been handled, a tenth are waiting
+STATE_MIX = [LeadState.REACHED_OUT] * 5 + [LeadState.QUALIFIED, LeadState.RETAINED, LeadState.REJECTED] * 1 + [
+    LeadState.PENDING
+]
+
+# A plan step that reads a whole table, or sorts rows an index should have returned in order
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?\w+$")
+TEMP_SORT = re.compile(r"USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)")
+# Ranked search has to sort its hits by score (and id, for stable pages). No index can
+# give that order, and FTS5 already computes the score for every hit to order by rank.
+RANKED_SEARCH = re.compile(r"\bleads_fts MATCH\b")
+SKIPPED_STATEMENTS = re.compile(r"^\s*(PRAGMA|BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b", re.IGNORECASE)
+
+
+@pytest.fixture(scope="module")
+def seeded_database(tmp_path_factory):
+    """Fixture that provides the path of a migrated SQLite database seeded with QUERY_PLAN_ROWS leads."""
+    path = tmp_path_factory.mktemp("query_plans") / "leads.db"
+    engine = create_engine(f"sqlite:///{path}")
+    configure_sqlite_engine(engine)
+    run_migrations(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    rows = (
+        (
+            f"First{i}", f"Last{i}", f"lead{i}@example.com", f"ab/{i}.pdf",
+            STATE_MIX[i % len(STATE_MIX)].value, 1, (BASE_TIME + timedelta(seconds=i)).isoformat(" "),
+        )
+        for i in range(QUERY_PLAN_ROWS)
+    )
+    conn.executemany(
+        "INSERT INTO leads (first_name, last_name, email, resume_path, state, version, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.execute(
+        "INSERT INTO leads_fts (rowid, first_name, last_name, email) SELECT id, first_name, last_name, email FROM leads"
+    )
+    conn.commit()
+    # Give the planner the statistics a long-lived database would have
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+async def db_sessionmaker(seeded_database):
+    """Fixture that binds the app to the seeded database and records every statement it runs."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{seeded_database}")
+    configure_sqlite_engine(engine.sync_engine)
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not SKIPPED_STATEMENTS.match(statement):
+            # Batched INSERTs ("insertmanyvalues") arrive as one flat parameter tuple
+            many = executemany and parameters and isinstance(parameters[0], (tuple, list, dict))
+            statements.append((statement, parameters[0] if many else parameters))
+
+    sessionmaker = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    sessionmaker.statements = statements
+    yield sessionmaker
+    await engine.dispose()
+
+
+def query_plan(database, statement, parameters):
+    conn = sqlite3.connect(database)
+    try:
+        return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + statement, parameters)]
+    finally:
+        conn.close()
+
+
+def assert_indexed(database, statements):
+    assert statements, "no statements were captured"
+    for statement, parameters in statements:
+        plan = query_plan(database, statement, parameters)
+        sort_allowed = RANKED_SEARCH.search(statement)
+        bad = [step for step in plan if FULL_SCAN.match(step) or (TEMP_SORT.search(step) and not sort_allowed)]
+        assert not bad, f"{statement}\nhas plan {plan}"
+
+
+async def test_list_leads_plans(client, db_sessionmaker, seeded_database):
+    """Test that every list variant (filters, cursors, NDJSON) is served from an index."""
+    statements = db_sessionmaker.statements
+    created_after = (BASE_TIME + timedelta(seconds=QUERY_PLAN_ROWS // 2)).isoformat()
+    for params in (
+        {"limit": 100},
+        {"state": "PENDING", "limit": 100},
+        {"created_after": created_after, "limit": 100},
+        {"state": "PENDING", "created_after": created_after, "limit": 100},
+    ):
+        response = await client.get("/api/v1/leads/", params=params)
+        assert response.status_code == 200
+        cursor = response.headers["X-Next-Cursor"]
+        response = await client.get("/api/v1/leads/", params={**params, "cursor": cursor})
+        assert response.status_code == 200
+
+    response = await client.get("/api/v1/leads/", params={"state": "PENDING", "stream": "true", "limit": 10})
+    assert response.status_code == 200
+
+    for query in ("first12345", "last1 example"):
+        response = await client.get("/api/v1/leads/search", params={"q": query, "limit": 20})
+        assert response.status_code == 200
+        assert response.json()
+
+    assert_indexed(seeded_database, statements)
+
+
+async def test_write_endpoint_plans(client, db_sessionmaker, seeded_database):
+    """Test that creating, importing, moving and downloading leads never scans the table."""
+    statements = db_sessionmaker.statements
+    response = await client.post(
+        "/api/v1/leads/",
+        data={"first_name": "Plan", "last_name": "Check", "email": "plan.check@example.com"},
+        files={"resume": ("resume.txt", b"resume contents", "text/plain")},
+    )
+    assert response.status_code == 200
+    lead_id = response.json()["id"]
+
+    csv_body = "first_name,last_name,email\nImported,Lead,imported@example.com\nDup,Lead,lead1@example.com\n"
+    response = await client.post("/api/v1/leads/import", files={"file": ("leads.csv", csv_body.encode(), "text/csv")})
+    assert response.status_code == 200
+
+    response = await client.patch(f"/api/v1/leads/{lead_id}/state", json={"state": "REACHED_OUT", "version": 1})
+    assert response.status_code == 200
+    response = await client.patch("/api/v1/leads/state", json={
+        "state": "REJECTED", "leads": [{"id": lead_id}, {"id": 9, "version": 1}, {"id": 18}],
+    })
+    assert response.status_code == 200
+
+    response = await client.get(f"/api/v1/leads/{lead_id}/resume")
+    assert response.status_code == 200
+
+    assert_indexed(seeded_database, statements)
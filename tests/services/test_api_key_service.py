@@ -0,0 +1,143 @@
+import asyncio
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+
+from app.services.api_key_service import (
+    ALL_SCOPES, ApiKeyCache, ApiKeyStore, LEGACY_IDENTITY, READ_LEADS, hash_api_key
+)
+
+
+@pytest.fixture
+def lookups(db_sessionmaker):
+    """Fixture that provides a session factory counting the sessions opened through it."""
+    def factory():
+        factory.count += 1
+        return db_sessionmaker()
+    factory.count = 0
+    return factory
+
+
+@pytest.fixture
+def store(lookups):
+    """Fixture that provides an API key store with a legacy key."""
+    return ApiKeyStore(lookups, legacy_key="legacy-key")
+
+
+def test_legacy_key_is_off_unless_configured(tmp_path):
+    """Test that without API_KEY there is no legacy key, rather than a well-known default."""
+    env = {name: value for name, value in os.environ.items() if name != "API_KEY"}
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, "-c", "from app.services.api_key_service import LEGACY_API_KEY; print(LEGACY_API_KEY)"],
+        env=env, cwd=tmp_path, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == "None"
+
+async def test_legacy_key_has_every_scope(store):
+    """Test that the single shared key still works, with every scope."""
+    assert await store.verify("legacy-key") == LEGACY_IDENTITY
+    assert LEGACY_IDENTITY.scopes == ALL_SCOPES
+    assert await store.verify("legacy-key-2") is None
+    assert await store.verify(None) is None
+
+
+async def test_legacy_key_can_be_turned_off(lookups):
+    """Test that an empty legacy key accepts nothing."""
+    store = ApiKeyStore(lookups, legacy_key="")
+    assert await store.verify("") is None
+
+
+async def test_issued_keys_are_stored_hashed_and_verified_from_cache(store, lookups):
+    """Test that a new key verifies with its scopes, is only stored hashed, and is looked up once."""
+    key, created = await store.create("Jane", [READ_LEADS])
+    assert key.startswith("lt_")
+
+    row = (await store.list_keys())[0]
+    assert row.key_hash == hash_api_key(key) and key not in (row.key_hash, row.key_prefix)
+
+    sessions = lookups.count
+    for _ in range(3):
+        identity = await store.verify(key)
+        assert identity.id == created.id and identity.scopes == {READ_LEADS}
+    assert lookups.count == sessions + 1
+
+
+async def test_unknown_keys_are_cached(store, lookups):
+    """Test that repeating a wrong key doesn't hit the database every time."""
+    sessions = lookups.count
+    for _ in range(3):
+        assert await store.verify("lt_guess") is None
+    assert lookups.count == sessions + 1
+
+
+async def test_expired_keys_are_rejected(store):
+    """Test that a key past its expiry no longer verifies, even when cached."""
+    key, _ = await store.create("Temp", [READ_LEADS], expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    assert await store.verify(key) is None
+
+    key, _ = await store.create("Later", [READ_LEADS], expires_at=datetime.now(timezone.utc) + timedelta(days=1))
+    assert await store.verify(key) is not None
+
+
+async def test_create_rejects_unknown_scopes(store):
+    """Test that keys can only be given scopes the API checks for."""
+    with pytest.raises(ValueError):
+        await store.create("Jane", ["admin"])
+
+
+async def test_revoked_keys_are_rejected_at_once(store):
+    """Test that revoking a cached key takes effect on the next request."""
+    key, identity = await store.create("Jane", [READ_LEADS])
+    assert await store.verify(key) is not None
+
+    assert await store.revoke(identity.id)
+    assert await store.verify(key) is None
+    assert not await store.revoke(identity.id)
+
+
+async def test_revocations_are_broadcast_to_other_workers(db_sessionmaker):
+    """Test that a key revoked in one process is dropped from another's cache through Redis."""
+    server = FakeServer()
+    revoking = ApiKeyStore(db_sessionmaker, redis_client=FakeAsyncRedis(server=server))
+    worker = ApiKeyStore(db_sessionmaker, redis_client=FakeAsyncRedis(server=server))
+    key, identity = await revoking.create("Jane", [READ_LEADS])
+    assert await worker.verify(key) is not None
+
+    listener = asyncio.create_task(worker.listen_for_revocations())
+    try:
+        await asyncio.sleep(0.05)
+        await revoking.revoke(identity.id)
+        for _ in range(100):
+            if worker.cache.get(hash_api_key(key)) == (False, None):
+                break
+            await asyncio.sleep(0.01)
+        assert await worker.verify(key) is None
+    finally:
+        listener.cancel()
+
+
+def test_cache_entries_expire_after_ttl():
+    """Test that a cached result is trusted for `ttl` seconds only."""
+    now = [0.0]
+    cache = ApiKeyCache(ttl=60, clock=lambda: now[0])
+    cache.set("hash", LEGACY_IDENTITY)
+    now[0] = 59
+    assert cache.get("hash") == (True, LEGACY_IDENTITY)
+    now[0] = 60
+    assert cache.get("hash") == (False, None)
+
+
+def test_cache_forgets_least_recently_used():
+    """Test that the cache holds at most `max_entries` keys."""
+    cache = ApiKeyCache(max_entries=2)
+    cache.set("a", None)
+    cache.set("b", None)
+    cache.get("a")
+    cache.set("c", None)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, None)
@@ -0,0 +1,75 @@
+import pytest
+from fakeredis import FakeAsyncRedis
+from sqlalchemy import text
+
+from app.services.cache_service import (
+    CachedResponse, DatabaseVersionedCache, MemoryResponseCache, RedisResponseCache, LEADS_CACHE_NAMESPACE
+)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    """Fixture that provides each response cache backend."""
+    if request.param == "memory":
+        return MemoryResponseCache(max_entries=10)
+    return RedisResponseCache(FakeAsyncRedis(), ttl=60)
+
+
+async def test_versions_start_at_zero_and_bump(cache):
+    """Test that each namespace has its own version counter."""
+    assert await cache.version("leads") == 0
+    assert await cache.bump("leads") == 1
+    assert await cache.bump("leads") == 2
+    assert await cache.version("leads") == 2
+    assert await cache.version("other") == 0
+
+
+async def test_round_trips_body_and_headers(cache):
+    """Test that a cached response comes back with its body and headers."""
+    entry = CachedResponse(body=b'[{"name": "a\\nb"}]\n', headers={"X-Next-Cursor": "abc"})
+    assert await cache.get("key") is None
+    await cache.set("key", entry)
+    assert await cache.get("key") == entry
+
+
+async def test_memory_cache_evicts_least_recently_used():
+    """Test that the in-process cache drops the entry read least recently."""
+    cache = MemoryResponseCache(max_entries=2)
+    await cache.set("a", CachedResponse(body=b"a"))
+    await cache.set("b", CachedResponse(body=b"b"))
+    await cache.get("a")
+    await cache.set("c", CachedResponse(body=b"c"))
+
+    assert await cache.get("b") is None
+    assert (await cache.get("a")).body == b"a"
+    assert (await cache.get("c")).body == b"c"
+
+
+async def test_redis_cache_entries_expire():
+    """Test that shared entries are stored with the configured TTL."""
+    client = FakeAsyncRedis()
+    cache = RedisResponseCache(client, ttl=30, prefix="test")
+    await cache.set("key", CachedResponse(body=b"[]"))
+    assert 0 < await client.ttl("test:response:key") <= 30
+
+
+async def test_database_versions_follow_writes_from_any_connection(db_sessionmaker):
+    """Test that a write made outside the cache changes the version once the TTL has passed, and bump sees it at once."""
+    now = 0.0
+    cache = DatabaseVersionedCache(MemoryResponseCache(), db_sessionmaker, ttl=1, clock=lambda: now)
+    before = await cache.version(LEADS_CACHE_NAMESPACE)
+
+    async with db_sessionmaker() as db:
+        # As if another worker, the import command or a hand-written query added a lead
+        await db.execute(text("INSERT INTO leads (first_name, last_name, email, state, version) "
+                              "VALUES ('A', 'B', 'a@example.com', 'PENDING', 1)"))
+        await db.commit()
+    assert await cache.version(LEADS_CACHE_NAMESPACE) == before
+    now = 1.0
+    assert await cache.version(LEADS_CACHE_NAMESPACE) == before + 1
+
+    async with db_sessionmaker() as db:
+        await db.execute(text("UPDATE leads SET state = 'REJECTED'"))
+        await db.commit()
+    assert await cache.bump(LEADS_CACHE_NAMESPACE) == before + 2
+    assert await cache.version("other") == 0
@@ -0,0 +1,110 @@
+import asyncio
+import io
+import json
+
+from sqlalchemy import func, select
+
+from app.cli import import_leads as import_leads_cli
+from app.models.lead import Lead as DBLead
+from app.services.cache_service import LEADS_CACHE_NAMESPACE, MemoryResponseCache
+from app.services.import_service import import_leads, read_records
+from app.services.lead_event_service import LEADS_IMPORTED, LeadEventBroker
+
+
+def ndjson(*records) -> io.BytesIO:
+    return io.BytesIO("".join(json.dumps(record) + "\n" for record in records).encode())
+
+
+async def lead_count(db_sessionmaker) -> int:
+    async with db_sessionmaker() as db:
+        return (await db.execute(select(func.count(DBLead.id)))).scalar()
+
+
+async def test_import_inserts_in_chunks(db_sessionmaker):
+    """Test that every valid row is imported when the file spans several chunks."""
+    records = [{"first_name": f"F{i}", "last_name": "L", "email": f"user{i}@example.com"} for i in range(25)]
+    async with db_sessionmaker() as db:
+        report = await import_leads(db, read_records(ndjson(*records), "ndjson"), chunk_size=10)
+
+    assert (report.processed, report.imported, report.failed) == (25, 25, 0)
+    assert await lead_count(db_sessionmaker) == 25
+
+
+async def test_import_dedupes_within_file_and_against_database(db_sessionmaker):
+    """Test that emails seen earlier in the file or already stored are rejected."""
+    async with db_sessionmaker() as db:
+        db.add(DBLead(first_name="Old", last_name="Lead", email="old@example.com"))
+        await db.commit()
+
+    records = [
+        {"first_name": "A", "last_name": "L", "email": "a@example.com"},
+        {"first_name": "Old", "last_name": "Lead", "email": "old@example.com"},
+        {"first_name": "A", "last_name": "Again", "email": "a@example.com"},
+    ]
+    async with db_sessionmaker() as db:
+        report = await import_leads(db, read_records(ndjson(*records), "ndjson"), chunk_size=2)
+
+    assert report.imported == 1
+    assert [(error.row, error.error) for error in report.errors] == [
+        (2, "Email already registered."), (3, "Email already registered.")
+    ]
+    assert await lead_count(db_sessionmaker) == 2
+
+
+async def test_import_reports_unparseable_rows(db_sessionmaker):
+    """Test that bad JSON and missing fields are reported with their row numbers."""
+    body = io.BytesIO(b'{"first_name": "A", "last_name": "L", "email": "a@example.com"}\n{oops\n\n{"first_name": "B"}\n')
+    async with db_sessionmaker() as db:
+        report = await import_leads(db, read_records(body, "ndjson"))
+
+    assert report.imported == 1
+    assert [error.row for error in report.errors] == [2, 3]
+    assert report.errors[0].error.startswith("Could not parse row")
+    assert "email" in report.errors[1].error
+
+
+async def test_import_caps_reported_errors(db_sessionmaker):
+    """Test that errors beyond max_errors are counted but not listed."""
+    records = [{"first_name": "A", "last_name": "L", "email": "bad"} for _ in range(5)]
+    async with db_sessionmaker() as db:
+        report = await import_leads(db, read_records(ndjson(*records), "ndjson"), max_errors=2)
+
+    assert report.failed == 5
+    assert len(report.errors) == 2
+
+
+async def test_import_waits_for_a_concurrent_writer(db_sessionmaker):
+    """Test that a chunk waits for another connection's write instead of failing, and skips what it registered."""
+    records = [
+        {"first_name": "A", "last_name": "L", "email": "a@example.com"},
+        {"first_name": "B", "last_name": "L", "email": "b@example.com"},
+    ]
+    async with db_sessionmaker() as other:
+        # Hold the write lock while the import starts
+        other.add(DBLead(first_name="B", last_name="L", email="b@example.com"))
+        await other.flush()
+        async with db_sessionmaker() as db:
+            importing = asyncio.ensure_future(import_leads(db, read_records(ndjson(*records), "ndjson")))
+            await asyncio.sleep(0.1)
+            await other.commit()
+            report = await importing
+
+    assert report.imported == 1
+    assert [(error.row, error.email) for error in report.errors] == [(2, "b@example.com")]
+    assert await lead_count(db_sessionmaker) == 2
+
+
+async def test_import_cli_invalidates_cached_pages_and_announces(db_sessionmaker, monkeypatch, tmp_path):
+    """Test that the import command bumps the leads cache version and publishes leads.imported, like the endpoint."""
+    cache, broker = MemoryResponseCache(), LeadEventBroker()
+    monkeypatch.setattr(import_leads_cli, "AsyncSessionLocal", db_sessionmaker)
+    monkeypatch.setattr(import_leads_cli, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(import_leads_cli, "get_lead_event_broker", lambda: broker)
+    path = tmp_path / "leads.ndjson"
+    path.write_bytes(ndjson({"first_name": "A", "last_name": "L", "email": "a@example.com"}).getvalue())
+
+    report = await import_leads_cli.run(str(path), "ndjson", chunk_size=10)
+
+    assert report.imported == 1
+    assert await cache.version(LEADS_CACHE_NAMESPACE) == 1
+    assert [event.type for event in broker.events_after(0)] == [LEADS_IMPORTED]
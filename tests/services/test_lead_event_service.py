@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.lead_event_service import LeadEventBroker
+
+
+def parse(chunk: str):
+    """(id, event, data) of every event in a chunk of the stream."""
+    events = []
+    for block in chunk.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["id"], fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def broker():
+    """Fixture that provides a broker keeping three events."""
+    return LeadEventBroker(buffer_size=3, heartbeat=0.05, retry_ms=500)
+
+
+async def test_subscriber_gets_events_published_after_it_subscribed(broker):
+    """Test that a new subscriber starts with the retry hint and then only new events."""
+    broker.publish("lead.created", '{"id": 1}')
+    stream = broker.stream()
+    assert await anext(stream) == "retry: 500\n\n"
+    assert broker.subscribers == 0
+
+    broker.publish("lead.created", '{"id": 2}')
+    assert parse(await anext(stream)) == [(broker.event_id(2), "lead.created", {"id": 2})]
+    assert broker.subscribers == 1
+
+    await stream.aclose()
+    assert broker.subscribers == 0
+
+
+async def test_resume_replays_missed_events_in_one_write(broker):
+    """Test that a Last-Event-ID resumes right after that event."""
+    for lead_id in range(1, 4):
+        broker.publish("lead.created", json.dumps({"id": lead_id}))
+
+    stream = broker.stream(broker.event_id(1))
+    await anext(stream)
+    assert [data["id"] for _, _, data in parse(await anext(stream))] == [2, 3]
+    await stream.aclose()
+
+
+@pytest.mark.parametrize("last_event_id", ["someone-else-1", "garbage", None])
+async def test_unknown_last_event_id_is_reset(broker, last_event_id):
+    """Test that an id from another broker (or a future one) resets the client."""
+    broker.publish("lead.created", '{"id": 1}')
+    stream = broker.stream(last_event_id or broker.event_id(5))
+    await anext(stream)
+    assert parse(await anext(stream)) == [(broker.event_id(1), "reset", {})]
+    await stream.aclose()
+
+
+async def test_slow_subscriber_is_reset_when_it_falls_behind(broker):
+    """Test that a subscriber that missed more events than are buffered gets a reset, then carries on."""
+    stream = broker.stream()
+    await anext(stream)
+    broker.publish("lead.created", '{"id": 1}')
+    await anext(stream)
+
+    # The subscriber doesn't read while five more events go by
+    for lead_id in range(2, 7):
+        broker.publish("lead.created", json.dumps({"id": lead_id}))
+    assert parse(await anext(stream)) == [(broker.event_id(6), "reset", {})]
+
+    broker.publish("lead.state_changed", '{"id": 6}')
+    assert parse(await anext(stream))[0][1] == "lead.state_changed"
+    await stream.aclose()
+
+
+async def test_idle_stream_sends_keep_alives(broker):
+    """Test that an idle subscriber gets a comment every heartbeat."""
+    stream = broker.stream()
+    await anext(stream)
+    assert await asyncio.wait_for(anext(stream), 1) == ": keep-alive\n\n"
+    await stream.aclose()
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import select
+
+from app.models.lead import Lead as DBLead
+from app.models.lead_state_history import LeadStateHistory
+from app.schemas.lead import LeadState, LeadTransitionFailure
+from app.services.lead_state_service import DEFAULT_LEAD_STATE_TRANSITIONS, load_transitions, transition_leads
+
+
+@pytest.fixture
+async def lead_ids(db_sessionmaker):
+    """Fixture that stores one lead in each of PENDING, REACHED_OUT and RETAINED."""
+    async with db_sessionmaker() as db:
+        leads = [
+            DBLead(first_name="A", last_name="L", email=f"{state.value.lower()}@example.com", state=state)
+            for state in (LeadState.PENDING, LeadState.REACHED_OUT, LeadState.RETAINED)
+        ]
+        db.add_all(leads)
+        await db.commit()
+        return [lead.id for lead in leads]
+
+
+async def test_transition_moves_allowed_leads_and_records_history(db_sessionmaker, lead_ids):
+    """Test that only leads whose state allows the move change, each with one history row."""
+    pending, reached_out, retained = lead_ids
+    async with db_sessionmaker() as db:
+        updated, unchanged, failed = await transition_leads(
+            db, [(pending, None), (reached_out, None), (retained, None), (999, None)], LeadState.REJECTED
+        )
+        await db.commit()
+
+    assert [(row.id, row.state, row.version) for row in updated] == [
+        (pending, LeadState.REJECTED, 2), (reached_out, LeadState.REJECTED, 2)
+    ]
+    assert [(error.id, error.reason) for error in failed] == [
+        (retained, LeadTransitionFailure.NOT_ALLOWED), (999, LeadTransitionFailure.NOT_FOUND)
+    ]
+    async with db_sessionmaker() as db:
+        history = (await db.execute(select(LeadStateHistory).order_by(LeadStateHistory.lead_id))).scalars().all()
+    assert [(h.lead_id, h.from_state, h.to_state, h.version) for h in history] == [
+        (pending, LeadState.PENDING, LeadState.REJECTED, 2),
+        (reached_out, LeadState.REACHED_OUT, LeadState.REJECTED, 2),
+    ]
+
+
+async def test_transition_checks_version(db_sessionmaker, lead_ids):
+    """Test that a stale version is rejected and the current one is accepted."""
+    pending = lead_ids[0]
+    async with db_sessionmaker() as db:
+        updated, _, failed = await transition_leads(db, [(pending, 5)], LeadState.REACHED_OUT)
+        assert updated == [] and failed[0].reason == LeadTransitionFailure.VERSION_CONFLICT
+
+        updated, _, failed = await transition_leads(db, [(pending, 1)], LeadState.REACHED_OUT)
+        await db.commit()
+    assert failed == [] and updated[0].version == 2
+
+
+async def test_transition_to_current_state_is_a_no_op(db_sessionmaker, lead_ids):
+    """Test that moving a lead to the state it is in changes nothing, records no history and is not reported as updated."""
+    pending, reached_out, _ = lead_ids
+    async with db_sessionmaker() as db:
+        updated, unchanged, failed = await transition_leads(
+            db, [(reached_out, None), (pending, None)], LeadState.REACHED_OUT
+        )
+        await db.commit()
+        history = (await db.execute(select(LeadStateHistory))).scalars().all()
+
+    assert failed == []
+    assert [row.id for row in updated] == [pending]
+    assert [(row.id, row.state, row.version) for row in unchanged] == [(reached_out, LeadState.REACHED_OUT, 1)]
+    assert [h.lead_id for h in history] == [pending]
+
+
+def test_load_transitions_from_json():
+    """Test that a JSON table replaces the default state machine."""
+    assert load_transitions(None) is DEFAULT_LEAD_STATE_TRANSITIONS
+    transitions = load_transitions('{"PENDING": ["RETAINED"]}')
+    assert transitions[LeadState.PENDING] == {LeadState.RETAINED}
+    assert transitions[LeadState.REACHED_OUT] == frozenset()
+    with pytest.raises(ValueError):
+        load_transitions('{"PENDING": ["NOT_A_STATE"]}')
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+
+from app.services.rate_limit_service import (
+    AdmissionController, MemoryRateLimiter, OverloadedError, RateLimit, RedisRateLimiter
+)
+
+ONE_PER_SECOND_BURST_3 = RateLimit(rate=1, burst=3)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def limiter(request):
+    """Fixture that provides each rate limiter backend."""
+    if request.param == "memory":
+        return MemoryRateLimiter()
+    return RedisRateLimiter(FakeAsyncRedis())
+
+
+async def test_allows_a_burst_then_limits(limiter):
+    """Test that a full bucket allows `burst` requests, then says how long to wait."""
+    for _ in range(3):
+        assert await limiter.acquire("ip:1.2.3.4", ONE_PER_SECOND_BURST_3) == 0
+
+    retry_after = await limiter.acquire("ip:1.2.3.4", ONE_PER_SECOND_BURST_3)
+    assert 0 < retry_after <= 1
+
+
+async def test_keys_have_separate_buckets(limiter):
+    """Test that one client running out of tokens doesn't limit another."""
+    for _ in range(3):
+        await limiter.acquire("ip:1.2.3.4", ONE_PER_SECOND_BURST_3)
+
+    assert await limiter.acquire("ip:1.2.3.4", ONE_PER_SECOND_BURST_3) > 0
+    assert await limiter.acquire("ip:5.6.7.8", ONE_PER_SECOND_BURST_3) == 0
+
+
+async def test_memory_limiter_refills_at_the_rate():
+    """Test that tokens come back at `rate` per second, up to `burst`."""
+    now = [100.0]
+    limiter = MemoryRateLimiter(clock=lambda: now[0])
+    for _ in range(3):
+        await limiter.acquire("key", ONE_PER_SECOND_BURST_3)
+    assert await limiter.acquire("key", ONE_PER_SECOND_BURST_3) == pytest.approx(1)
+
+    now[0] += 1
+    assert await limiter.acquire("key", ONE_PER_SECOND_BURST_3) == 0
+    assert await limiter.acquire("key", ONE_PER_SECOND_BURST_3) > 0
+
+    now[0] += 60
+    for _ in range(3):
+        assert await limiter.acquire("key", ONE_PER_SECOND_BURST_3) == 0
+    assert await limiter.acquire("key", ONE_PER_SECOND_BURST_3) > 0
+
+
+async def test_memory_limiter_forgets_least_recently_used_keys():
+    """Test that the in-process limiter tracks at most `max_keys` clients."""
+    limiter = MemoryRateLimiter(max_keys=2)
+    limit = RateLimit(rate=1, burst=1)
+    await limiter.acquire("a", limit)
+    await limiter.acquire("b", limit)
+    await limiter.acquire("c", limit)
+
+    assert await limiter.acquire("a", limit) == 0
+    assert await limiter.acquire("c", limit) > 0
+
+
+async def test_redis_limiter_allows_requests_when_redis_is_down():
+    """Test that an unreachable Redis lets requests through instead of failing them."""
+    server = FakeServer()
+    server.connected = False
+    limiter = RedisRateLimiter(FakeAsyncRedis(server=server))
+
+    assert await limiter.acquire("key", RateLimit(rate=1, burst=1)) == 0
+
+
+async def test_admission_queues_then_turns_requests_away():
+    """Test that requests wait for a slot until the queue is full, then are refused at once."""
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5, retry_after=3)
+    release = asyncio.Event()
+    admitted = []
+
+    async def request(name):
+        async with controller.admit():
+            admitted.append(name)
+            await release.wait()
+
+    first = asyncio.create_task(request("first"))
+    second = asyncio.create_task(request("second"))
+    await asyncio.sleep(0)
+    assert admitted == ["first"] and controller.waiting == 1
+
+    with pytest.raises(OverloadedError) as overloaded:
+        async with controller.admit():
+            pass
+    assert overloaded.value.retry_after == 3
+
+    release.set()
+    await asyncio.gather(first, second)
+    assert admitted == ["first", "second"] and controller.waiting == 0
+
+
+async def test_admission_turns_away_requests_that_wait_too_long():
+    """Test that a queued request gives up after `queue_timeout`."""
+    controller = AdmissionController(max_concurrent=1, max_queue=10, queue_timeout=0.01)
+    async with controller.admit():
+        with pytest.raises(OverloadedError):
+            async with controller.admit():
+                pass
+    assert controller.waiting == 0
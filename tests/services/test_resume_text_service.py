@@ -0,0 +1,81 @@
+import io
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+
+from app.models.lead import Lead as DBLead
+from app.services.resume_text_service import extract_text, index_resume_text
+from app.services.search_service import search_index_for
+from app.services.storage_service import LocalResumeStore
+
+
+def make_docx(text: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(
+            "word/document.xml",
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f"<w:body><w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:body></w:document>",
+        )
+    return buffer.getvalue()
+
+
+def make_pdf(text: str) -> bytes:
+    stream = f"BT /F1 12 Tf 72 712 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R"
+        b" /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+def test_extract_text_formats():
+    """Test that text, Word and unknown files are read by extension, with whitespace collapsed."""
+    assert extract_text("ab/cv.txt", b"Senior\n\n  Engineer") == "Senior Engineer"
+    assert extract_text("ab/cv.docx", make_docx("Litigation paralegal")) == "Litigation paralegal"
+    assert extract_text("ab/cv.png", b"\x89PNG") == ""
+    assert extract_text("ab/cv.txt", b"x" * 50, max_chars=10) == "x" * 10
+
+
+def test_extract_text_pdf():
+    """Test that the text of a PDF resume is extracted."""
+    pytest.importorskip("pypdf")
+    assert "Patent attorney" in extract_text("ab/cv.pdf", make_pdf("Patent attorney"))
+
+
+async def test_index_resume_text_makes_resume_searchable(db_sessionmaker, tmp_path):
+    """Test that a stored resume's text is extracted into the search index."""
+    store = LocalResumeStore(str(tmp_path / "uploads"))
+    key = await store.save(UploadFile(io.BytesIO(b"Expert in maritime law"), filename="cv.txt"))
+    async with db_sessionmaker() as db:
+        lead = DBLead(first_name="Sam", last_name="Lee", email="sam@example.com", resume_path=key)
+        db.add(lead)
+        await db.flush()
+        await search_index_for(db).index_leads(db, DBLead.id == lead.id)
+        await db.commit()
+
+    await index_resume_text(db_sessionmaker, store, lead.id, key)
+
+    async with db_sessionmaker() as db:
+        hits = await search_index_for(db).search(db, "maritime", limit=10)
+    assert [hit.id for hit in hits] == [lead.id]
+
+
+async def test_index_resume_text_logs_failures(db_sessionmaker, tmp_path, caplog):
+    """Test that a missing resume is logged instead of raised."""
+    store = LocalResumeStore(str(tmp_path / "uploads"))
+    await index_resume_text(db_sessionmaker, store, 1, "ab/missing.txt")
+    assert "Could not index the resume of lead 1" in caplog.text
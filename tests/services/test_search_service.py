@@ -0,0 +1,94 @@
+from sqlalchemy import true
+
+from app.models.lead import Lead as DBLead
+from app.services.search_service import search_index_for, search_terms
+
+
+async def add_leads(db_sessionmaker, *leads):
+    async with db_sessionmaker() as db:
+        db.add_all(leads)
+        await db.flush()
+        await search_index_for(db).index_leads(db, DBLead.id.in_([lead.id for lead in leads]))
+        await db.commit()
+        return [lead.id for lead in leads]
+
+
+async def search(db_sessionmaker, query, limit=10, offset=0):
+    async with db_sessionmaker() as db:
+        return [row.email for row in await search_index_for(db).search(db, query, limit=limit, offset=offset)]
+
+
+async def test_search_matches_prefixes_of_every_term(db_sessionmaker):
+    """Test that all terms must match, each as a word prefix, across name and email."""
+    await add_leads(
+        db_sessionmaker,
+        DBLead(first_name="Maria", last_name="Garcia", email="maria.garcia@example.com"),
+        DBLead(first_name="Mario", last_name="Rossi", email="mrossi@example.com"),
+    )
+    assert sorted(await search(db_sessionmaker, "mari")) == ["maria.garcia@example.com", "mrossi@example.com"]
+    assert await search(db_sessionmaker, "mari gar") == ["maria.garcia@example.com"]
+    assert await search(db_sessionmaker, "mrossi") == ["mrossi@example.com"]
+    assert await search(db_sessionmaker, "nobody") == []
+
+
+async def test_search_ignores_query_syntax(db_sessionmaker):
+    """Test that FTS operators and quotes in the query are treated as plain words."""
+    await add_leads(db_sessionmaker, DBLead(first_name="Ann", last_name="Or", email="ann@example.com"))
+    assert await search(db_sessionmaker, 'ann OR "') == ["ann@example.com"]
+    assert await search(db_sessionmaker, '*:^()') == []
+    assert search_terms("Ann-Marie O'Neil") == ["ann", "marie", "o", "neil"]
+
+
+async def test_name_matches_outrank_resume_matches(db_sessionmaker):
+    """Test that a hit on the name ranks above a hit on resume text, and pages follow the ranking."""
+    resume_id, name_id = await add_leads(
+        db_sessionmaker,
+        DBLead(first_name="Alex", last_name="Smith", email="alex@example.com", resume_path="ab/1.txt"),
+        DBLead(first_name="Python", last_name="Jones", email="pj@example.com", resume_path="ab/2.txt"),
+    )
+    async with db_sessionmaker() as db:
+        await search_index_for(db).set_resume_text(db, resume_id, "Ten years of Python and SQL")
+        await db.commit()
+
+    assert await search(db_sessionmaker, "python") == ["pj@example.com", "alex@example.com"]
+    assert await search(db_sessionmaker, "python", limit=1, offset=1) == ["alex@example.com"]
+
+
+
+async def test_equally_ranked_hits_are_ordered_by_id(db_sessionmaker):
+    """Test that hits with the same score come back in id order, so pages neither repeat nor skip leads."""
+    await add_leads(db_sessionmaker, *(
+        DBLead(first_name="Sam", last_name="Lee", email=f"sam{i}@example.com") for i in range(6)
+    ))
+    expected = [f"sam{i}@example.com" for i in range(6)]
+    assert await search(db_sessionmaker, "sam lee") == expected
+    pages = [await search(db_sessionmaker, "sam lee", limit=2, offset=offset) for offset in (0, 2, 4)]
+    assert sum(pages, []) == expected
+
+async def test_leads_missing_resume_text(db_sessionmaker):
+    """Test that only leads with a resume whose text is not indexed are listed, by id."""
+    first, second, no_resume = await add_leads(
+        db_sessionmaker,
+        DBLead(first_name="A", last_name="A", email="a@example.com", resume_path="ab/1.txt"),
+        DBLead(first_name="B", last_name="B", email="b@example.com", resume_path="ab/2.txt"),
+        DBLead(first_name="C", last_name="C", email="c@example.com"),
+    )
+    async with db_sessionmaker() as db:
+        index = search_index_for(db)
+        await index.set_resume_text(db, first, "")
+        await db.commit()
+        assert await index.leads_missing_resume_text(db, 0, 10) == [(second, "ab/2.txt")]
+        assert await index.leads_missing_resume_text(db, second, 10) == []
+
+
+async def test_index_statement_indexes_existing_leads(db_sessionmaker):
+    """Test that the backfill statement makes leads inserted without indexing searchable."""
+    async with db_sessionmaker() as db:
+        db.add(DBLead(first_name="Late", last_name="Comer", email="late@example.com"))
+        await db.commit()
+    assert await search(db_sessionmaker, "late") == []
+
+    async with db_sessionmaker() as db:
+        await search_index_for(db).index_leads(db, true())
+        await db.commit()
+    assert await search(db_sessionmaker, "late") == ["late@example.com"]
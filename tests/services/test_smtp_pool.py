@@ -0,0 +1,141 @@
+import asyncio
+import socket
+
+import pytest
+from fastapi_mail import ConnectionConfig, MessageSchema
+
+from app.services.metrics_service import EMAIL_SEND_SECONDS, EMAILS_SENT
+from app.services.smtp_pool import SMTPConnectionPool
+
+
+class RecordingHandler:
+    """aiosmtpd handler that counts sessions and keeps every message it receives."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.messages = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.endswith("@rejected.example.com"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp_server():
+    """Fixture that runs a local aiosmtpd server and yields (handler, port)."""
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = RecordingHandler()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+@pytest.fixture
+def pool(smtp_server):
+    _, port = smtp_server
+    config = ConnectionConfig(
+        MAIL_USERNAME="", MAIL_PASSWORD="", MAIL_FROM="leads@example.com", MAIL_PORT=port,
+        MAIL_SERVER="127.0.0.1", MAIL_STARTTLS=False, MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False, VALIDATE_CERTS=False,
+    )
+    return SMTPConnectionPool(config, max_size=2)
+
+
+def message(recipient: str) -> MessageSchema:
+    return MessageSchema(subject="Hello", recipients=[recipient], body="<p>Hi</p>", subtype="html")
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_sessions(pool, smtp_server):
+    """Test that sequential sends share one SMTP session."""
+    handler, _ = smtp_server
+    for i in range(5):
+        await pool.send_message(message(f"user{i}@example.com"))
+    await pool.close()
+
+    assert len(handler.messages) == 5
+    assert handler.sessions == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_bounds_concurrent_sessions(pool, smtp_server):
+    """Test that concurrent sends never open more sessions than max_size."""
+    handler, _ = smtp_server
+    await asyncio.gather(*(pool.send_message(message(f"user{i}@example.com")) for i in range(20)))
+    await pool.close()
+
+    assert len(handler.messages) == 20
+    assert handler.sessions <= 2
+
+
+@pytest.mark.asyncio
+async def test_send_many_reports_per_message_failures(pool, smtp_server):
+    """Test that a rejected recipient fails only its own message in send_many."""
+    handler, _ = smtp_server
+    results = await pool.send_many([
+        message("a@example.com"),
+        message("b@rejected.example.com"),
+        message("c@example.com"),
+    ])
+    await pool.close()
+
+    assert results[0] is None and results[2] is None
+    assert results[1] is not None
+    assert len(handler.messages) == 2
+    assert handler.sessions == 1
+
+
+@pytest.mark.asyncio
+async def test_send_many_fails_only_the_message_that_cannot_be_built(pool, smtp_server):
+    """Test that a message whose MIME can't be built fails alone, and the session stays in use."""
+    handler, _ = smtp_server
+    malformed = MessageSchema(subject="Hello", recipients=["b@example.com"], template_body={"name": "B"}, subtype="html")
+    results = await pool.send_many([message("a@example.com"), malformed, message("c@example.com")])
+    await pool.close()
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], Exception)
+    assert len(handler.messages) == 2
+    assert handler.sessions == 1
+
+
+@pytest.mark.asyncio
+async def test_send_many_records_metrics(pool, smtp_server):
+    """Test that every message is counted by outcome and timed."""
+    sent = EMAILS_SENT.labels("sent")._value.get()
+    failed = EMAILS_SENT.labels("failed")._value.get()
+    timed = EMAIL_SEND_SECONDS._sum.get()
+
+    await pool.send_many([message("a@example.com"), message("b@rejected.example.com")])
+    await pool.close()
+
+    assert EMAILS_SENT.labels("sent")._value.get() == sent + 1
+    assert EMAILS_SENT.labels("failed")._value.get() == failed + 1
+    assert EMAIL_SEND_SECONDS._sum.get() > timed
+
+
+@pytest.mark.asyncio
+async def test_pool_replaces_stale_sessions(pool, smtp_server):
+    """Test that sessions idle for longer than max_idle_seconds are not reused."""
+    handler, _ = smtp_server
+    pool.max_idle_seconds = 0
+    await pool.send_message(message("a@example.com"))
+    await pool.send_message(message("b@example.com"))
+    await pool.close()
+
+    assert handler.sessions == 2
@@ -0,0 +1,151 @@
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+
+from app.services.storage_service import (
+    LocalResumeStore, ResumeNotFoundError, S3ResumeStore, UploadTooLargeError, safe_extension
+)
+
+
+def make_upload(content: bytes, filename: str = "resume.pdf") -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=filename)
+
+
+async def read_all(store, key) -> bytes:
+    return b"".join([chunk async for chunk in store.open(key)])
+
+
+@pytest.fixture
+def s3_store(monkeypatch):
+    """Fixture that provides an S3ResumeStore backed by an in-process moto S3."""
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        store = S3ResumeStore(
+            bucket="resumes", prefix="leads", region_name="us-east-1",
+            part_size=5 * 1024 * 1024, max_bytes=20 * 1024 * 1024,
+        )
+        store.client.create_bucket(Bucket="resumes")
+        yield store
+
+
+@pytest.mark.asyncio
+async def test_local_save_is_content_addressed(tmp_path):
+    """Test that the file lands at a key derived from its SHA-256."""
+    store = LocalResumeStore(str(tmp_path))
+    content = b"%PDF-1.4 resume"
+    key = await store.save(make_upload(content))
+
+    sha = hashlib.sha256(content).hexdigest()
+    assert key == f"{sha[:2]}/{sha}.pdf"
+    assert await read_all(store, key) == content
+
+
+@pytest.mark.asyncio
+async def test_local_same_filename_different_content_does_not_overwrite(tmp_path):
+    """Test that two uploads named resume.pdf are stored side by side."""
+    store = LocalResumeStore(str(tmp_path))
+    first = await store.save(make_upload(b"first"))
+    second = await store.save(make_upload(b"second"))
+
+    assert first != second
+    assert await read_all(store, first) == b"first"
+    assert await read_all(store, second) == b"second"
+
+
+@pytest.mark.asyncio
+async def test_local_oversized_upload_rejected_mid_stream(tmp_path, monkeypatch):
+    """Test that the size cap is enforced while streaming and no file is left behind."""
+    monkeypatch.setattr("app.services.storage_service.UPLOAD_CHUNK_SIZE", 4)
+    store = LocalResumeStore(str(tmp_path), max_bytes=10)
+    upload = make_upload(b"x" * 64)
+
+    with pytest.raises(UploadTooLargeError):
+        await store.save(upload)
+
+    # Only the first chunks past the cap were read, and the temp file was removed
+    assert upload.file.tell() < 64
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_local_rejects_keys_outside_root(tmp_path):
+    """Test that a key cannot be used to read files outside the store."""
+    store = LocalResumeStore(str(tmp_path / "store"))
+    with pytest.raises(ResumeNotFoundError):
+        await read_all(store, "../../etc/passwd")
+
+
+@pytest.mark.asyncio
+async def test_local_reads_legacy_paths(tmp_path, monkeypatch):
+    """Test that paths stored before the resume store (relative to the working directory) still resolve."""
+    monkeypatch.chdir(tmp_path)
+    store = LocalResumeStore("./uploads")
+    (tmp_path / "uploads" / "resume.pdf").write_bytes(b"legacy resume")
+
+    assert await read_all(store, "./uploads/resume.pdf") == b"legacy resume"
+    assert await read_all(store, str(tmp_path / "uploads" / "resume.pdf")) == b"legacy resume"
+    with pytest.raises(ResumeNotFoundError):
+        await read_all(store, "./other/resume.pdf")
+
+
+@pytest.mark.asyncio
+async def test_local_keys_do_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    """Test that a file saved while the working directory is inside the root is found from anywhere else."""
+    (tmp_path / "app").mkdir()
+    monkeypatch.chdir(tmp_path / "app")
+    key = await LocalResumeStore(str(tmp_path)).save(make_upload(b"resume contents", "resume.txt"))
+
+    assert (tmp_path / key).is_file()
+    assert not (tmp_path / "app" / key).exists()
+    monkeypatch.chdir("/")
+    assert await read_all(LocalResumeStore(str(tmp_path)), key) == b"resume contents"
+
+
+@pytest.mark.asyncio
+async def test_s3_single_part_upload(s3_store):
+    """Test that a small resume is stored with one PUT under its content key."""
+    content = b"small resume"
+    key = await s3_store.save(make_upload(content))
+
+    sha = hashlib.sha256(content).hexdigest()
+    assert key == f"{sha[:2]}/{sha}.pdf"
+    assert await read_all(s3_store, key) == content
+    assert "leads/" + key in await s3_store.url(key)
+
+
+@pytest.mark.asyncio
+async def test_s3_multipart_upload(s3_store):
+    """Test that a resume larger than one part is streamed as a multipart upload."""
+    content = os.urandom(12 * 1024 * 1024)
+    key = await s3_store.save(make_upload(content))
+
+    assert key.startswith(hashlib.sha256(content).hexdigest()[:2] + "/")
+    assert await read_all(s3_store, key) == content
+    # The temporary multipart object was removed after the copy
+    listed = s3_store.client.list_objects_v2(Bucket="resumes", Prefix="leads/tmp/")
+    assert listed["KeyCount"] == 0
+
+
+@pytest.mark.asyncio
+async def test_s3_oversized_upload_rejected(s3_store):
+    """Test that the size cap applies to S3 uploads too."""
+    s3_store.max_bytes = 10
+    with pytest.raises(UploadTooLargeError):
+        await s3_store.save(make_upload(b"x" * 64))
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("resume.PDF", ".pdf"),
+    ("../../etc/passwd", ""),
+    ("resume.tar.gz", ".gz"),
+    ("resume.p df", ""),
+    (None, ""),
+])
+def test_safe_extension(filename, expected):
+    """Test that only short alphanumeric extensions are kept."""
+    assert safe_extension(filename) == expected
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from app.services.template_service import EmailTemplates
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    """Fixture that provides a template directory with one email and a firm override."""
+    (tmp_path / "welcome.html").write_text("<p>Hello {{ name }}</p>")
+    (tmp_path / "welcome.txt").write_text("Hello {{ name }}")
+    firm_dir = tmp_path / "firms" / "acme"
+    firm_dir.mkdir(parents=True)
+    (firm_dir / "welcome.html").write_text("<p>Acme welcomes {{ name }}</p>")
+    return tmp_path
+
+
+def test_render_html_and_text(template_dir):
+    """Test that both parts are rendered, and only the HTML part is escaped."""
+    rendered = EmailTemplates(str(template_dir)).render("welcome", firm=None, name="<b>Jo</b>")
+    assert rendered.html == "<p>Hello &lt;b&gt;Jo&lt;/b&gt;</p>"
+    assert rendered.text == "Hello <b>Jo</b>"
+
+
+def test_firm_override_falls_back_per_part(template_dir):
+    """Test that a firm override replaces only the parts it defines."""
+    rendered = EmailTemplates(str(template_dir)).render("welcome", firm="acme", name="Jo")
+    assert rendered.html == "<p>Acme welcomes Jo</p>"
+    assert rendered.text == "Hello Jo"
+
+
+def test_templates_are_compiled_once(template_dir):
+    """Test that repeated renders reuse the compiled template."""
+    templates = EmailTemplates(str(template_dir), auto_reload=False)
+    templates.warm()
+    first = templates._template("welcome.html", None)
+    assert templates._template("welcome.html", None) is first
+
+
+def test_changed_template_is_reloaded(template_dir):
+    """Test that editing a template file is picked up on the next render."""
+    templates = EmailTemplates(str(template_dir), auto_reload=True)
+    assert templates.render("welcome", firm=None, name="Jo").html == "<p>Hello Jo</p>"
+
+    path = template_dir / "welcome.html"
+    path.write_text("<p>Hi {{ name }}</p>")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert templates.render("welcome", firm=None, name="Jo").html == "<p>Hi Jo</p>"
@@ -0,0 +1,218 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import select
+
+from app.db.timestamps import utcnow
+from app.models.email_outbox import EmailKind, EmailOutbox, OutboxStatus
+from app.models.lead import Lead as DBLead
+from app.services import outbox_service
+from app.services.outbox_service import enqueue_new_lead_emails
+from app.workers.email_worker import EmailOutboxWorker
+
+
+@pytest.fixture
+async def queued_lead(db_sessionmaker, monkeypatch):
+    """Fixture that stores a lead with its two emails queued in the outbox."""
+    monkeypatch.setenv("ATTORNEY_EMAIL", "attorney@lawfirm.com")
+    async with db_sessionmaker() as db:
+        lead = DBLead(first_name="John", last_name="Doe", email="john.doe@example.com", resume_path="ab/abc.pdf")
+        db.add(lead)
+        await db.flush()
+        enqueue_new_lead_emails(db, lead.id)
+        await db.commit()
+        return lead
+
+
+async def outbox_rows(db_sessionmaker):
+    async with db_sessionmaker() as db:
+        return (await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all()
+
+
+async def test_worker_sends_queued_emails(db_sessionmaker, queued_lead):
+    """Test that both queued emails are sent and marked SENT."""
+    worker = EmailOutboxWorker(session_factory=db_sessionmaker)
+    send_many = AsyncMock(side_effect=lambda messages: [None] * len(messages))
+    with patch("app.services.email_service.send_many", new=send_many):
+        assert await worker.run_once() == 2
+
+    rows = await outbox_rows(db_sessionmaker)
+    assert [row.status for row in rows] == [OutboxStatus.SENT, OutboxStatus.SENT]
+    recipients = sorted(
+        message.recipients[0].email for call in send_many.await_args_list for message in call.args[0]
+    )
+    assert recipients == ["attorney@lawfirm.com", "john.doe@example.com"]
+
+    # Nothing is left to claim
+    assert await worker.run_once() == 0
+
+
+async def test_worker_retries_with_backoff(db_sessionmaker, queued_lead):
+    """Test that a failed send goes back to PENDING with a later next_attempt_at."""
+    worker = EmailOutboxWorker(session_factory=db_sessionmaker)
+    failing = AsyncMock(side_effect=lambda messages: [Exception("SMTP connection failed")] * len(messages))
+    with patch("app.services.email_service.send_many", new=failing):
+        await worker.run_once()
+
+    for row in await outbox_rows(db_sessionmaker):
+        assert row.status == OutboxStatus.PENDING
+        assert row.attempts == 1
+        assert "SMTP connection failed" in row.last_error
+        assert row.next_attempt_at > utcnow()
+
+    # Not due yet, so the next pass claims nothing
+    with patch("app.services.email_service.send_many", new=failing):
+        assert await worker.run_once() == 0
+
+
+async def test_worker_dead_letters_after_max_attempts(db_sessionmaker, queued_lead, monkeypatch):
+    """Test that an email is marked DEAD once it has used up its attempts."""
+    monkeypatch.setattr("app.services.outbox_service.EMAIL_MAX_ATTEMPTS", 1)
+    worker = EmailOutboxWorker(session_factory=db_sessionmaker)
+    failing = AsyncMock(side_effect=lambda messages: [Exception("boom")] * len(messages))
+    with patch("app.services.email_service.send_many", new=failing):
+        await worker.run_once()
+
+    assert [row.status for row in await outbox_rows(db_sessionmaker)] == [OutboxStatus.DEAD, OutboxStatus.DEAD]
+
+
+async def test_worker_reclaims_expired_leases(db_sessionmaker, queued_lead):
+    """Test that rows left SENDING by a crashed worker are picked up after their lease expires."""
+    async with db_sessionmaker() as db:
+        for row in (await db.execute(select(EmailOutbox))).scalars():
+            row.status = OutboxStatus.SENDING
+            row.locked_until = utcnow() - timedelta(seconds=1)
+        await db.commit()
+
+    worker = EmailOutboxWorker(session_factory=db_sessionmaker)
+    send_many = AsyncMock(side_effect=lambda messages: [None] * len(messages))
+    with patch("app.services.email_service.send_many", new=send_many):
+        assert await worker.run_once() == 2
+
+
+async def test_enqueue_skips_attorney_without_address(db_sessionmaker, monkeypatch, caplog):
+    """Test that only the prospect email is queued when ATTORNEY_EMAIL is not set, with one warning per process."""
+    monkeypatch.delenv("ATTORNEY_EMAIL", raising=False)
+    monkeypatch.setattr(outbox_service, "_warned_attorney_email_missing", False)
+    async with db_sessionmaker() as db:
+        for email in ("jane@example.com", "jim@example.com"):
+            lead = DBLead(first_name="Jane", last_name="Doe", email=email, resume_path="x")
+            db.add(lead)
+            await db.flush()
+            enqueue_new_lead_emails(db, lead.id)
+        await db.commit()
+
+    kinds = [row.kind for row in await outbox_rows(db_sessionmaker)]
+    assert kinds == [EmailKind.PROSPECT_CONFIRMATION, EmailKind.PROSPECT_CONFIRMATION]
+    assert caplog.text.count("ATTORNEY_EMAIL environment variable not set") == 1
+
+
+async def test_worker_sends_batch_over_concurrency_sessions(db_sessionmaker, queued_lead):
+    """Test that a batch is split into at most `concurrency` send_many calls."""
+    worker = EmailOutboxWorker(session_factory=db_sessionmaker, concurrency=1)
+    send_many = AsyncMock(side_effect=lambda messages: [None] * len(messages))
+    with patch("app.services.email_service.send_many", new=send_many):
+        await worker.run_once()
+
+    send_many.assert_awaited_once()
+    assert len(send_many.await_args.args[0]) == 2
+
+
+async def test_worker_records_other_groups_when_one_group_raises(db_sessionmaker, queued_lead):
+    """Test that a send_many that raises fails only its own group, and the other group stays sent."""
+    worker = EmailOutboxWorker(session_factory=db_sessionmaker, concurrency=2)
+
+    async def send_many(messages):
+        if messages[0].recipients[0].email == "attorney@lawfirm.com":
+            raise ConnectionError("SMTP server went away")
+        return [None] * len(messages)
+
+    with patch("app.services.email_service.send_many", new=send_many):
+        assert await worker.run_once() == 2
+
+    rows = {row.kind: row for row in await outbox_rows(db_sessionmaker)}
+    prospect, attorney = rows[EmailKind.PROSPECT_CONFIRMATION], rows[EmailKind.ATTORNEY_NOTIFICATION]
+    assert prospect.status == OutboxStatus.SENT
+    assert attorney.status == OutboxStatus.PENDING
+    assert attorney.attempts == 1
+    assert "SMTP server went away" in attorney.last_error
+
+
+async def queue_leads(db_sessionmaker, count: int):
+    async with db_sessionmaker() as db:
+        for i in range(count):
+            lead = DBLead(first_name=f"Lead{i}", last_name="Doe", email=f"lead{i}@example.com", resume_path="x")
+            db.add(lead)
+            await db.flush()
+            enqueue_new_lead_emails(db, lead.id)
+        await db.commit()
+
+
+async def test_digest_waits_for_enough_leads(db_sessionmaker, monkeypatch):
+    """Test that digest mode sends prospect emails at once but holds attorney notifications."""
+    monkeypatch.setenv("ATTORNEY_EMAIL", "attorney@lawfirm.com")
+    await queue_leads(db_sessionmaker, 3)
+    worker = EmailOutboxWorker(session_factory=db_sessionmaker, digest_minutes=60, digest_max_leads=5)
+    send_many = AsyncMock(side_effect=lambda messages: [None] * len(messages))
+    with patch("app.services.email_service.send_many", new=send_many):
+        assert await worker.run_once() == 3
+
+    recipients = [message.recipients[0].email for call in send_many.await_args_list for message in call.args[0]]
+    assert "attorney@lawfirm.com" not in recipients
+    statuses = {(row.kind, row.status) for row in await outbox_rows(db_sessionmaker)}
+    assert statuses == {
+        (EmailKind.PROSPECT_CONFIRMATION, OutboxStatus.SENT),
+        (EmailKind.ATTORNEY_NOTIFICATION, OutboxStatus.PENDING),
+    }
+
+
+async def test_digest_sent_once_max_leads_are_waiting(db_sessionmaker, monkeypatch):
+    """Test that reaching digest_max_leads sends one summary covering those leads."""
+    monkeypatch.setenv("ATTORNEY_EMAIL", "attorney@lawfirm.com")
+    await queue_leads(db_sessionmaker, 3)
+    worker = EmailOutboxWorker(session_factory=db_sessionmaker, digest_minutes=60, digest_max_leads=3)
+    send_many = AsyncMock(side_effect=lambda messages: [None] * len(messages))
+    with patch("app.services.email_service.send_many", new=send_many):
+        assert await worker.run_once() == 6
+
+    digests = [
+        message for call in send_many.await_args_list for message in call.args[0]
+        if message.recipients[0].email == "attorney@lawfirm.com"
+    ]
+    assert len(digests) == 1
+    assert digests[0].subject == "3 New Leads Received"
+    for i in range(3):
+        assert f"lead{i}@example.com" in digests[0].body
+    assert all(row.status == OutboxStatus.SENT for row in await outbox_rows(db_sessionmaker))
+
+
+async def test_digest_sent_once_oldest_lead_is_old_enough(db_sessionmaker, monkeypatch):
+    """Test that a single waiting lead is sent once it has waited digest_minutes."""
+    monkeypatch.setenv("ATTORNEY_EMAIL", "attorney@lawfirm.com")
+    await queue_leads(db_sessionmaker, 1)
+    async with db_sessionmaker() as db:
+        for row in (await db.execute(select(EmailOutbox))).scalars():
+            row.created_at = utcnow() - timedelta(minutes=61)
+        await db.commit()
+
+    worker = EmailOutboxWorker(session_factory=db_sessionmaker, digest_minutes=60, digest_max_leads=100)
+    send_many = AsyncMock(side_effect=lambda messages: [None] * len(messages))
+    with patch("app.services.email_service.send_many", new=send_many):
+        assert await worker.run_once() == 2
+
+    assert all(row.status == OutboxStatus.SENT for row in await outbox_rows(db_sessionmaker))
+
+
+async def test_failed_digest_retries_every_lead(db_sessionmaker, monkeypatch):
+    """Test that a failed digest puts all of its notifications back with backoff."""
+    monkeypatch.setenv("ATTORNEY_EMAIL", "attorney@lawfirm.com")
+    await queue_leads(db_sessionmaker, 2)
+    worker = EmailOutboxWorker(session_factory=db_sessionmaker, digest_minutes=60, digest_max_leads=2)
+    failing = AsyncMock(side_effect=lambda messages: [Exception("boom")] * len(messages))
+    with patch("app.services.email_service.send_many", new=failing):
+        await worker.run_once()
+
+    attorney_rows = [row for row in await outbox_rows(db_sessionmaker) if row.kind == EmailKind.ATTORNEY_NOTIFICATION]
+    assert len(attorney_rows) == 2
+    assert all(row.status == OutboxStatus.PENDING and row.attempts == 1 for row in attorney_rows)